@@ -0,0 +1,310 @@
+"""Columnar sales analytics for the Reports tab and the API.
+
+``load()`` reads ``orders`` and ``order_items`` for a date range into NumPy
+arrays, in ``fetchmany`` chunks: one array per column, with order type and
+payment method as small integer codes. The reports are then computed with
+``bincount`` / ``unique`` / masks over whole columns, never a Python loop per
+order, so a year of orders takes milliseconds once loaded:
+
+    hourly_heatmap    orders / revenue / avg ticket per weekday x hour
+    sold_together     item pairs bought in the same order (support, confidence, lift)
+    payment_mix       payment-method share per day / week / month
+    discount_impact   ticket size and basket size per discount band
+    ticket_by_type    average / median / p90 ticket per order type
+
+Months moved out of MySQL by archive.py are read from their column files
+and merged in.
+
+``FrameCache`` keeps the last few loaded ranges. A range is reloaded only
+when its order count or highest id changes, and each report is memoised on
+its frame. Every report returns ``(header, rows)`` ready for a CSV.
+
+NumPy is optional for the rest of the app. Without it ``HAVE_NUMPY`` is
+False and ``load()`` raises ``RuntimeError``.
+"""
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:         # analytics only; the till runs without it
+    np = None
+    HAVE_NUMPY = False
+
+CHUNK_ROWS = 20000
+TO_DAYS_EPOCH = 719528      # TO_DAYS('1970-01-01')
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+DISCOUNT_BANDS = (5, 10, 20)    # % of subtotal; plus "none" and "over the last"
+
+
+# ------------------------- LOADING ---------------------------
+def _where(date_from, date_to, col="order_date"):
+    where, params = [], []
+    if date_from:
+        where.append(f"{col} >= %s"); params.append(date_from)
+    if date_to:
+        where.append(f"{col} < %s"); params.append(date_to + timedelta(days=1))
+    return (" WHERE " + " AND ".join(where)) if where else "", tuple(params)
+
+
+def _columns(conn, sql, params, dtypes):
+    """Run ``sql`` and return one array per column, built chunk by chunk."""
+    try:
+        cur = conn.cursor(buffered=False)
+    except TypeError:
+        cur = conn.cursor()
+    cur.execute(sql, params)
+    parts = [[] for _ in dtypes]
+    try:
+        while True:
+            rows = cur.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            for part, col, dtype in zip(parts, zip(*rows), dtypes):
+                part.append(np.array(col, dtype=dtype))
+    finally:
+        cur.close()
+    return [np.concatenate(p) if p else np.empty(0, dtype=d) for p, d in zip(parts, dtypes)]
+
+
+def _codes(values):
+    """Object array -> (int8 codes, labels) with labels sorted."""
+    labels, codes = np.unique(values.astype(str), return_inverse=True)
+    return codes.astype(np.int8), [str(v) for v in labels]
+
+
+ORDER_COLS = ("id", "day", "hour", "weekday", "type", "pay", "subtotal", "discount", "service", "total")
+LINE_COLS = ("line_order", "item", "qty", "price")
+
+
+class Frame:
+    """Columns of the orders in one date range, and of their lines.
+
+    Order columns are aligned and sorted by id; ``line_order`` maps each line
+    to its order's row.
+    """
+
+    def __init__(self, date_from, date_to):
+        self.date_from, self.date_to = date_from, date_to
+        self.stamp = None
+        self.results = {}
+
+    def __len__(self):
+        return len(self.id)
+
+
+def load(conn, caps, date_from=None, date_to=None, archive=None):
+    """Frame for the range from the hot tables plus any months in ``archive``
+    (archive.Archive). With ``conn`` None only the archive is read."""
+    if not HAVE_NUMPY:
+        raise RuntimeError("analytics needs NumPy (pip install numpy)")
+    f = Frame(date_from, date_to)
+    parts, f.names = [], {}
+    if conn is not None:
+        where, params = _where(date_from, date_to)
+        service = "service_charge" if caps.has("orders", "service_charge") else "0"
+        parts.append(dict(zip(ORDER_COLS, _columns(
+            conn,
+            f"SELECT id, TO_DAYS(order_date), HOUR(order_date), WEEKDAY(order_date), order_type, payment_method, "
+            f"subtotal, discount, {service}, total FROM orders{where} ORDER BY id",
+            params, (np.int64, np.int32, np.int8, np.int8, object, object, float, float, float, float)))))
+        where, params = _where(date_from, date_to, "o.order_date")
+        parts[0].update(zip(LINE_COLS, _columns(
+            conn,
+            "SELECT oi.order_id, oi.menu_item_id, oi.quantity, oi.price FROM order_items oi "
+            f"JOIN orders o ON o.id = oi.order_id{where} ORDER BY oi.order_id",
+            params, (np.int64, np.int64, np.int32, float))))
+        cur = conn.cursor()
+        cur.execute("SELECT id, item_name FROM menu")
+        f.names = dict(cur.fetchall())
+
+    if archive is not None:
+        for month in archive.covering(date_from, date_to):
+            cols = month.analytics_columns(date_from, date_to)
+            for k, v in cols.pop("names").items():
+                f.names.setdefault(k, v)
+            parts.append(cols)
+    if len(parts) == 1:
+        cols = parts[0]
+    else:
+        cols = {k: np.concatenate([p[k] for p in parts] or [np.empty(0, dtype=np.int64)])
+                for k in ORDER_COLS + LINE_COLS}
+        order = np.argsort(cols["id"], kind="stable")
+        for k in ORDER_COLS:
+            cols[k] = cols[k][order]
+    for k in ORDER_COLS + LINE_COLS:
+        setattr(f, k, cols[k])
+    f.type, f.types = _codes(f.type)
+    f.pay, f.pays = _codes(f.pay)
+    f.line_order = np.searchsorted(f.id, f.line_order)
+    f.items_per_order = np.bincount(f.line_order, weights=f.qty, minlength=len(f.id))
+    return f
+
+
+class FrameCache:
+    def __init__(self, size=4):
+        self.size = size
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conn, caps, date_from=None, date_to=None, archive=None):
+        """Frame for the range, reloaded only if its orders changed."""
+        stamp = ()
+        if conn is not None:
+            where, params = _where(date_from, date_to)
+            cur = conn.cursor()
+            cur.execute(f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM orders{where}", params)
+            stamp = tuple(int(v) for v in cur.fetchone())
+        if archive is not None:
+            stamp += tuple((m.month, m.meta["written"]) for m in archive.covering(date_from, date_to))
+        key = (date_from, date_to)
+        with self._lock:
+            f = self._frames.get(key)
+            if f is not None and f.stamp == stamp:
+                self._frames.move_to_end(key)
+                return f
+            f = load(conn, caps, date_from, date_to, archive)
+            f.stamp = stamp
+            self._frames[key] = f
+            while len(self._frames) > self.size:
+                self._frames.popitem(last=False)
+            return f
+
+
+# ------------------------- REPORTS ---------------------------
+def _m(v):
+    return f"{v:.2f}"
+
+
+def _safe(den):
+    return np.where(den == 0, 1, den)
+
+
+def hourly_heatmap(f):
+    cell = f.weekday.astype(np.int64) * 24 + f.hour
+    orders = np.bincount(cell, minlength=168)
+    revenue = np.bincount(cell, weights=f.total, minlength=168)
+    avg = revenue / _safe(orders)
+    share = revenue / (revenue.sum() or 1) * 100
+    header = ["Weekday", "Hour", "Orders", "Revenue", "Avg Ticket", "Revenue %"]
+    return header, [(WEEKDAYS[c // 24], f"{c % 24:02d}:00", int(orders[c]), _m(revenue[c]), _m(avg[c]),
+                     f"{share[c]:.1f}") for c in range(168)]
+
+
+def sold_together(f, limit=100, min_orders=2):
+    header = ["Item A", "Item B", "Orders Together", "Support %", "A→B %", "B→A %", "Lift"]
+    if not len(f.item):
+        return header, []
+    m = int(f.item.max()) + 1
+    basket = np.unique(f.line_order * m + f.item)        # one entry per (order, item), order-major
+    order, item = basket // m, basket % m
+    with_item = np.bincount(item, minlength=m)
+    pairs = []
+    k = 1
+    while k < len(order):
+        same = order[k:] == order[:-k]                 # items k apart in the same basket
+        if not same.any():
+            break
+        pairs.append(item[:-k][same] * m + item[k:][same])
+        k += 1
+    if not pairs:
+        return header, []
+    keys, together = np.unique(np.concatenate(pairs), return_counts=True)
+    keep = together >= min_orders
+    keys, together = keys[keep], together[keep]
+    top = np.argsort(-together, kind="stable")[:limit]
+    keys, together = keys[top], together[top]
+    a, b = keys // m, keys % m
+    n = len(f)
+    support = together / n * 100
+    a_b = together / with_item[a] * 100
+    b_a = together / with_item[b] * 100
+    lift = together * n / (with_item[a] * with_item[b])
+    name = f.names.get
+    return header, [(name(int(a[i]), f"#{a[i]}"), name(int(b[i]), f"#{b[i]}"), int(together[i]),
+                     f"{support[i]:.2f}", f"{a_b[i]:.1f}", f"{b_a[i]:.1f}", f"{lift[i]:.2f}")
+                    for i in range(len(keys))]
+
+
+def payment_mix(f, period=None):
+    """Per period, newest first. ``period`` defaults by range length."""
+    if not len(f):
+        return ["Period", "Orders", "Revenue"], []
+    if period is None:
+        span = int(f.day.max() - f.day.min())
+        period = "daily" if span <= 31 else "weekly" if span <= 180 else "monthly"
+    days = (f.day - TO_DAYS_EPOCH).astype("datetime64[D]")
+    if period == "daily":
+        p = days
+    elif period == "weekly":
+        p = days - f.weekday.astype("timedelta64[D]")
+    else:
+        p = days.astype("datetime64[M]")
+    periods, idx = np.unique(p, return_inverse=True)
+    k = len(f.pays)
+    cell = idx * k + f.pay
+    orders = np.bincount(cell, minlength=len(periods) * k).reshape(-1, k)
+    revenue = np.bincount(cell, weights=f.total, minlength=len(periods) * k).reshape(-1, k)
+    total = revenue.sum(axis=1)
+    share = revenue / _safe(total)[:, None] * 100
+    header = (["Period", "Orders", "Revenue"] + [f"{p} Orders" for p in f.pays]
+              + [f"{p} Revenue %" for p in f.pays])
+    label = (lambda d: f"week of {d}") if period == "weekly" else str
+    return header, [(label(periods[i]), int(orders[i].sum()), _m(total[i]))
+                    + tuple(int(v) for v in orders[i]) + tuple(f"{v:.1f}" for v in share[i])
+                    for i in range(len(periods) - 1, -1, -1)]
+
+
+def discount_impact(f):
+    pct = f.discount / _safe(f.subtotal) * 100
+    band = np.where(pct <= 0.005, 0, 1 + np.searchsorted(DISCOUNT_BANDS, pct))
+    nb = len(DISCOUNT_BANDS) + 2
+    labels = ["none", f"up to {DISCOUNT_BANDS[0]}%"] + [
+        f"{lo}-{hi}%" for lo, hi in zip(DISCOUNT_BANDS, DISCOUNT_BANDS[1:])] + [f"over {DISCOUNT_BANDS[-1]}%"]
+    orders = np.bincount(band, minlength=nb)
+
+    def per_order(col):
+        return np.bincount(band, weights=col, minlength=nb) / _safe(orders)
+    subtotal, discount, total, items = (per_order(c) for c in (f.subtotal, f.discount, f.total, f.items_per_order))
+    revenue = np.bincount(band, weights=f.total, minlength=nb)
+    given = np.bincount(band, weights=f.discount, minlength=nb)
+    share = orders / (orders.sum() or 1) * 100
+    header = ["Discount", "Orders", "Orders %", "Avg Subtotal", "Avg Discount", "Avg Ticket", "Avg Items",
+              "Revenue", "Discount Given"]
+    return header, [(labels[i], int(orders[i]), f"{share[i]:.1f}", _m(subtotal[i]), _m(discount[i]),
+                     _m(total[i]), f"{items[i]:.2f}", _m(revenue[i]), _m(given[i])) for i in range(nb)]
+
+
+def ticket_by_type(f):
+    header = ["Order Type", "Orders", "Revenue", "Avg Ticket", "Median Ticket", "P90 Ticket", "Avg Items",
+              "Avg Discount"]
+    groups = [(t, f.type == i) for i, t in enumerate(f.types)] + [("All", slice(None))]
+    rows = []
+    for label, mask in groups:
+        total = f.total[mask]
+        if not len(total):
+            continue
+        rows.append((label, len(total), _m(total.sum()), _m(total.mean()), _m(np.median(total)),
+                     _m(np.percentile(total, 90)), f"{f.items_per_order[mask].mean():.2f}",
+                     _m(f.discount[mask].mean())))
+    return header, rows
+
+
+REPORTS = {
+    "hourly_heatmap": hourly_heatmap,
+    "sold_together": sold_together,
+    "payment_mix": payment_mix,
+    "discount_impact": discount_impact,
+    "ticket_by_type": ticket_by_type,
+}
+
+
+def run(frame, name, **opts):
+    """``(header, rows)`` of report ``name`` on ``frame``, memoised per options."""
+    key = (name,) + tuple(sorted(opts.items()))
+    res = frame.results.get(key)
+    if res is None:
+        res = frame.results[key] = REPORTS[name](frame, **opts)
+    return res
@@ -0,0 +1,411 @@
+"""Async HTTP/JSON API over BillingService, for tablets, kiosks and more tills.
+
+    python api.py --terminal ID [--host 127.0.0.1] [--port 8080]
+                  [--sqlite pos.db] [--journal api_journal.sqlite3] [--shifts api_shifts.sqlite3]
+                  [--pricing pricing_rules.json]
+
+Without ``--sqlite`` it serves the MySQL database configured in main.py
+(DB_CONFIG / DB_POOL). With it, a local SQLite stand-in is created and seeded
+(see sqlite_store.py), which needs no server. ``--terminal`` is required: it
+goes into every order reference, so each API process needs an id that no
+till or other API process on the same database uses (see TERMINAL_ID in
+main.py). ``--journal`` makes checkout offline-first, as in the desktop app;
+its journal also keeps the shift totals. Without a journal, ``--shifts``
+keeps them in a file of their own.
+
+The event loop only parses requests and writes responses. Service calls run
+on a thread pool as large as the connection pool, so every request shares
+one pool and one menu catalog. Plain asyncio streams, no dependencies.
+
+    GET  /health
+    GET  /menu?q=&category=
+    GET  /menu/categories
+    POST /cart/price   {"items": [[menu_id, qty], ...], "discount_pct": 0, "service_pct": 0, "coupon": ""}
+                       totals after the pricing rules, with a trace per line
+    POST /orders       same fields + order_type, payment_method, customer_name, customer_mobile
+    GET  /orders?from=&to=&payment=&type=&customer=&before=&after=&limit=
+    GET  /orders/<id>
+    GET  /reports/sales?period=daily|weekly|monthly
+    GET  /reports/top-items?limit=50
+    GET  /reports/analytics/<report>?from=&to=&period=   (needs NumPy; see analytics.py)
+    GET  /customers?q=&limit=8       autocomplete by mobile or name prefix
+    GET  /customers/<mobile>
+    GET  /shifts?limit=20           recent shifts of this terminal
+    GET  /shifts/current|<id>       X-report of the open shift / Z-report
+    POST /shifts/close              {"closed_by": "", "counted_cash": 0}
+    GET  /shifts/current|<id>/verify   recompute from orders (audit)
+    GET  /journal/parked            checkouts MySQL kept rejecting (needs --journal)
+    POST /journal/requeue           {"refs": [...]}  retry them (all if refs is omitted)
+"""
+import argparse
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+from db_pool import ConnectionPool, PoolTimeout
+from history import PAGE_SIZE, parse_day
+from references import MAX_TERMINAL
+from service import BillingService, NotFound, ServiceError
+
+MAX_BODY = 1 << 20
+MAX_LIMIT = 500
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _body_length(headers):
+    """Content-Length if the body will be read, else None (bad or over ``MAX_BODY``)."""
+    raw = headers.get("content-length") or "0"
+    if not raw.isdigit() or int(raw) > MAX_BODY:
+        return None
+    return int(raw)
+
+
+def _json_default(v):
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    raise TypeError(f"not JSON serialisable: {type(v).__name__}")
+
+
+def _int(q, name, default=None, lo=None, hi=None):
+    raw = q.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        v = int(raw)
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+    if lo is not None:
+        v = max(v, lo)
+    if hi is not None:
+        v = min(v, hi)
+    return v
+
+
+def _items(body):
+    items = body.get("items")
+    if not isinstance(items, list) or not items:
+        raise HttpError(400, "items must be a non-empty list of [menu_id, qty]")
+    out = []
+    for it in items:
+        if isinstance(it, dict):
+            it = (it.get("id"), it.get("qty", 1))
+        try:
+            out.append((int(it[0]), int(it[1])))
+        except (TypeError, ValueError, IndexError):
+            raise HttpError(400, f"bad item {it!r}; expected [menu_id, qty]")
+    return out
+
+
+class BillingAPI:
+    def __init__(self, service, workers=4, pool=None, syncer=None):
+        self.service = service
+        self.pool = pool
+        self.syncer = syncer
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-io")
+        self.routes = [
+            ("GET", re.compile(r"/health"), self.health),
+            ("GET", re.compile(r"/menu"), self.menu),
+            ("GET", re.compile(r"/menu/categories"), self.categories),
+            ("POST", re.compile(r"/cart/price"), self.price),
+            ("POST", re.compile(r"/orders"), self.create_order),
+            ("GET", re.compile(r"/orders"), self.orders),
+            ("GET", re.compile(r"/orders/(\d+)"), self.order),
+            ("GET", re.compile(r"/reports/sales"), self.sales),
+            ("GET", re.compile(r"/reports/top-items"), self.top_items),
+            ("GET", re.compile(r"/reports/analytics/(\w+)"), self.analytics),
+            ("GET", re.compile(r"/customers"), self.find_customers),
+            ("GET", re.compile(r"/customers/(\d+)"), self.customer),
+            ("GET", re.compile(r"/shifts"), self.shifts),
+            ("GET", re.compile(r"/shifts/(\d+|current)"), self.shift),
+            ("POST", re.compile(r"/shifts/close"), self.close_shift),
+            ("GET", re.compile(r"/shifts/(\d+|current)/verify"), self.verify_shift),
+            ("GET", re.compile(r"/journal/parked"), self.parked),
+            ("POST", re.compile(r"/journal/requeue"), self.requeue),
+        ]
+
+    def call(self, fn, *args, **kw):
+        """Run a blocking service call on the I/O pool."""
+        return asyncio.get_running_loop().run_in_executor(self.executor, partial(fn, *args, **kw))
+
+    # --------------------- handlers ---------------------
+    async def health(self, q, body):
+        out = dict(menu_loaded=self.service.catalog.loaded)
+        await self.call(self.service.pricing.rules)     # a stat (a reload after an edit); off the loop
+        if self.service.pricing.error:
+            out["pricing_error"] = self.service.pricing.error
+        if self.pool is not None:
+            out["pool"] = self.pool.stats()
+        if self.syncer is not None:
+            waiting, parked = self.syncer.backlog
+            out["sync"] = dict(online=self.syncer.online, waiting=waiting, parked=parked,
+                               blocked=self.syncer.blocked)
+        return 200, out
+
+    async def menu(self, q, body):
+        rows = await self.call(self.service.menu, q.get("q", ""), q.get("category", "All"))
+        return 200, [dict(id=r[0], name=r[1], category=r[2], price=r[3], gst=r[4]) for r in rows]
+
+    async def categories(self, q, body):
+        return 200, await self.call(self.service.categories)
+
+    def _priced(self, body):
+        cart = self.service.build_cart(_items(body))
+        quote = self.service.price(cart, body.get("discount_pct", 0), body.get("service_pct", 0),
+                                   str(body.get("coupon") or ""))
+        return cart, quote
+
+    async def price(self, q, body):
+        cart, quote = await self.call(self._priced, body)
+        return 200, dict(items=[ln.as_dict() for ln in cart], **quote.as_dict())
+
+    async def create_order(self, q, body):
+        def checkout():
+            cart = self.service.build_cart(_items(body))
+            return self.service.checkout(
+                cart, body.get("discount_pct", 0), body.get("service_pct", 0),
+                order_type=body.get("order_type", "Dine-In"), payment_method=body.get("payment_method", "Cash"),
+                customer_name=str(body.get("customer_name") or ""),
+                customer_mobile=str(body.get("customer_mobile") or ""), coupon=str(body.get("coupon") or ""))
+        bill = await self.call(checkout)
+        if self.syncer is not None:
+            self.syncer.kick()
+        return 201, bill
+
+    async def orders(self, q, body):
+        try:
+            filters = dict(date_from=parse_day(q.get("from")), date_to=parse_day(q.get("to")),
+                           payment=q.get("payment", "All"), order_type=q.get("type", "All"),
+                           customer=q.get("customer", ""))
+        except ValueError:
+            raise HttpError(400, "from/to must be YYYY-MM-DD")
+        rows = await self.call(self.service.history, filters,
+                               before=_int(q, "before"), after=_int(q, "after"),
+                               limit=_int(q, "limit", PAGE_SIZE, 1, MAX_LIMIT))
+        keys = ("id", "reference_no", "order_date", "order_type", "payment_method",
+                "subtotal", "tax", "discount", "service_charge", "total", "customer_name")
+        return 200, [dict(zip(keys, r)) for r in rows]
+
+    async def order(self, q, body, order_id):
+        return 200, await self.call(self.service.order, int(order_id))
+
+    async def sales(self, q, body):
+        rows = await self.call(self.service.sales, q.get("period", "monthly"))
+        return 200, [dict(period=r[0], total=r[1]) for r in rows]
+
+    async def top_items(self, q, body):
+        rows = await self.call(self.service.top_items, _int(q, "limit", 50, 1, MAX_LIMIT))
+        return 200, [dict(name=r[0], quantity=r[1], revenue=r[2]) for r in rows]
+
+    async def analytics(self, q, body, report):
+        try:
+            date_from, date_to = parse_day(q.get("from")), parse_day(q.get("to"))
+        except ValueError:
+            raise HttpError(400, "from/to must be YYYY-MM-DD")
+        opts = {}
+        if report == "payment_mix" and q.get("period"):
+            opts["period"] = q["period"]
+        if report == "sold_together":
+            opts["limit"] = _int(q, "limit", 100, 1, MAX_LIMIT)
+        header, rows = await self.call(self.service.analytics, report, date_from and date_from.date(),
+                                       date_to and date_to.date(), **opts)
+        return 200, [dict(zip(header, r)) for r in rows]
+
+    async def find_customers(self, q, body):
+        hits = await self.call(self.service.find_customers, q.get("q", ""), _int(q, "limit", 8, 1, 50))
+        return 200, [c.as_dict() for c in hits]
+
+    async def customer(self, q, body, mobile):
+        c = await self.call(self.service.customer, mobile)
+        return 200, c.as_dict()
+
+    async def shifts(self, q, body):
+        rows = await self.call(self.service.recent_shifts, _int(q, "limit", 20, 1, MAX_LIMIT))
+        keys = ("shift", "opened", "closed", "orders", "total")
+        return 200, [dict(zip(keys, r)) for r in rows]
+
+    async def shift(self, q, body, shift_id):
+        return 200, await self.call(self.service.shift, None if shift_id == "current" else int(shift_id))
+
+    async def close_shift(self, q, body):
+        return 200, await self.call(self.service.close_shift, str(body.get("closed_by") or ""),
+                                    body.get("counted_cash"))
+
+    async def verify_shift(self, q, body, shift_id):
+        return 200, await self.call(self.service.verify_shift, None if shift_id == "current" else int(shift_id))
+
+    async def parked(self, q, body):
+        rows = await self.call(self.service.parked_orders)
+        keys = ("reference_no", "created", "attempts", "last_error")
+        return 200, [dict(zip(keys, r)) for r in rows]
+
+    async def requeue(self, q, body):
+        return 200, dict(requeued=await self.call(self.service.requeue_parked, body.get("refs")))
+
+    # --------------------- HTTP ---------------------
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        allowed = False
+        for m, rx, handler in self.routes:
+            match = rx.fullmatch(url.path.rstrip("/") or "/")
+            if match:
+                if m == method:
+                    return await handler(q, body, *match.groups())
+                allowed = True
+        if allowed:
+            raise HttpError(405, f"{method} not allowed on {url.path}")
+        raise HttpError(404, f"no route for {url.path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                conn_hdr = headers.get("connection", "").lower()
+                keep = conn_hdr != "close" if version == "HTTP/1.1" else conn_hdr == "keep-alive"
+                if _body_length(headers) is None:
+                    keep = False        # the body is left unread, so the stream is out of step
+                status, payload = await self._respond(method, target, headers, reader)
+                data = json.dumps(payload, default=_json_default).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, target, headers, reader):
+        try:
+            length = _body_length(headers)
+            if length is None:
+                if (headers.get("content-length") or "").isdigit():
+                    raise HttpError(413, "request body too large")
+                raise HttpError(400, "bad Content-Length")
+            body = {}
+            if length:
+                raw = await reader.readexactly(length)
+                try:
+                    body = json.loads(raw)
+                except ValueError:
+                    raise HttpError(400, "body is not valid JSON")
+                if not isinstance(body, dict):
+                    raise HttpError(400, "body must be a JSON object")
+            return await self.dispatch(method, target, body)
+        except HttpError as e:
+            return e.status, dict(error=str(e))
+        except NotFound as e:
+            return 404, dict(error=str(e))
+        except ServiceError as e:
+            return 400, dict(error=str(e))
+        except PoolTimeout as e:
+            return 503, dict(error=str(e))
+        except asyncio.IncompleteReadError:
+            raise
+        except Exception as e:
+            return 500, dict(error=f"{type(e).__name__}: {e}")
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+# ------------------------- CLI -------------------------------
+def build(args):
+    """(service, pool) for the command-line options."""
+    if args.sqlite:
+        import sqlite_store
+        with sqlite_store.connect(args.sqlite) as conn:
+            sqlite_store.create_schema(conn)
+            caps = sqlite_store.detect_schema(conn)
+        pool = ConnectionPool(lambda: sqlite_store.connect(args.sqlite), size=args.workers, name="sqlite")
+        connect, schema = pool.connection, lambda: caps
+        archive, pricing = args.archive, args.pricing
+    else:
+        from main import ARCHIVE, PRICING, db_conn, db_pool, db_schema
+        pool, connect, schema = db_pool(), db_conn, db_schema
+        archive = args.archive or ARCHIVE["path"]
+        pricing = args.pricing or PRICING["path"]
+    journal = ledger = None
+    if args.journal:
+        from journal import OrderJournal
+        journal = OrderJournal(args.journal, terminal=args.terminal)
+    elif args.shifts:
+        from shifts import open_ledger
+        ledger = open_ledger(args.shifts, args.terminal)
+    return BillingService(connect, schema, journal=journal, terminal=args.terminal, archive=archive,
+                          ledger=ledger, pricing=pricing), pool
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Billing HTTP API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--terminal", type=int, required=True,
+                    help=f"terminal id for references (0-{MAX_TERMINAL}), unique among tills and API processes")
+    ap.add_argument("--workers", type=int, default=4, help="I/O threads (match the DB pool size)")
+    ap.add_argument("--sqlite", help="serve a local SQLite database instead of MySQL")
+    ap.add_argument("--journal", help="journal checkouts locally and sync in the background")
+    ap.add_argument("--shifts", help="keep shift totals in this SQLite file (implied by --journal)")
+    ap.add_argument("--pricing", help="pricing rules JSON (default: PRICING in main.py for MySQL)")
+    ap.add_argument("--archive", help="archived months directory (default: ARCHIVE in main.py for MySQL)")
+    args = ap.parse_args(argv)
+    if not 0 <= args.terminal <= MAX_TERMINAL:
+        ap.error(f"--terminal must be 0..{MAX_TERMINAL}")
+
+    service, pool = build(args)
+    syncer = None
+    if service.journal is not None:
+        from journal import Syncer
+        forget = None
+        if not args.sqlite:
+            from main import forget_schema as forget
+        syncer = Syncer(service.journal, service.connect, service.schema, forget_schema=forget)
+        syncer.start()
+    api = BillingAPI(service, workers=args.workers, pool=pool, syncer=syncer)
+    print(f"billing API on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if syncer is not None:
+            syncer.stop()
+        if pool is not None:
+            pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""Move closed months out of the hot ``orders`` / ``order_items`` tables.
+
+    python archive.py [--keep-months 12] [--dry-run]   # archive every month older than that
+    python archive.py --list
+    python archive.py --sqlite bench.db --path bench_archive ...
+
+Each archived month is a directory ``<path>/YYYY-MM/`` with one file per
+column:
+
+- numeric columns (ids, timestamps, type/payment codes, money in paise, GST
+  in basis points) are plain ``.npy`` arrays. They are memory-mapped on
+  read, so scans such as rollup rebuilds and analytics touch only the
+  columns they use, with no copy or parse;
+- text columns (reference, customer, mobile, item name and category) are an offsets
+  array plus one zlib-compressed UTF-8 blob, decompressed only when a bill
+  or the order-detail CSV needs them;
+- ``meta.json`` holds the row counts, id range and totals used to verify
+  the month before its rows are deleted from MySQL.
+
+Each line keeps the item name and category it was sold under (see
+``order_store.item_name_sql``); months archived before the category was
+kept read it as None, and its rule discount (``order_items.discount``, zero
+in months archived before lines kept one). The daily rollups are left in place,
+so the Reports tab's sales and top-items CSVs keep covering archived
+months with no change. ``rollup.rebuild(..., archive=)`` adds the archived
+days back after recomputing from the hot tables. ``BillingService.order`` (which needs no
+database for an archived order), the order-detail export and analytics read
+archived months transparently.
+
+A month is written to a temporary directory, re-read and checked against
+what was selected, swapped in, and only then deleted from the hot tables in
+small batches. Orders that reach an archived month later (a late journal
+sync) are merged into it on the next run. If a run dies between moving the
+old month aside and moving the new one in, the next run puts the old one
+back first. Needs NumPy, as analytics.py does.
+"""
+import argparse
+import json
+import os
+import shutil
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:         # archiving / archived reads only
+    np = None
+    HAVE_NUMPY = False
+
+from order_store import item_name_sql, reference_sql
+
+DELETE_BATCH = 1000
+ORDER_TEXT = ("reference_no", "customer_name", "customer_mobile")
+ORDER_MONEY = ("subtotal", "tax", "discount", "service_charge", "total")
+
+
+def _require():
+    if not HAVE_NUMPY:
+        raise RuntimeError("the order archive needs NumPy (pip install numpy)")
+
+
+def _month(d, n=0):
+    m = d.year * 12 + d.month - 1 + n
+    return date(m // 12, m % 12 + 1, 1)
+
+
+def _paise(values):
+    return np.array([int((Decimal(v or 0) * 100).to_integral_value()) for v in values], dtype=np.int64)
+
+
+def _rupees(paise):
+    return Decimal(int(paise)) / 100
+
+
+# ------------------------- MONTH FILES -----------------------
+class ArchiveMonth:
+    """One archived month; columns are loaded (memory-mapped) on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ino = os.stat(path).st_ino
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.month = self.meta["month"]
+        self.min_id, self.max_id = self.meta["min_id"], self.meta["max_id"]
+        self.has_category = os.path.isfile(os.path.join(path, "order_items.category.txt.z"))
+        self.has_discount = os.path.isfile(os.path.join(path, "order_items.discount.npy"))
+        self._cols = {}
+        self._text = {}
+
+    def col(self, name):
+        a = self._cols.get(name)
+        if a is None:
+            _require()
+            a = self._cols[name] = np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+        return a
+
+    def text(self, name, i):
+        blob = self._text.get(name)
+        if blob is None:
+            with open(os.path.join(self.path, name + ".txt.z"), "rb") as f:
+                blob = self._text[name] = zlib.decompress(f.read())
+        off = self.col(name + ".offsets")
+        return blob[off[i]:off[i + 1]].decode("utf-8")
+
+    def line_discount(self, lines=slice(None)):
+        """``order_items.discount`` (paise) of ``lines``; zeros for older months."""
+        if self.has_discount:
+            return self.col("order_items.discount")[lines]
+        return np.zeros(len(self.col("order_items.quantity")[lines]), dtype=np.int64)
+
+    def label(self, name, code):
+        return self.meta["labels"][name][int(code)]
+
+    def __len__(self):
+        return self.meta["orders"]
+
+    # --------------------- rows ---------------------
+    def lines(self, i):
+        """(lo, hi) line rows of order row ``i``."""
+        oid = self.col("orders.id")[i]
+        ref = self.col("order_items.order_id")
+        return int(np.searchsorted(ref, oid, "left")), int(np.searchsorted(ref, oid, "right"))
+
+    def order_row(self, i):
+        c = self.col
+        row = dict(id=int(c("orders.id")[i]), order_date=c("orders.order_date")[i].item(),
+                   order_type=self.label("order_type", c("orders.order_type")[i]),
+                   payment_method=self.label("payment_method", c("orders.payment_method")[i]))
+        for name in ORDER_MONEY:
+            row[name] = _rupees(c("orders." + name)[i])
+        for name in ORDER_TEXT:
+            row[name] = self.text("orders." + name, i) or None
+        return row
+
+    def item_rows(self, lo, hi):
+        c = self.col
+        return [dict(menu_item_id=int(c("order_items.menu_item_id")[j]), quantity=int(c("order_items.quantity")[j]),
+                     price=_rupees(c("order_items.price")[j]), gst=Decimal(int(c("order_items.gst")[j])) / 100,
+                     item_name=self.text("order_items.item_name", j),
+                     category=(self.text("order_items.category", j) or None) if self.has_category else None,
+                     discount=_rupees(c("order_items.discount")[j]) if self.has_discount else Decimal(0))
+                for j in range(lo, hi)]
+
+    def find(self, order_id):
+        """(order dict, item dicts) or None."""
+        ids = self.col("orders.id")
+        i = int(np.searchsorted(ids, order_id))
+        if i >= len(ids) or ids[i] != order_id:
+            return None
+        return self.order_row(i), self.item_rows(*self.lines(i))
+
+    def rows(self):
+        """Every order as ``(order dict, item dicts)``; used to merge late orders."""
+        for i in range(len(self)):
+            yield self.order_row(i), self.item_rows(*self.lines(i))
+
+    # --------------------- scans ---------------------
+    def _mask(self, date_from, date_to):
+        ts = self.col("orders.order_date")
+        mask = np.ones(len(ts), dtype=bool)
+        if date_from:
+            mask &= ts >= np.datetime64(date_from, "s")
+        if date_to:
+            mask &= ts < np.datetime64(date_to + timedelta(days=1), "s")
+        return mask
+
+    def daily(self, date_from=None, date_to=None):
+        """sales_daily rows: (day, payment, orders, subtotal, tax, discount, service, total)."""
+        mask = self._mask(date_from, date_to)
+        day = self.col("orders.order_date")[mask].astype("datetime64[D]")
+        pay = self.col("orders.payment_method")[mask]
+        keys, idx = np.unique(day.astype(np.int64) * 16 + pay, return_inverse=True)
+        sums = [np.bincount(idx, weights=self.col("orders." + n)[mask], minlength=len(keys)) for n in ORDER_MONEY]
+        counts = np.bincount(idx, minlength=len(keys))
+        return [(date(1970, 1, 1) + timedelta(days=int(k // 16)), self.label("payment_method", k % 16), int(counts[j]))
+                + tuple(_rupees(round(s[j])) for s in sums) for j, k in enumerate(keys)]
+
+    def daily_items(self, date_from=None, date_to=None):
+        """sales_daily_items rows: (day, menu_item_id, payment, quantity, gross, tax)."""
+        rows = np.searchsorted(self.col("orders.id"), self.col("order_items.order_id"))
+        keep = self._mask(date_from, date_to)[rows]
+        rows = rows[keep]
+        day = self.col("orders.order_date")[rows].astype("datetime64[D]").astype(np.int64)
+        pay = self.col("orders.payment_method")[rows].astype(np.int64)
+        item = self.col("order_items.menu_item_id")[keep]
+        qty = self.col("order_items.quantity")[keep].astype(np.int64)
+        gross = qty * self.col("order_items.price")[keep] - self.line_discount(keep)
+        tax = gross * self.col("order_items.gst")[keep]            # paise x basis points
+        keys, idx = np.unique(np.stack([day, item, pay]), axis=1, return_inverse=True)
+        idx = idx.ravel()
+        q = np.bincount(idx, weights=qty, minlength=keys.shape[1])
+        g = np.bincount(idx, weights=gross, minlength=keys.shape[1])
+        t = np.bincount(idx, weights=tax, minlength=keys.shape[1])
+        return [(date(1970, 1, 1) + timedelta(days=int(keys[0, j])), int(keys[1, j]),
+                 self.label("payment_method", keys[2, j]), int(q[j]), _rupees(round(g[j])),
+                 (Decimal(round(t[j])) / 1000000).quantize(Decimal("0.0001"))) for j in range(keys.shape[1])]
+
+    def analytics_columns(self, date_from=None, date_to=None):
+        """Columns in analytics.load's layout, restricted to the date range."""
+        mask = self._mask(date_from, date_to)
+        ts = self.col("orders.order_date")[mask].astype(np.int64)
+        days = ts // 86400
+        labels = self.meta["labels"]
+        money = {n: self.col("orders." + n)[mask] / 100 for n in ("subtotal", "discount", "service_charge", "total")}
+        ids = self.col("orders.id")[mask]
+        lines = np.flatnonzero(np.isin(self.col("order_items.order_id"), ids))
+        item = np.asarray(self.col("order_items.menu_item_id")[lines])
+        first = np.unique(item, return_index=True)[1]
+        return dict(
+            id=np.asarray(ids), day=(days + 719528).astype(np.int32), hour=((ts % 86400) // 3600).astype(np.int8),
+            weekday=((days + 3) % 7).astype(np.int8),
+            type=np.asarray(labels["order_type"], dtype=object)[self.col("orders.order_type")[mask]],
+            pay=np.asarray(labels["payment_method"], dtype=object)[self.col("orders.payment_method")[mask]],
+            subtotal=money["subtotal"], discount=money["discount"], service=money["service_charge"],
+            total=money["total"], line_order=np.asarray(self.col("order_items.order_id")[lines]), item=item,
+            qty=np.asarray(self.col("order_items.quantity")[lines]), price=self.col("order_items.price")[lines] / 100,
+            names={int(item[j]): self.text("order_items.item_name", int(lines[j])) for j in first})
+
+    def detail_rows(self, date_from=None, date_to=None):
+        """Rows in exports.DETAIL_HEADER layout."""
+        for i in np.flatnonzero(self._mask(date_from, date_to)):
+            o = self.order_row(i)
+            dt = o["order_date"].strftime("%Y-%m-%d %H:%M:%S")
+            lo, hi = self.lines(i)
+            for it in self.item_rows(lo, hi):
+                yield (o["id"], o["reference_no"], dt, o["order_type"], o["payment_method"], o["customer_name"],
+                       o["customer_mobile"] or "", it["menu_item_id"], it["item_name"], it["quantity"],
+                       f"{it['price']:.2f}", f"{it['gst']:.2f}", f"{it['price'] * it['quantity']:.2f}",
+                       f"{o['subtotal']:.2f}", f"{o['tax']:.2f}", f"{o['discount']:.2f}",
+                       f"{o['service_charge']:.2f}", f"{o['total']:.2f}")
+
+
+def _write_text(path, name, values):
+    data = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in data], out=offsets[1:])
+    np.save(os.path.join(path, name + ".offsets.npy"), offsets)
+    with open(os.path.join(path, name + ".txt.z"), "wb") as f:
+        f.write(zlib.compress(b"".join(data), 6))
+
+
+def write_month(path, month, orders, items):
+    """Write ``orders`` (dicts, id order) and ``items`` (dicts with order_id,
+    grouped by order) as one month directory at ``path``."""
+    _require()
+    os.makedirs(path)
+    labels = {}
+    for name in ("order_type", "payment_method"):
+        labels[name] = sorted({o[name] for o in orders})
+        code = {v: i for i, v in enumerate(labels[name])}
+        np.save(os.path.join(path, f"orders.{name}.npy"), np.array([code[o[name]] for o in orders], dtype=np.int8))
+    np.save(os.path.join(path, "orders.id.npy"), np.array([o["id"] for o in orders], dtype=np.int64))
+    np.save(os.path.join(path, "orders.order_date.npy"),
+            np.array([o["order_date"] for o in orders], dtype="datetime64[s]"))
+    for name in ORDER_MONEY:
+        np.save(os.path.join(path, f"orders.{name}.npy"), _paise(o.get(name) for o in orders))
+    for name in ORDER_TEXT:
+        _write_text(path, "orders." + name, [o.get(name) for o in orders])
+    np.save(os.path.join(path, "order_items.order_id.npy"), np.array([i["order_id"] for i in items], dtype=np.int64))
+    np.save(os.path.join(path, "order_items.menu_item_id.npy"),
+            np.array([i["menu_item_id"] for i in items], dtype=np.int64))
+    np.save(os.path.join(path, "order_items.quantity.npy"), np.array([i["quantity"] for i in items], dtype=np.int32))
+    np.save(os.path.join(path, "order_items.price.npy"), _paise(i["price"] for i in items))
+    np.save(os.path.join(path, "order_items.gst.npy"), _paise(i["gst"] for i in items).astype(np.int32))
+    _write_text(path, "order_items.item_name", [i["item_name"] for i in items])
+    _write_text(path, "order_items.category", [i.get("category") for i in items])
+    np.save(os.path.join(path, "order_items.discount.npy"), _paise(i.get("discount") for i in items))
+    meta = dict(month=month, orders=len(orders), items=len(items), labels=labels,
+                min_id=orders[0]["id"] if orders else 0, max_id=orders[-1]["id"] if orders else 0,
+                total_paise=int(_paise(o["total"] for o in orders).sum()),
+                quantity=sum(int(i["quantity"]) for i in items), written=datetime.now().isoformat(timespec="seconds"))
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+
+# ------------------------- ARCHIVE ---------------------------
+class Archive:
+    """The archive directory; month directories are opened on first use."""
+
+    def __init__(self, root):
+        self.root = root
+        self._months = {}
+        self._seen = None
+
+    def months(self):
+        """Archived months ("YYYY-MM"), oldest first."""
+        try:
+            stamp = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if stamp != self._seen:
+            names = sorted(n for n in os.listdir(self.root)
+                           if len(n) == 7 and n[4] == "-" and os.path.isfile(os.path.join(self.root, n, "meta.json")))
+            months = {}
+            for n in names:
+                old = self._months.get(n)
+                path = os.path.join(self.root, n)
+                # a re-archived month is a new directory; drop maps of the old one
+                months[n] = old if old is not None and old.ino == os.stat(path).st_ino else ArchiveMonth(path)
+            self._months = months
+            self._seen = stamp
+        return list(self._months)
+
+    def month(self, name):
+        self.months()
+        return self._months.get(name)
+
+    def covering(self, date_from=None, date_to=None):
+        lo = f"{date_from:%Y-%m}" if date_from else ""
+        hi = f"{date_to:%Y-%m}" if date_to else "9999-99"
+        return [self._months[m] for m in self.months() if lo <= m <= hi]
+
+    def archived_until(self):
+        """First day after the newest archived month, or None."""
+        months = self.months()
+        if not months:
+            return None
+        y, m = map(int, months[-1].split("-"))
+        return _month(date(y, m, 1), 1)
+
+    def covers(self, date_from, date_to):
+        """True if [date_from, date_to] lies wholly in archived months."""
+        months = self.months()
+        return bool(months and date_from and date_to and f"{date_from:%Y-%m}" >= months[0]
+                    and date_to < self.archived_until())
+
+    def find_order(self, order_id):
+        for m in self.months():
+            month = self._months[m]
+            if month.min_id <= order_id <= month.max_id:
+                hit = month.find(order_id)
+                if hit is not None:
+                    return hit
+        return None
+
+    def detail_rows(self, date_from=None, date_to=None):
+        for month in self.covering(date_from, date_to):
+            yield from month.detail_rows(date_from, date_to)
+
+
+def open_archive(path):
+    """The ``Archive`` at ``path``, or None if nothing was archived there yet."""
+    return Archive(path) if os.path.isdir(path) else None
+
+
+# ------------------------- ARCHIVING -------------------------
+def closed_months(conn, keep_months, today=None):
+    """First days of months with hot orders, older than ``keep_months`` full months."""
+    cutoff = _month(today or date.today(), -keep_months)
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT DATE_FORMAT(order_date, '%Y-%m') FROM orders WHERE order_date < %s",
+                (datetime.combine(cutoff, datetime.min.time()),))
+    return sorted(date(int(m[:4]), int(m[5:7]), 1) for (m,) in cur.fetchall())
+
+
+def _fetch(conn, caps, start):
+    lo = datetime.combine(start, datetime.min.time())
+    hi = datetime.combine(_month(start, 1), datetime.min.time())
+    mobile = "customer_mobile" if caps.has("orders", "customer_mobile") else "NULL"
+    service = "COALESCE(service_charge,0)" if caps.has("orders", "service_charge") else "0"
+    cur = conn.cursor(dictionary=True)
+    cur.execute(
+        f"""
+        SELECT id, order_date, order_type, payment_method, subtotal, tax, discount, {service} AS service_charge,
+               total, customer_name, {mobile} AS customer_mobile, {reference_sql(caps)} AS reference_no
+        FROM orders WHERE order_date >= %s AND order_date < %s ORDER BY id
+        """, (lo, hi))
+    orders = cur.fetchall()
+    name, join = item_name_sql(caps)
+    category = "oi.category" if caps.has("order_items", "category") else ("m.category" if join else "NULL")
+    discount = "oi.discount" if caps.has("order_items", "discount") else "0"
+    cur.execute(
+        f"""
+        SELECT oi.order_id, oi.menu_item_id, oi.quantity, oi.price, oi.gst, {name} AS item_name,
+               {category} AS category, {discount} AS discount
+        FROM order_items oi JOIN orders o ON o.id = oi.order_id{join}
+        WHERE o.order_date >= %s AND o.order_date < %s ORDER BY oi.order_id, oi.id
+        """, (lo, hi))
+    return orders, cur.fetchall()
+
+
+def _restore(root, name):
+    """Put back ``.YYYY-MM.old`` if a run died before its replacement was moved in."""
+    final, bak = os.path.join(root, name), os.path.join(root, f".{name}.old")
+    if os.path.isdir(bak) and not os.path.exists(final):
+        os.rename(bak, final)
+
+
+def archive_month(conn, caps, archive, start, dry_run=False, log=print):
+    """Archive one calendar month (``start`` = its first day); returns orders moved."""
+    name = f"{start:%Y-%m}"
+    if not dry_run:
+        _restore(archive.root, name)
+    orders, items = _fetch(conn, caps, start)
+    if not orders:
+        return 0
+    log(f"{name}: {len(orders):,} orders, {len(items):,} lines" + (" (dry run)" if dry_run else ""))
+    if dry_run:
+        return len(orders)
+    hot_ids = [o["id"] for o in orders]
+    old = archive.month(name)
+    if old is not None:                     # late orders for an archived month: merge
+        hot = set(hot_ids)                  # an order in both (a run died mid-delete) is kept once
+        for o, its in old.rows():
+            if o["id"] in hot:
+                continue
+            orders.append(o)
+            items.extend(dict(it, order_id=o["id"]) for it in its)
+        orders.sort(key=lambda o: o["id"])
+        items.sort(key=lambda i: i["order_id"])     # stable: keeps line order within an order
+
+    final = os.path.join(archive.root, name)
+    tmp, bak = os.path.join(archive.root, f".{name}.tmp"), os.path.join(archive.root, f".{name}.old")
+    for p in (tmp, bak):
+        shutil.rmtree(p, ignore_errors=True)
+    meta = write_month(tmp, name, orders, items)
+    check = ArchiveMonth(tmp)
+    ids = np.asarray(check.col("orders.id"))
+    if (len(check) != len(orders) or len(np.unique(ids)) != len(ids) or int(np.asarray(check.col("orders.total")).sum()) != meta["total_paise"]
+            or int(np.asarray(check.col("order_items.quantity")).sum()) != meta["quantity"]
+            or not np.isin(hot_ids, ids).all()):
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise RuntimeError(f"{name}: archive verification failed; hot rows left in place")
+    if old is not None:
+        os.rename(final, bak)
+    os.rename(tmp, final)
+    shutil.rmtree(bak, ignore_errors=True)
+
+    cur = conn.cursor()
+    for i in range(0, len(hot_ids), DELETE_BATCH):
+        chunk = hot_ids[i:i + DELETE_BATCH]
+        marks = ",".join(["%s"] * len(chunk))
+        cur.execute(f"DELETE FROM order_items WHERE order_id IN ({marks})", chunk)
+        cur.execute(f"DELETE FROM orders WHERE id IN ({marks})", chunk)
+        conn.commit()
+    return len(hot_ids)
+
+
+def archive_closed(conn, caps, archive, keep_months=12, dry_run=False, log=print):
+    _require()
+    os.makedirs(archive.root, exist_ok=True)
+    return sum(archive_month(conn, caps, archive, m, dry_run, log) for m in closed_months(conn, keep_months))
+
+
+# ------------------------- CLI -------------------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Archive closed months of orders to columnar files.")
+    ap.add_argument("--keep-months", type=int, help="full months to keep hot (default: ARCHIVE in main.py)")
+    ap.add_argument("--path", help="archive directory (default: ARCHIVE in main.py)")
+    ap.add_argument("--dry-run", action="store_true", help="only report what would be archived")
+    ap.add_argument("--list", action="store_true", help="list archived months")
+    ap.add_argument("--sqlite", help="use a SQLite stand-in database instead of MySQL")
+    args = ap.parse_args(argv)
+
+    if args.sqlite:
+        import sqlite_store
+        conn = sqlite_store.connect(args.sqlite)
+        caps = sqlite_store.detect_schema(conn)
+        path, keep = args.path or "archive", 12
+    else:
+        from main import ARCHIVE, db_conn, db_schema
+        conn, caps = db_conn(), db_schema()
+        path, keep = args.path or ARCHIVE["path"], ARCHIVE["keep_months"]
+    keep = keep if args.keep_months is None else args.keep_months
+    archive = Archive(path)
+    with conn:
+        if args.list:
+            for name in archive.months():
+                m = archive.month(name).meta
+                print(f"{name}  {m['orders']:>9,} orders  {m['items']:>10,} lines  "
+                      f"ids {m['min_id']}-{m['max_id']}  total {_rupees(m['total_paise'])}")
+            return
+        n = archive_closed(conn, caps, archive, keep, args.dry_run)
+    print(f"{n:,} orders {'would be ' if args.dry_run else ''}archived to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Batch bill export for end-of-day / GST archiving.
+
+Orders are selected by id range or date range and read in keyset chunks:
+one query for a chunk of orders, one for all of their items. Rendering is
+spread over a process pool, so PDF generation uses every core. Output goes to
+a dated directory or a single zip file. Only a bounded number of render
+tasks is in flight, so memory stays flat for any number of bills.
+
+The pool uses the "spawn" start method: the POS calls this from a worker
+thread while the syncer, the DB pool and metrics run on others, and a forked
+child could inherit one of their locks held and hang.
+"""
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+
+import bills
+from order_store import SchemaCaps, item_name_sql, reference_for
+
+FETCH_CHUNK = 500      # orders per DB round trip
+TASK_BILLS = 25        # bills per process-pool task
+
+
+class BatchResult:
+    __slots__ = ("bills", "files", "seconds", "output")
+
+    def __init__(self, output):
+        self.bills = self.files = 0
+        self.seconds = 0.0
+        self.output = output
+
+    @property
+    def rate(self):
+        return self.bills / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f"{self.bills} bills / {self.files} files in {self.seconds:.1f}s "
+                f"({self.rate:,.1f} bills/s)\n{self.output}")
+
+
+# ------------------------- SELECTION -------------------------
+def _where(id_from=None, id_to=None, date_from=None, date_to=None):
+    where, params = [], []
+    if id_from is not None:
+        where.append("id >= %s"); params.append(int(id_from))
+    if id_to is not None:
+        where.append("id <= %s"); params.append(int(id_to))
+    if date_from:
+        where.append("order_date >= %s"); params.append(datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        where.append("order_date < %s"); params.append(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return where, params
+
+
+def count_orders(conn, **sel):
+    where, params = _where(**sel)
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM orders" + (" WHERE " + " AND ".join(where) if where else ""), tuple(params))
+    return int(cur.fetchone()[0] or 0)
+
+
+def iter_bill_chunks(conn, chunk=FETCH_CHUNK, caps=None, **sel):
+    """Yield lists of bill dicts, ``chunk`` orders at a time, in id order."""
+    name, join = item_name_sql(caps or SchemaCaps.detect(conn))
+    where, params = _where(**sel)
+    last = 0
+    cur = conn.cursor(dictionary=True)
+    while True:
+        cur.execute(
+            "SELECT * FROM orders WHERE " + " AND ".join(where + ["id > %s"])
+            + f" ORDER BY id LIMIT {int(chunk)}", tuple(params + [last])
+        )
+        orders = cur.fetchall()
+        if not orders:
+            return
+        ids = [o["id"] for o in orders]
+        cur.execute(
+            f"""
+            SELECT oi.order_id, oi.quantity, oi.price, oi.gst, {name} AS item_name
+            FROM order_items oi{join}
+            WHERE oi.order_id IN ({",".join(["%s"] * len(ids))})
+            ORDER BY oi.order_id, oi.id
+            """, tuple(ids)
+        )
+        items = {}
+        for it in cur.fetchall():
+            items.setdefault(it["order_id"], []).append(it)
+        yield [bills.bill_data(o, items.get(o["id"], []),
+                               o.get("reference_no") or reference_for(o["id"], o["order_date"]))
+               for o in orders]
+        last = ids[-1]
+
+
+# ------------------------- RENDERING -------------------------
+def _render_task(batch, formats, outdir):
+    """Runs in a pool process. Writes files into ``outdir``, or returns
+    (name, bytes) pairs when ``outdir`` is None (zip mode). Renders without
+    ``bills.render``'s metrics span: a child's metrics are never reported."""
+    out = []
+    for data in batch:
+        base = f"bill_{data['reference_no']}"
+        for fmt in formats:
+            blob = bills.RENDERERS[fmt](data)
+            if outdir is None:
+                out.append((f"{base}.{fmt}", blob))
+            else:
+                with open(os.path.join(outdir, f"{base}.{fmt}"), "wb") as f:
+                    f.write(blob)
+                out.append((f"{base}.{fmt}", None))
+    return len(batch), out
+
+
+def export_bills(conn, dest_root=".", formats=bills.FORMATS, as_zip=False, workers=None,
+                 progress=None, caps=None, **sel):
+    """Export every order matching ``sel`` (id_from/id_to/date_from/date_to).
+
+    ``progress(done, total)`` is called from this thread as bills complete.
+    ``caps`` (SchemaCaps) is detected from ``conn`` when not given.
+    """
+    formats = tuple(f for f in formats if f in bills.RENDERERS)
+    if not formats:
+        raise ValueError("no export format selected")
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    name = f"bills_{stamp}"
+    output = os.path.join(dest_root, name + (".zip" if as_zip else ""))
+    res = BatchResult(output)
+    total = count_orders(conn, **sel)
+    t0 = time.perf_counter()
+
+    if as_zip:
+        zf = zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED)
+        outdir = None
+    else:
+        os.makedirs(output, exist_ok=True)
+        zf, outdir = None, output
+
+    workers = workers or os.cpu_count() or 1
+    max_inflight = workers * 4
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            inflight = set()
+
+            def collect(done_set):
+                for fut in done_set:
+                    n, files = fut.result()
+                    for fname, blob in files:
+                        if zf is not None:
+                            zf.writestr(f"{name}/{fname}", blob)
+                    res.bills += n
+                    res.files += len(files)
+                if progress:
+                    progress(res.bills, total)
+
+            for chunk in iter_bill_chunks(conn, caps=caps, **sel):
+                for i in range(0, len(chunk), TASK_BILLS):
+                    inflight.add(pool.submit(_render_task, chunk[i:i + TASK_BILLS], formats, outdir))
+                    if len(inflight) >= max_inflight:
+                        done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                        collect(done)
+            while inflight:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                collect(done)
+    finally:
+        if zf is not None:
+            zf.close()
+    res.seconds = time.perf_counter() - t0
+    return res
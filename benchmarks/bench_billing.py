@@ -0,0 +1,133 @@
+"""Load test for the billing hot paths, driven headlessly through BillingService.
+
+    python benchmarks/bench_billing.py --sqlite bench.db [--concurrency 8] [--seconds 5]
+    python benchmarks/bench_billing.py --mysql [--only checkout,history]
+
+Seed the database first (benchmarks/datagen.py). Each scenario runs
+``--concurrency`` threads against one shared service (one pool and one menu
+cache, as in api.py) for ``--seconds``. It prints p50/p95/p99 latency and
+throughput. Scenarios:
+
+    menu_search    catalog search-as-you-type (refresh_menu_tree)
+    menu_reload    full catalog reload from the DB
+    pricing_N      build + price a cart of N lines (recompute_totals)
+    checkout_N     save an order with N lines (save_order, direct to the DB)
+    history        newest page of Order History (refresh_orders_tree)
+    history_filter customer-prefix + payment filter
+    sales_<period> daily / weekly / monthly sales report (export_sales)
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api import build  # noqa: E402
+
+CART_SIZES = (1, 5, 20)
+QUERIES = ["", "p", "pa", "pan", "paneer", "chi", "tikka", "masala 1", "zzz"]
+
+
+def percentile(sorted_ms, p):
+    if not sorted_ms:
+        return 0.0
+    k = min(len(sorted_ms) - 1, max(0, round(p / 100 * (len(sorted_ms) - 1))))
+    return sorted_ms[k]
+
+
+def run(name, op, concurrency, seconds, warmup=3):
+    """Call ``op(rng)`` from ``concurrency`` threads for ``seconds``."""
+    for i in range(warmup):
+        op(random.Random(i))
+    lat, errors = [], []
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def worker(n):
+        rng = random.Random(n)
+        mine = []
+        while time.perf_counter() < stop:
+            t = time.perf_counter()
+            try:
+                op(rng)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            mine.append((time.perf_counter() - t) * 1000)
+        with lock:
+            lat.extend(mine)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(worker, range(concurrency)))
+    wall = time.perf_counter() - t0
+    lat.sort()
+    print(f"{name:<16} n={len(lat):>7,} {len(lat) / wall:>9,.1f}/s   "
+          f"p50 {percentile(lat, 50):8.2f}  p95 {percentile(lat, 95):8.2f}  p99 {percentile(lat, 99):8.2f} ms"
+          + (f"   errors={len(errors)} ({errors[0]!r})" if errors else ""))
+    return lat
+
+
+def scenarios(svc):
+    svc.refresh_menu(force=True)
+    menu_ids = [r[0] for r in svc.menu()]
+    if not menu_ids:
+        sys.exit("menu is empty - run benchmarks/datagen.py first")
+
+    def cart(rng, n):
+        return svc.build_cart((i, rng.randint(1, 3)) for i in rng.sample(menu_ids, min(n, len(menu_ids))))
+
+    out = {
+        "menu_search": lambda rng: svc.menu(rng.choice(QUERIES), "All"),
+        "menu_reload": lambda rng: svc.refresh_menu(force=True),
+    }
+    for n in CART_SIZES:
+        out[f"pricing_{n}"] = lambda rng, n=n: svc.price(cart(rng, n), rng.choice((0, 5, 10)), 5)
+    for n in CART_SIZES:
+        out[f"checkout_{n}"] = lambda rng, n=n: svc.checkout(
+            cart(rng, n), 0, 5, payment_method=rng.choice(("Cash", "Card", "UPI")),
+            customer_name=rng.choice(("Asha", "Ravi", "Meera")), customer_mobile="9876543210")
+    out["history"] = lambda rng: svc.history({})
+    out["history_filter"] = lambda rng: svc.history(dict(customer=rng.choice(("As", "Ra", "Me")),
+                                                         payment=rng.choice(("Cash", "UPI"))))
+    for period in ("daily", "weekly", "monthly"):
+        out[f"sales_{period}"] = lambda rng, p=period: svc.sales(p)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Billing hot-path load test.")
+    db = ap.add_mutually_exclusive_group(required=True)
+    db.add_argument("--sqlite", help="SQLite stand-in database (seed with datagen.py)")
+    db.add_argument("--mysql", action="store_true", help="the MySQL database from main.DB_CONFIG")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=3.0, help="per scenario")
+    ap.add_argument("--only", help="comma-separated scenario name prefixes")
+    args = ap.parse_args()
+
+    svc, pool = build(Namespace(sqlite=args.sqlite, workers=args.concurrency, journal=None, terminal=999,
+                                archive=None, shifts=None, pricing=None))
+    try:
+        table = scenarios(svc)
+        wanted = [s.strip() for s in args.only.split(",")] if args.only else None
+        print(f"backend={'sqlite:' + args.sqlite if args.sqlite else 'mysql'} "
+              f"concurrency={args.concurrency} seconds={args.seconds}")
+        for name, op in table.items():
+            if wanted and not any(name.startswith(w) for w in wanted):
+                continue
+            run(name, op, args.concurrency, args.seconds)
+        if pool is not None:
+            s = pool.stats()
+            print(f"pool: {s['checkouts']:,} checkouts, {s['waits']:,} waits, avg wait {s['avg_wait'] * 1000:.2f} ms")
+    finally:
+        if pool is not None and args.sqlite:
+            pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
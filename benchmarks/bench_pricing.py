@@ -0,0 +1,104 @@
+"""Pricing rule engine: compile time and per-cart latency.
+
+    python benchmarks/bench_pricing.py [--rules 1000] [--lines 100] [--menu 2000] [--carts 2000]
+
+Builds a synthetic menu and a rule file of ``--rules`` active rules (GST
+slabs, happy hours, combos, buy-X-get-Y and coupons spread over items and
+categories), then prices random carts of ``--lines`` lines with and without
+a coupon, against plain ``Cart.totals`` as the baseline. No database needed.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cart import Cart  # noqa: E402
+from pricing import compile_rules  # noqa: E402
+
+CATEGORIES = ["Starters", "Snacks", "Main Course", "Breads", "Rice", "Desserts", "Drinks", "Beverages",
+              "Soups", "Salads", "Combos", "Kids", "Chinese", "Tandoor", "Sides", "Specials"]
+NOW = datetime(2026, 10, 16, 18, 30)      # a Friday, inside most happy hours
+
+
+def menu(n, rng):
+    return [(i, f"Item {i:05d}", CATEGORIES[i % len(CATEGORIES)], rng.randrange(40, 600), rng.choice((0, 5, 12, 18)))
+            for i in range(1, n + 1)]
+
+
+def rules(n, items, rng):
+    """``n`` rule dicts; about a third name a category, the rest items."""
+    out = []
+    for k in range(n):
+        kind = ("gst", "happy_hour", "combo", "buy_get", "coupon")[k % 5]
+        scope = ({"category": rng.choice(CATEGORIES)} if rng.random() < 0.3
+                 else {"items": [rng.randrange(1, items + 1) for _ in range(rng.randint(1, 5))]})
+        spec = {"id": f"r{k}", "type": kind}
+        if kind == "gst":
+            spec.update(scope, rate=rng.choice((5, 12, 18, 28)))
+        elif kind == "happy_hour":
+            start = rng.randrange(12, 20)
+            spec.update(scope, pct=rng.choice((10, 15, 20, 25)), days=["Mon", "Wed", "Fri", "Sat"],
+                        **{"from": f"{start}:00", "to": f"{start + 2}:30"})
+        elif kind == "combo":
+            picked = rng.sample(range(1, items + 1), rng.randint(2, 3))
+            spec.update(items={str(i): rng.randint(1, 2) for i in picked}, price=rng.randrange(150, 700))
+        elif kind == "buy_get":
+            spec.update(scope, buy=rng.randint(1, 3), get=1)
+        else:
+            spec.update(scope, code=f"CODE{k}", pct=rng.choice((5, 10, 15)), max_off=200)
+        out.append(spec)
+    return out
+
+
+def carts(rows, lines, count, rng):
+    out = []
+    for _ in range(count):
+        cart = Cart()
+        for r in rng.sample(rows, lines):
+            cart.add(r[0], r[1], r[3], r[4], rng.randint(1, 4), category=r[2])
+        out.append(cart)
+    return out
+
+
+def timed(label, fn, batch):
+    ms = []
+    for item in batch:
+        t = time.perf_counter()
+        fn(item)
+        ms.append((time.perf_counter() - t) * 1000)
+    ms.sort()
+    print(f"{label:<28}{ms[len(ms) // 2]:>9.3f}{ms[int(len(ms) * 0.95)]:>9.3f}{ms[int(len(ms) * 0.99)]:>9.3f}"
+          f"{ms[-1]:>9.3f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rules", type=int, default=1000)
+    ap.add_argument("--lines", type=int, default=100)
+    ap.add_argument("--menu", type=int, default=2000)
+    ap.add_argument("--carts", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = menu(args.menu, rng)
+    specs = rules(args.rules, args.menu, rng)
+    t = time.perf_counter()
+    rs = compile_rules(specs)
+    print(f"compiled {len(rs)} rules in {(time.perf_counter() - t) * 1000:.1f} ms")
+    batch = carts(rows, args.lines, args.carts, rng)
+    codes = sorted(rs.coupons)
+
+    q = rs.price(batch[0], 5, 10, now=NOW)
+    print(f"sample cart: {len(q.notes())} trace notes, savings {q.savings}, total {q.totals.total}")
+    print(f"\n{args.lines}-line carts, ms:{'p50':>11}{'p95':>9}{'p99':>9}{'max':>9}")
+    timed("Cart.totals (no rules)", lambda c: c.totals(5, 10), batch)
+    timed("rules", lambda c: rs.price(c, 5, 10, now=NOW), batch)
+    timed("rules + coupon", lambda c: rs.price(c, 5, 10, rng.choice(codes), now=NOW), batch)
+
+
+if __name__ == "__main__":
+    main()
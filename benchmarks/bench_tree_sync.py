@@ -0,0 +1,96 @@
+"""Treeview refresh: delete-all/reinsert vs keyed TreeSync.
+
+    python benchmarks/bench_tree_sync.py [--menu 1000] [--cart 60] [--repeat 20]
+
+Needs a display (Tk window is created and withdrawn).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tree_sync import TreeSync  # noqa: E402
+
+COLS = ("ID", "Item", "Category", "Price", "GST%")
+
+
+def menu_rows(n):
+    cats = ["Starters", "Snacks", "Main Course", "Breads", "Desserts", "Drinks"]
+    return [(i, f"Item {i:05d}", cats[i % len(cats)], f"{50 + i % 400:.2f}", "5.00") for i in range(1, n + 1)]
+
+
+def rebuild(tree, rows):
+    for i in tree.get_children():
+        tree.delete(i)
+    for r in rows:
+        tree.insert("", "end", values=r)
+
+
+def scenario(root, name, steps, repeat):
+    """``steps`` is a list of row lists applied in sequence; time the last one."""
+    results = []
+    for mode in ("rebuild", "sync"):
+        tree = ttk.Treeview(root, columns=COLS, show="headings")
+        sync = TreeSync(tree)
+
+        def apply(rows):
+            if mode == "rebuild":
+                rebuild(tree, rows)
+            else:
+                sync.sync((r[0], r) for r in rows)
+
+        def run():
+            for rows in steps[:-1]:
+                apply(rows)
+            root.update_idletasks()
+            t0 = time.perf_counter()
+            apply(steps[-1])
+            root.update_idletasks()
+            return time.perf_counter() - t0
+
+        best = min(run() for _ in range(repeat)) * 1000
+        results.append(best)
+        tree.destroy()
+    print(f"{name:<38} rebuild {results[0]:8.2f} ms   sync {results[1]:8.2f} ms   x{results[0] / max(results[1], 1e-9):6.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--menu", type=int, default=1000)
+    ap.add_argument("--cart", type=int, default=60)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        sys.exit(f"needs a display: {e}")
+    root.withdraw()
+
+    menu = menu_rows(args.menu)
+    edited = list(menu)
+    k = random.randrange(len(edited))
+    edited[k] = edited[k][:3] + ("999.00", edited[k][4])
+    narrowed = [r for r in menu if "1" in r[1]]
+
+    cart = menu_rows(args.cart)
+    longer = cart + [(args.cart + 1, "New line", "Drinks", "40.00", "5.00")]
+    bumped = list(cart)
+    bumped[len(bumped) // 2] = bumped[len(bumped) // 2][:3] + ("1.00", "5.00")
+
+    print(f"menu={args.menu} cart={args.cart} repeat={args.repeat} (best of)")
+    scenario(root, f"menu: initial fill ({args.menu})", [menu], args.repeat)
+    scenario(root, "menu: refresh, nothing changed", [menu, menu], args.repeat)
+    scenario(root, "menu: one price edited", [menu, edited], args.repeat)
+    scenario(root, f"menu: search narrows to {len(narrowed)}", [menu, narrowed], args.repeat)
+    scenario(root, f"cart: add one line to {args.cart}", [cart, longer], args.repeat)
+    scenario(root, f"cart: edit one qty in {args.cart}", [cart, bumped], args.repeat)
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
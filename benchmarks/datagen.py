@@ -0,0 +1,142 @@
+"""Seed a database with a synthetic menu and order history for benchmarks.
+
+    python benchmarks/datagen.py --sqlite bench.db --orders 1000000 [--menu 300] [--days 365]
+    python benchmarks/datagen.py --mysql --orders 1000000      # DB_CONFIG from main.py
+
+Orders get 1-8 lines, a realistic payment/type mix and timestamps spread over
+the last ``--days`` days, with a lunch and dinner rush. Rows are written with
+batched ``executemany`` in one transaction per ``--batch`` orders. The daily
+rollups are rebuilt at the end. Deterministic for a given ``--seed``.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rollup  # noqa: E402
+from cart import Cart  # noqa: E402
+
+CATEGORIES = ["Starters", "Snacks", "Main Course", "Breads", "Rice", "Desserts", "Drinks"]
+WORDS = ["Paneer", "Chicken", "Veg", "Masala", "Tikka", "Butter", "Garlic", "Tandoori", "Spicy", "Classic",
+         "Special", "Mango", "Cold", "Hot", "Crispy", "Royal", "Kadai", "Malai", "Jeera", "Lemon"]
+NAMES = ["Asha", "Ravi", "Meera", "Arjun", "Priya", "Kiran", "Sanjay", "Divya", "Rahul", "Neha", "Vikram", "Anita"]
+HOURS = [1, 1, 1, 2, 3, 5, 12, 14, 10, 5, 4, 4, 6, 11, 13, 9, 4, 2]   # weights for 06:00..23:00
+
+
+def open_db(args):
+    """(connection, caps) for the chosen backend."""
+    if args.mysql:
+        from main import db_conn, db_schema
+        return db_conn(), db_schema()
+    import sqlite_store
+    conn = sqlite_store.connect(args.sqlite)
+    sqlite_store.create_schema(conn, seed_menu=False)
+    return conn, sqlite_store.detect_schema(conn)
+
+
+def seed_menu(conn, n, rng):
+    cur = conn.cursor()
+    cur.execute("SELECT id, item_name, category, price, gst FROM menu WHERE is_active=1")
+    rows = cur.fetchall()
+    if len(rows) >= n:
+        return rows
+    have = {r[1] for r in rows}
+    new = []
+    while len(have) + len(new) < n:
+        name = " ".join(rng.sample(WORDS, 2)) + f" {len(have) + len(new) + 1}"
+        cat = rng.choice(CATEGORIES)
+        gst = "18.00" if cat == "Drinks" else "5.00"
+        new.append((name, cat, f"{rng.randrange(20, 600)}.00", gst))
+    cur.executemany("INSERT INTO menu (item_name, category, price, gst) VALUES (%s,%s,%s,%s)", new)
+    conn.commit()
+    cur.execute("SELECT id, item_name, category, price, gst FROM menu WHERE is_active=1")
+    return cur.fetchall()
+
+
+def order_time(rng, start, days):
+    day = start + timedelta(days=rng.randrange(days))
+    hour = 6 + rng.choices(range(len(HOURS)), HOURS)[0]
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+
+def generate(conn, caps, menu, orders, days, batch, rng, progress=None):
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM orders")
+    next_id = int(cur.fetchone()[0]) + 1
+    start = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    has_service = caps.has("orders", "service_charge")
+    has_mobile = caps.has("orders", "customer_mobile")
+    cols = ["id", "order_type", "payment_method", "subtotal", "tax", "discount", "total",
+            "customer_name", "order_date"] + (["service_charge"] if has_service else []) \
+        + (["customer_mobile"] if has_mobile else [])
+    order_sql = f"INSERT INTO orders ({', '.join(cols)}) VALUES ({','.join(['%s'] * len(cols))})"
+    snap = caps.has("order_items", "item_name")
+    item_cols = ["order_id", "menu_item_id", "quantity", "price", "gst"] + (["item_name", "category"] if snap else [])
+    item_sql = f"INSERT INTO order_items ({', '.join(item_cols)}) VALUES ({','.join(['%s'] * len(item_cols))})"
+
+    done = 0
+    while done < orders:
+        n = min(batch, orders - done)
+        order_rows, item_rows = [], []
+        for oid in range(next_id, next_id + n):
+            cart = Cart()
+            for item in rng.sample(menu, rng.choice((1, 1, 2, 2, 3, 3, 4, 5, 6, 8))):
+                cart.add(item[0], item[1], item[3], item[4], rng.choice((1, 1, 1, 2, 2, 3)), category=item[2])
+            disc = rng.choice((0, 0, 0, 0, 5, 10))
+            svc = rng.choice((0, 0, 5, 10)) if has_service else 0
+            t = cart.totals(disc, svc)
+            row = [oid, rng.choice(("Dine-In", "Dine-In", "Takeaway")), rng.choice(("Cash", "Cash", "Card", "UPI", "UPI")),
+                   t.subtotal, t.gst, t.discount, t.total, rng.choice(NAMES), order_time(rng, start, days)]
+            if has_service:
+                row.append(t.service)
+            if has_mobile:
+                row.append(f"9{rng.randrange(10 ** 9):09d}")
+            order_rows.append(row)
+            item_rows.extend((oid, ln.item_id, ln.qty, ln.price, ln.gst) + ((ln.name, ln.category) if snap else ())
+                             for ln in cart)
+        cur.executemany(order_sql, order_rows)
+        cur.executemany(item_sql, item_rows)
+        conn.commit()
+        next_id += n
+        done += n
+        if progress:
+            progress(done)
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Seed synthetic menu + orders.")
+    db = ap.add_mutually_exclusive_group(required=True)
+    db.add_argument("--sqlite", help="SQLite stand-in database file (created if missing)")
+    db.add_argument("--mysql", action="store_true", help="the MySQL database from main.DB_CONFIG")
+    ap.add_argument("--orders", type=int, default=100000)
+    ap.add_argument("--menu", type=int, default=300, help="active menu items to ensure")
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--batch", type=int, default=5000, help="orders per transaction")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    conn, caps = open_db(args)
+    menu = [(i, n, c, Decimal(str(p)), Decimal(str(g))) for i, n, c, p, g in seed_menu(conn, args.menu, rng)]
+    t0 = time.perf_counter()
+
+    def progress(done):
+        rate = done / (time.perf_counter() - t0)
+        print(f"\r{done:,} / {args.orders:,} orders ({rate:,.0f}/s)", end="", flush=True)
+
+    generate(conn, caps, menu, args.orders, args.days, args.batch, rng, progress)
+    print()
+    if rollup.available(caps):
+        days, items = rollup.rebuild(conn, caps)
+        print(f"rollups rebuilt: {days} day rows, {items} item rows")
+    conn.close()
+    print(f"done in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
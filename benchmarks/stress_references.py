@@ -0,0 +1,89 @@
+"""Uniqueness/ordering stress for locally generated order references.
+
+    python benchmarks/stress_references.py [--procs 8] [--threads 4] [--count 50000] [--shared-terminal]
+
+Starts ``--procs`` processes (one terminal id each) with ``--threads``
+threads apiece, all drawing references as fast as they can. Checks that no
+reference repeats across processes, that each thread sees its terminal's
+references strictly increasing, and that every reference decodes back to
+its terminal. Exits non-zero on any violation.
+
+Uniqueness across processes rests entirely on distinct terminal ids: a
+generator only serialises the threads of its own process. ``--shared-terminal``
+runs every process as terminal 0 to show that, and fails if the duplicates
+it must produce are *not* detected.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from references import ReferenceGenerator, parts  # noqa: E402
+
+
+def draw(terminal, threads, count):
+    gen = ReferenceGenerator(terminal)
+    out = [None] * threads
+    errors = []
+
+    def work(slot):
+        refs = [gen.next() for _ in range(count)]
+        if any(a >= b for a, b in zip(refs, refs[1:])):
+            errors.append(f"terminal {terminal} thread {slot}: not strictly increasing")
+        out[slot] = refs
+
+    t0 = time.perf_counter()
+    ts = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    seconds = time.perf_counter() - t0
+    refs = [r for chunk in out for r in chunk]
+    bad = [r for r in refs[:: max(len(refs) // 1000, 1)] if parts(r)[1] != terminal]
+    if bad:
+        errors.append(f"terminal {terminal}: {len(bad)} sampled refs decode to another terminal")
+    return refs, seconds, errors
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=8)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--count", type=int, default=50000, help="references per thread")
+    ap.add_argument("--shared-terminal", action="store_true",
+                    help="give every process terminal 0; duplicates are then expected")
+    args = ap.parse_args()
+    terminals = [0] * args.procs if args.shared_terminal else list(range(args.procs))
+
+    total = args.procs * args.threads * args.count
+    seen = set()
+    errors = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.procs) as pool:
+        futs = [pool.submit(draw, terminal, args.threads, args.count) for terminal in terminals]
+        for terminal, fut in zip(terminals, futs):
+            refs, seconds, errs = fut.result()
+            errors.extend(errs)
+            seen.update(refs)
+            print(f"terminal {terminal:3d}: {len(refs):9,d} refs in {seconds:6.2f}s "
+                  f"({len(refs) / seconds:,.0f}/s)")
+    elapsed = time.perf_counter() - t0
+    dupes = total - len(seen)
+    if args.shared_terminal:
+        if args.procs > 1 and not dupes:
+            errors.append("processes sharing a terminal id produced no duplicates; the check is not detecting them")
+    elif dupes:
+        errors.append(f"{dupes} duplicate references across processes")
+    print(f"{args.procs} procs x {args.threads} threads x {args.count:,} = {total:,} refs, "
+          f"{len(seen):,} unique ({dupes:,} duplicates), {elapsed:.2f}s wall")
+    for e in errors:
+        print("FAIL:", e)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
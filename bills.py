@@ -0,0 +1,78 @@
+"""Bill documents: build the bill dict for an order and render it as JSON/CSV/PDF.
+
+Renderers return bytes and have no Tk or DB dependencies, so they can run in
+worker threads or in a process pool (see batch_export.py). PDFs come from the
+precompiled receipt template in receipt.py.
+"""
+import csv
+import io
+import json
+
+import metrics
+from receipt import ReceiptTemplate, line_total
+
+FORMATS = ("json", "csv", "pdf")
+PDF_TEMPLATE = ReceiptTemplate(currency="Rs.")
+
+
+def bill_data(order, items, reference_no):
+    """Bill dict from an ``orders`` row (as dict) and its item rows (dicts)."""
+    return dict(
+        order_id=order['id'],
+        reference_no=reference_no,
+        date=str(order.get('order_date')),
+        order_type=order.get('order_type'),
+        payment=order.get('payment_method'),
+        subtotal=float(order.get('subtotal') or 0),
+        gst=float(order.get('tax') or 0),
+        discount=float(order.get('discount') or 0),
+        service=float(order.get('service_charge') or 0),
+        total=float(order.get('total') or 0),
+        customer=order.get('customer_name'),
+        mobile=order.get('customer_mobile'),
+        items=[dict(name=i['item_name'], qty=int(i['quantity']), price=float(i['price']), gst=float(i['gst'])) for i in items]
+    )
+
+
+# ------------------------- RENDERERS -------------------------
+def render_json(data):
+    return json.dumps(data, indent=2, default=float).encode("utf-8")
+
+
+def render_csv(data):
+    buf = io.StringIO(newline="")
+    w = csv.writer(buf)
+    w.writerow(["Item", "Qty", "Price", "GST%", "Line Total"])
+    for it in data["items"]:
+        w.writerow([it["name"], it["qty"], f"{it['price']:.2f}", f"{it['gst']:.2f}", f"{line_total(it):.2f}"])
+    w.writerow([])
+    w.writerow(["Subtotal", f"{data['subtotal']:.2f}"])
+    w.writerow(["GST", f"{data['gst']:.2f}"])
+    w.writerow(["Discount", f"{data['discount']:.2f}"])
+    if 'service' in data:
+        w.writerow(["Service", f"{data['service']:.2f}"])
+    w.writerow(["Total", f"{data['total']:.2f}"])
+    return buf.getvalue().encode("utf-8")
+
+
+def render_pdf(data):
+    return PDF_TEMPLATE.pdf(data)
+
+
+RENDERERS = dict(json=render_json, csv=render_csv, pdf=render_pdf)
+
+
+def render(data, fmt):
+    with metrics.span("render." + fmt):
+        return RENDERERS[fmt](data)
+
+
+def write_bill_files(data, base, formats=FORMATS):
+    """Write ``base.<fmt>`` for each format; returns the paths written."""
+    paths = []
+    for fmt in formats:
+        path = f"{base}.{fmt}"
+        with open(path, "wb") as f:
+            f.write(render(data, fmt))
+        paths.append(path)
+    return paths
@@ -0,0 +1,131 @@
+"""Cart model for the POS, independent of Tk.
+
+Lines are kept in a dict keyed by menu id (insertion order = display order).
+Subtotal and GST are kept as running sums updated on every mutation, so
+adding an item or changing a quantity is O(1). All money is ``Decimal``.
+Totals are rounded half-up to paise, the same way MySQL stores
+``DECIMAL(10,2)``.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal(100)
+
+Totals = namedtuple("Totals", "subtotal gst discount service total")
+
+
+def money(value):
+    """Exact Decimal for a price/percentage coming from the DB, a Tk var or a CSV."""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(str(value).strip() or "0")
+
+
+def cents(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class CartLine:
+    __slots__ = ("item_id", "name", "price", "gst", "qty", "category")
+
+    def __init__(self, item_id, name, price, gst, qty, category=None):
+        self.item_id = item_id
+        self.name = name
+        self.price = price
+        self.gst = gst
+        self.qty = qty
+        self.category = category
+
+    @property
+    def subtotal(self):
+        return self.price * self.qty
+
+    @property
+    def tax(self):
+        return self.price * self.qty * self.gst / HUNDRED
+
+    @property
+    def total(self):
+        return self.subtotal + self.tax
+
+    def as_dict(self):
+        return dict(id=self.item_id, name=self.name, price=self.price, gst=self.gst, qty=self.qty)
+
+
+class Cart:
+    def __init__(self):
+        self._lines = {}
+        self._subtotal = Decimal(0)
+        self._tax = Decimal(0)
+
+    # --------------------- mutation ---------------------
+    def add(self, item_id, name, price, gst, qty=1, category=None):
+        """Add ``qty`` of an item, merging with an existing line. Returns the line."""
+        if qty < 1:
+            raise ValueError("quantity must be at least 1")
+        line = self._lines.get(item_id)
+        if line is None:
+            line = CartLine(item_id, name, money(price), money(gst), 0, category)
+            self._lines[item_id] = line
+        self._bump(line, qty)
+        return line
+
+    def set_qty(self, item_id, qty):
+        line = self._lines[item_id]
+        qty = int(qty)
+        if qty < 1:
+            raise ValueError("quantity must be at least 1")
+        self._bump(line, qty - line.qty)
+        return line
+
+    def remove(self, item_id):
+        line = self._lines.pop(item_id)
+        self._subtotal -= line.subtotal
+        self._tax -= line.tax
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self._subtotal = Decimal(0)
+        self._tax = Decimal(0)
+
+    def _bump(self, line, dq):
+        line.qty += dq
+        delta = line.price * dq
+        self._subtotal += delta
+        self._tax += delta * line.gst / HUNDRED
+
+    # --------------------- queries ---------------------
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __contains__(self, item_id):
+        return item_id in self._lines
+
+    def get(self, item_id):
+        return self._lines.get(item_id)
+
+    @property
+    def subtotal(self):
+        return self._subtotal
+
+    @property
+    def tax(self):
+        return self._tax
+
+    def totals(self, discount_pct=0, service_pct=0):
+        """Rounded bill totals; discount and service apply to the subtotal."""
+        subtotal = cents(self._subtotal)
+        gst = cents(self._tax)
+        discount = cents(self._subtotal * money(discount_pct) / HUNDRED)
+        service = cents(self._subtotal * money(service_pct) / HUNDRED)
+        return Totals(subtotal, gst, discount, service, subtotal + gst + service - discount)
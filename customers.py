@@ -0,0 +1,279 @@
+"""Customer directory: regulars by mobile, with autocomplete.
+
+``customers`` (see database.sql) holds one row per mobile number with visit
+count, total spend and first/last visit. ``record_visit`` updates it inside
+the same transaction that saves the order, as ``rollup.record_order`` does
+for the daily sales. ``rebuild`` recomputes it from ``orders``.
+
+``CustomerDirectory`` keeps the table in memory for the billing pane. Two
+``PrefixTrie`` indexes (mobile digits, and name words) store, at every
+node, the best few customers under that prefix. Autocomplete is then one
+walk down the typed prefix, with no SQL and no scan, whatever the number of
+customers. ``record()`` updates the directory after each checkout, so a
+new regular is found on the next order without a reload. Checkouts recorded
+while ``load()`` reads the table are replayed onto the new snapshot unless
+it already has them.
+"""
+import heapq
+import threading
+from decimal import Decimal
+
+TOP = 8           # suggestions kept per trie node
+DEPTH = 6         # trie depth; longer prefixes filter the deepest node's keys
+
+LOAD_SQL = "SELECT mobile, name, visits, total_spend, last_visit FROM customers"
+
+
+# ------------------------- SQL -------------------------------
+def record_visit(cur, header):
+    """Count one saved order against its customer; call inside the save transaction.
+
+    ``header`` is the dict passed to ``insert_order``. Orders without a mobile
+    are not tracked. Journal replay can arrive out of order, so the name is
+    taken from the newest visit only.
+    """
+    mobile = (header.get("customer_mobile") or "").strip()
+    if not mobile:
+        return
+    when = header["order_date"]
+    cur.execute(
+        """
+        INSERT INTO customers (mobile, name, visits, total_spend, first_visit, last_visit)
+        VALUES (%s,%s,1,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE name=IF(VALUES(last_visit) >= last_visit, VALUES(name), name),
+            visits=visits+1, total_spend=total_spend+VALUES(total_spend),
+            first_visit=LEAST(first_visit, VALUES(first_visit)), last_visit=GREATEST(last_visit, VALUES(last_visit))
+        """,
+        (mobile, header.get("customer_name") or "", header["total"], when, when)
+    )
+
+
+def rebuild(conn):
+    """Recompute ``customers`` from ``orders`` in one transaction.
+
+    Archived months (archive.py) are no longer in ``orders``; run this
+    before the first archive, after which ``record_visit`` keeps it current.
+    """
+    cur = conn.cursor()
+    cur.execute("DELETE FROM customers")
+    cur.execute(
+        """
+        INSERT INTO customers (mobile, name, visits, total_spend, first_visit, last_visit)
+        SELECT customer_mobile, MAX(customer_name), COUNT(*), SUM(total), MIN(order_date), MAX(order_date)
+        FROM orders WHERE customer_mobile IS NOT NULL AND customer_mobile <> ''
+        GROUP BY customer_mobile
+        """
+    )
+    n = cur.rowcount
+    # the name they gave most recently
+    cur.execute(
+        """
+        UPDATE customers c JOIN orders o ON o.customer_mobile = c.mobile AND o.order_date = c.last_visit
+        SET c.name = o.customer_name
+        """
+    )
+    conn.commit()
+    return n
+
+
+# ------------------------- TRIE ------------------------------
+class _Node:
+    __slots__ = ("kids", "top", "rest")
+
+    def __init__(self):
+        self.kids = {}
+        self.top = []         # best TOP keys under this prefix, best first
+        self.rest = None      # at DEPTH: every key under this prefix
+
+
+class PrefixTrie:
+    """Prefix -> best keys, precomputed per node.
+
+    ``score(key)`` ranks keys (higher first) and may change over time; call
+    ``add`` again for a key whose score went up and it is re-ranked along its
+    path. Lookups may return keys whose word has since changed, so callers
+    check what they get back.
+    """
+
+    def __init__(self, score, top=TOP, depth=DEPTH):
+        self.score = score
+        self.top = top
+        self.depth = depth
+        self.root = _Node()
+
+    def add(self, word, key):
+        node = self.root
+        for ch in word[:self.depth]:
+            nxt = node.kids.get(ch)
+            if nxt is None:
+                nxt = node.kids[ch] = _Node()
+            node = nxt
+            best = node.top
+            if key in best:
+                best.remove(key)
+            best.append(key)
+            if len(best) > 1:
+                best.sort(key=self.score, reverse=True)
+                del best[self.top:]
+        if len(word) >= self.depth:
+            if node.rest is None:
+                node.rest = set()
+            node.rest.add(key)
+
+    def fill(self, words):
+        """Bulk ``add`` of (word, key) pairs given best key first (no re-sorting)."""
+        top, depth = self.top, self.depth
+        for word, key in words:
+            node = self.root
+            for ch in word[:depth]:
+                nxt = node.kids.get(ch)
+                if nxt is None:
+                    nxt = node.kids[ch] = _Node()
+                node = nxt
+                if len(node.top) < top and key not in node.top:
+                    node.top.append(key)
+            if len(word) >= depth:
+                if node.rest is None:
+                    node.rest = set()
+                node.rest.add(key)
+
+    def complete(self, prefix, limit=TOP, match=None):
+        """Best keys whose word starts with ``prefix`` (see class docstring).
+
+        Past ``depth`` characters the deepest node's keys are filtered with
+        ``match(key)``, which should check the whole prefix.
+        """
+        node = self.root
+        for ch in prefix[:self.depth]:
+            node = node.kids.get(ch)
+            if node is None:
+                return []
+        if len(prefix) <= self.depth:
+            return node.top[:limit]
+        keys = node.rest or ()
+        return heapq.nlargest(limit, filter(match, keys) if match else keys, key=self.score)
+
+
+# ------------------------- DIRECTORY -------------------------
+class Customer:
+    __slots__ = ("mobile", "name", "visits", "spend", "last_visit")
+
+    def __init__(self, mobile, name, visits=0, spend=Decimal(0), last_visit=None):
+        self.mobile = mobile
+        self.name = name
+        self.visits = visits
+        self.spend = spend
+        self.last_visit = last_visit
+
+    def as_dict(self):
+        return dict(mobile=self.mobile, name=self.name, visits=self.visits, spend=self.spend,
+                    last_visit=str(self.last_visit) if self.last_visit else None)
+
+
+def _words(name):
+    """Index words of a name: the whole name and each word, lower-cased."""
+    name = " ".join((name or "").lower().split())
+    if not name:
+        return []
+    words = name.split(" ")
+    return [name] + words[1:] if len(words) > 1 else [name]
+
+
+class CustomerDirectory:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = None      # visits recorded while a load runs
+        self._install({})
+        self.loaded = False
+
+    @staticmethod
+    def _index(by_mobile):
+        """(mobile trie, name trie) over ``by_mobile``, ranked by visits then recency."""
+        def rank(c):
+            return (c.visits, str(c.last_visit or ""))
+
+        def score(mobile):
+            c = by_mobile.get(mobile)
+            return rank(c) if c else (0, "")
+        ranked = sorted(by_mobile.values(), key=rank, reverse=True)
+        mobiles, names = PrefixTrie(score), PrefixTrie(score)
+        mobiles.fill((c.mobile, c.mobile) for c in ranked)
+        names.fill((w, c.mobile) for c in ranked for w in _words(c.name))
+        return mobiles, names
+
+    def _install(self, by_mobile, tries=None):
+        self._mobiles, self._names = tries or self._index(by_mobile)
+        self._by_mobile = by_mobile
+
+    # --------------------- load ---------------------
+    def load(self, conn):
+        """Replace the directory with the ``customers`` table; returns the count.
+
+        A visit ``record``ed meanwhile is kept unless the snapshot's last
+        visit for that mobile is already as recent (it was committed before
+        the read; the table stores whole seconds).
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            cur = conn.cursor()
+            cur.execute(LOAD_SQL)
+            by_mobile = {m: Customer(m, n, int(v or 0), Decimal(s or 0), lv) for m, n, v, s, lv in cur.fetchall()}
+            tries = self._index(by_mobile)          # outside the lock: seconds for 100k customers
+            with self._lock:
+                self._install(by_mobile, tries)
+                for mobile, name, total, when in self._pending:
+                    c = by_mobile.get(mobile)
+                    if c is None or c.last_visit is None or c.last_visit < when.replace(microsecond=0):
+                        self._count(mobile, name, total, when)
+                self.loaded = True
+        finally:
+            with self._lock:
+                self._pending = None
+        return len(by_mobile)
+
+    def record(self, mobile, name, total, when):
+        """Count a checkout just made on this till (the table is updated separately)."""
+        mobile = (mobile or "").strip()
+        if not mobile:
+            return None
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((mobile, name, total, when))
+            return self._count(mobile, name, total, when)
+
+    def _count(self, mobile, name, total, when):
+        c = self._by_mobile.get(mobile)
+        if c is None:
+            c = self._by_mobile[mobile] = Customer(mobile, name)
+        c.visits, c.spend = c.visits + 1, c.spend + Decimal(total)
+        if c.last_visit is None or when >= c.last_visit:
+            # after a rename the old name's nodes keep the key; complete() filters it out
+            c.name, c.last_visit = name, when
+        self._mobiles.add(mobile, mobile)
+        for w in _words(name):
+            self._names.add(w, mobile)
+        return c
+
+    # --------------------- queries ---------------------
+    def get(self, mobile):
+        return self._by_mobile.get((mobile or "").strip())
+
+    def complete(self, text, limit=TOP):
+        """Customers whose mobile (for digits) or a name word starts with ``text``."""
+        text = " ".join((text or "").lower().split())
+        if not text:
+            return []
+        by_mobile = self._by_mobile
+        if text.isdigit():
+            def match(k):
+                return k.startswith(text)
+            trie = self._mobiles
+        else:
+            def match(k):
+                return any(w.startswith(text) for w in _words(by_mobile[k].name))
+            trie = self._names
+        return [by_mobile[k] for k in trie.complete(text, limit, match) if match(k)]
+
+    def __len__(self):
+        return len(self._by_mobile)
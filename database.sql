@@ -1,25 +1,46 @@
 CREATE DATABASE IF NOT EXISTS restaurant_billing;
 USE restaurant_billing;
 
+-- Existing databases: run `python migrations.py` to reach this schema.
+-- The versions below are what this file already includes.
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE IF NOT EXISTS menu (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    name VARCHAR(100) NOT NULL,
-    category ENUM('Snacks','Main Course','Drinks','Desserts') NOT NULL,
+    item_name VARCHAR(100) NOT NULL,
+    category VARCHAR(50) NOT NULL,
     price DECIMAL(10,2) NOT NULL,
     gst DECIMAL(5,2) DEFAULT 0.00,
-    is_active BOOLEAN DEFAULT 1
+    is_active BOOLEAN DEFAULT 1,
+    UNIQUE KEY uq_menu_item_name (item_name),
+    -- menu catalog load: active items by category and name
+    INDEX idx_menu_active (is_active, category, item_name)
 );
 
 CREATE TABLE IF NOT EXISTS orders (
     id INT AUTO_INCREMENT PRIMARY KEY,
     customer_name VARCHAR(100),
+    customer_mobile VARCHAR(15) NULL,
     order_type ENUM('Dine-In','Takeaway') NOT NULL DEFAULT 'Dine-In',
     payment_method ENUM('Cash','Card','UPI') NOT NULL DEFAULT 'Cash',
     subtotal DECIMAL(10,2) NOT NULL DEFAULT 0.00,
     tax DECIMAL(10,2) NOT NULL DEFAULT 0.00,
     discount DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    service_charge DECIMAL(10,2) NOT NULL DEFAULT 0.00,
     total DECIMAL(10,2) NOT NULL DEFAULT 0.00,
-    order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- assigned by the terminal's local journal; lets the syncer replay safely
+    reference_no VARCHAR(32) NULL,
+    UNIQUE KEY uq_orders_reference_no (reference_no),
+    -- Order History date-range, customer/mobile prefix and payment filters
+    INDEX idx_orders_order_date (order_date),
+    INDEX idx_orders_customer_name (customer_name),
+    INDEX idx_orders_customer_mobile (customer_mobile),
+    INDEX idx_orders_payment_method (payment_method)
 );
 
 CREATE TABLE IF NOT EXISTS order_items (
@@ -29,11 +50,65 @@ CREATE TABLE IF NOT EXISTS order_items (
     quantity INT NOT NULL DEFAULT 1,
     price DECIMAL(10,2) NOT NULL,
     gst DECIMAL(5,2) DEFAULT 0.00,
+    -- the menu item as sold; bills and exports read these, never menu
+    item_name VARCHAR(100) NULL,
+    category VARCHAR(50) NULL,
+    -- the line's share of pricing-rule savings; the rollups count revenue net of it
+    discount DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    -- covering: bill lines / exports by order, and per-item aggregates
+    INDEX idx_order_items_order (order_id, menu_item_id, quantity, price, gst),
+    INDEX idx_order_items_item (menu_item_id, quantity, price),
     FOREIGN KEY (order_id) REFERENCES orders(id),
     FOREIGN KEY (menu_item_id) REFERENCES menu(id)
 );
 
-INSERT INTO menu (name, category, price, gst) VALUES
+-- Daily rollups read by the Reports tab. save_order keeps them current;
+-- after creating them on an existing database run: python rollup.py --rebuild
+CREATE TABLE IF NOT EXISTS sales_daily (
+    sale_date DATE NOT NULL,
+    payment_method VARCHAR(10) NOT NULL,
+    orders INT NOT NULL DEFAULT 0,
+    subtotal DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    tax DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    discount DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    service DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    total DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (sale_date, payment_method)
+);
+
+CREATE TABLE IF NOT EXISTS sales_daily_items (
+    sale_date DATE NOT NULL,
+    menu_item_id INT NOT NULL,
+    payment_method VARCHAR(10) NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    gross DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    tax DECIMAL(14,4) NOT NULL DEFAULT 0.0000,
+    PRIMARY KEY (sale_date, menu_item_id, payment_method),
+    INDEX idx_sdi_item (menu_item_id)
+);
+
+-- Regulars by mobile; save_order keeps visits and spend current (customers.py).
+CREATE TABLE IF NOT EXISTS customers (
+    mobile VARCHAR(15) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    visits INT NOT NULL DEFAULT 0,
+    total_spend DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    first_visit TIMESTAMP NULL,
+    last_visit TIMESTAMP NULL,
+    INDEX idx_customers_name (name)
+);
+
+INSERT IGNORE INTO schema_migrations (version, name) VALUES
+(1, 'menu.item_name and free-text category'),
+(2, 'orders.customer_mobile and orders.service_charge'),
+(3, 'orders.reference_no'),
+(4, 'sales_daily rollup tables'),
+(5, 'covering indexes for history, bills and reports'),
+(6, 'order_items item name/category snapshot'),
+(7, 'customers directory'),
+(8, 'order_items line discount');
+
+INSERT INTO menu (item_name, category, price, gst) VALUES
 ('French Fries', 'Snacks', 80.00, 5.00),
 ('Pizza', 'Snacks', 250.00, 12.00),
 ('Burger', 'Snacks', 150.00, 8.00),
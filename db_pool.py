@@ -0,0 +1,198 @@
+"""Thread-safe connection pool that sits behind ``db_conn()``.
+
+Connections are opened lazily up to ``size`` and kept alive between clicks, so
+handlers stop paying a TCP + auth handshake every time.  A checked-out
+connection is a thin proxy: ``close()`` (or leaving a ``with`` block) hands it
+back to the pool instead of closing the socket, which keeps the old
+``conn = db_conn(); ...; conn.close()`` call sites working unchanged.
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+# ------------------------- PROXY -----------------------------
+class PooledConnection:
+    __slots__ = ("_pool", "_raw", "_returned")
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._returned = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kw):
+        cur = self._raw.cursor(*args, **kw)
+        hook = self._pool.on_cursor
+        return cur if hook is None else hook(cur)
+
+    def close(self):
+        if not self._returned:
+            self._returned = True
+            self._pool._checkin(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            try:
+                self._raw.rollback()
+            except Exception:
+                pass
+        self.close()
+        return False
+
+
+# ------------------------- POOL ------------------------------
+class ConnectionPool:
+    def __init__(self, connect, size=4, timeout=10.0, ping_after=30.0, name="default", on_cursor=None):
+        """``connect`` is a zero-arg factory returning a new DB-API connection.
+
+        ``ping_after`` is how long (seconds) a connection may sit idle before it
+        is health-checked on checkout; 0 checks every time. ``on_cursor(cur)``,
+        if given, wraps every cursor handed out (e.g. metrics.timed_cursor).
+        """
+        if size < 1:
+            raise ValueError("pool size must be >= 1")
+        self.name = name
+        self.on_cursor = on_cursor
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._connect = connect
+        self._idle = deque()          # (raw_conn, last_used_monotonic)
+        self._opened = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = dict(checkouts=0, waits=0, wait_time=0.0, max_wait=0.0,
+                           opened=0, reconnects=0, discarded=0, timeouts=0)
+
+    # --------------------- checkout / return ---------------------
+    def connection(self, timeout=None):
+        """Check out a connection; use as ``with pool.connection() as conn:``."""
+        timeout = self.timeout if timeout is None else timeout
+        raw, idle_since = self._acquire(timeout)
+        if raw is None:
+            raw = self._open()
+        elif time.monotonic() - idle_since >= self.ping_after and not self._alive(raw):
+            self._quiet_close(raw)
+            try:
+                raw = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+            with self._cond:
+                self._stats["reconnects"] += 1
+        return PooledConnection(self, raw)
+
+    def _acquire(self, timeout):
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"pool '{self.name}' is closed")
+                if self._idle:
+                    raw, ts = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    self._opened += 1
+                    raw, ts = None, 0.0
+                    break
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"no free connection in pool '{self.name}' after {timeout:.1f}s")
+                waited = True
+                self._cond.wait(remaining)
+            elapsed = time.monotonic() - start
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_time"] += elapsed
+                self._stats["max_wait"] = max(self._stats["max_wait"], elapsed)
+        return raw, ts
+
+    def _open(self):
+        try:
+            raw = self._connect()
+        except Exception:
+            self._release_slot()
+            raise
+        with self._cond:
+            self._stats["opened"] += 1
+        return raw
+
+    def _checkin(self, raw):
+        # End whatever transaction the handler left open; with REPEATABLE READ a
+        # long-lived connection would otherwise keep serving a stale snapshot.
+        try:
+            if getattr(raw, "in_transaction", True):
+                raw.rollback()
+        except Exception:
+            self._quiet_close(raw)
+            with self._cond:
+                self._stats["discarded"] += 1
+            self._release_slot()
+            return
+        with self._cond:
+            if self._closed:
+                self._opened -= 1
+                self._quiet_close(raw)
+            else:
+                self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def _release_slot(self):
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    # --------------------- health ---------------------
+    @staticmethod
+    def _alive(raw):
+        try:
+            ping = getattr(raw, "ping", None)
+            if ping is not None:
+                ping(reconnect=False)
+            else:
+                cur = raw.cursor()
+                cur.execute("SELECT 1")
+                cur.fetchall()
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quiet_close(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    # --------------------- admin ---------------------
+    def stats(self):
+        """Snapshot of usage counters, for sizing the pool per terminal."""
+        with self._cond:
+            s = dict(self._stats)
+            s.update(name=self.name, size=self.size, open=self._opened,
+                     idle=len(self._idle), in_use=self._opened - len(self._idle))
+        s["avg_wait"] = s["wait_time"] / s["waits"] if s["waits"] else 0.0
+        return s
+
+    def close_all(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                raw, _ = self._idle.pop()
+                self._opened -= 1
+                self._quiet_close(raw)
+            self._cond.notify_all()
@@ -0,0 +1,115 @@
+"""Streaming CSV exports.
+
+Rows are read from an unbuffered (server-side) cursor with ``fetchmany`` in
+fixed-size chunks and written as they arrive. Memory stays flat however many
+rows the query returns. Output can optionally be gzip-compressed.
+"""
+import csv
+import gzip
+import itertools
+from datetime import datetime, timedelta
+
+import metrics
+from order_store import item_name_sql, reference_sql
+
+CHUNK_ROWS = 2000
+WRITE_BUFFER = 1 << 16
+
+
+def stream_rows(conn, sql, params=(), chunk=CHUNK_ROWS):
+    """Yield rows of ``sql`` without materialising the result set."""
+    try:
+        cur = conn.cursor(buffered=False)
+    except TypeError:           # DB-API drivers without the mysql-connector kwarg
+        cur = conn.cursor()
+    cur.execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        try:
+            cur.close()
+        except Exception:
+            pass
+
+
+def open_output(path, gz=False):
+    if gz:
+        return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    return open(path, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER)
+
+
+def write_csv(path, header, rows, gz=False, chunk=CHUNK_ROWS):
+    """Write ``header`` + an iterable of rows; returns the number of data rows."""
+    n = 0
+    with metrics.span("export.csv"), open_output(path, gz) as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        batch = []
+        for r in rows:
+            batch.append(r)
+            if len(batch) >= chunk:
+                w.writerows(batch)
+                n += len(batch)
+                batch = []
+        if batch:
+            w.writerows(batch)
+            n += len(batch)
+    return n
+
+
+def output_name(base, gz=False):
+    return base + (".csv.gz" if gz else ".csv")
+
+
+# ------------------------- ORDER DETAIL ----------------------
+DETAIL_HEADER = ["Order ID", "Ref", "Date", "Type", "Payment", "Customer", "Mobile",
+                 "Item ID", "Item", "Qty", "Price", "GST%", "Line Subtotal",
+                 "Order Subtotal", "Order GST", "Discount", "Service", "Order Total"]
+
+
+def order_detail_sql(caps, date_from=None, date_to=None):
+    """One row per order line for orders in [date_from, date_to] (dates, inclusive)."""
+    mobile = "o.customer_mobile" if caps.has("orders", "customer_mobile") else "''"
+    service = "COALESCE(o.service_charge,0)" if caps.has("orders", "service_charge") else "0"
+    name, join = item_name_sql(caps)
+    where, params = [], []
+    if date_from:
+        where.append("o.order_date >= %s"); params.append(datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        where.append("o.order_date < %s"); params.append(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    sql = f"""
+        SELECT o.id, {reference_sql(caps, 'o')}, o.order_date, o.order_type, o.payment_method,
+               o.customer_name, {mobile}, oi.menu_item_id, {name}, oi.quantity, oi.price, oi.gst,
+               o.subtotal, o.tax, o.discount, {service}, o.total
+        FROM orders o
+        JOIN order_items oi ON oi.order_id=o.id{join}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY o.id, oi.id
+        """
+    return sql, tuple(params)
+
+
+def _fmt(v):
+    return f"{float(v or 0):.2f}"
+
+
+def detail_rows(rows):
+    for r in rows:
+        dt = r[2].strftime("%Y-%m-%d %H:%M:%S") if hasattr(r[2], "strftime") else str(r[2])
+        qty, price = int(r[9] or 0), r[10] or 0
+        yield (r[0], r[1], dt, r[3], r[4], r[5], r[6] or "", r[7], r[8] or f"#{r[7]}",
+               qty, _fmt(price), _fmt(r[11]), _fmt(price * qty),
+               _fmt(r[12]), _fmt(r[13]), _fmt(r[14]), _fmt(r[15]), _fmt(r[16]))
+
+
+def export_order_detail(conn, caps, path, date_from=None, date_to=None, gz=False, archive=None):
+    """Archived months (archive.Archive) first, then the hot tables."""
+    sql, params = order_detail_sql(caps, date_from, date_to)
+    rows = detail_rows(stream_rows(conn, sql, params))
+    if archive is not None:
+        rows = itertools.chain(archive.detail_rows(date_from, date_to), rows)
+    return write_csv(path, DETAIL_HEADER, rows, gz=gz)
@@ -0,0 +1,134 @@
+"""Keyset-paginated order history.
+
+Pages are addressed by ``orders.id`` instead of OFFSET, so fetching any page
+costs the same whether the table has a thousand orders or millions.
+``HistoryPager`` holds the filter and the window of rows currently shown. It
+builds the SQL for the next fetch (on the Tk thread) and applies the fetched
+rows afterwards. The DB call in between can run on a worker.
+
+Modes:
+    first  - newest page matching the filter
+    older  - the page after the current window (replaces it)
+    newer  - the page before the current window (replaces it)
+    more   - next older page appended to the window (scrolling)
+    head   - orders newer than the window prepended (after a save)
+"""
+from datetime import datetime, timedelta
+
+PAGE_SIZE = 100
+MAX_ROWS = 1000        # window cap; scrolling past it drops rows off the top
+
+
+def parse_day(text):
+    """'YYYY-MM-DD' -> datetime at midnight, '' -> None. Raises ValueError."""
+    text = (text or "").strip()
+    return datetime.strptime(text, "%Y-%m-%d") if text else None
+
+
+def filter_clause(caps, filters):
+    """WHERE terms + params for the History filter bar (see HistoryPager.filters)."""
+    f = filters
+    where, params = [], []
+    if f.get("date_from"):
+        where.append("order_date >= %s"); params.append(f["date_from"])
+    if f.get("date_to"):
+        where.append("order_date < %s"); params.append(f["date_to"] + timedelta(days=1))
+    if f.get("payment") and f["payment"] != "All":
+        where.append("payment_method = %s"); params.append(f["payment"])
+    if f.get("order_type") and f["order_type"] != "All":
+        where.append("order_type = %s"); params.append(f["order_type"])
+    cust = (f.get("customer") or "").strip()
+    if cust:
+        # prefix match so idx_orders_customer_name / _mobile can be used
+        if cust.isdigit() and caps.has("orders", "customer_mobile"):
+            where.append("customer_mobile LIKE %s")
+        else:
+            where.append("customer_name LIKE %s")
+        params.append(cust.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    return where, params
+
+
+def history_query(caps, filters, select, before=None, after=None, limit=PAGE_SIZE):
+    """Keyset page of ``orders``: newest first, or the ``limit`` rows just
+    above ``after`` (ascending, nearest first), or those below ``before``."""
+    where, params = filter_clause(caps, filters)
+    order = "DESC"
+    if before is not None:
+        where.append("id < %s"); params.append(before)
+    elif after is not None:
+        where.append("id > %s"); params.append(after)
+        order = "ASC"
+    sql = f"SELECT {select} FROM orders"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY id {order} LIMIT {int(limit)}"
+    return sql, tuple(params)
+
+
+class HistoryPager:
+    def __init__(self, page_size=PAGE_SIZE, max_rows=MAX_ROWS):
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.filters = dict(date_from=None, date_to=None, payment="All", order_type="All", customer="")
+        self.rows = []           # raw rows, id DESC
+        self.at_head = True      # nothing newer than rows[0] matches the filter
+        self.has_older = False
+
+    def set_filters(self, **kw):
+        self.filters.update(kw)
+
+    # --------------------- SQL ---------------------
+    def query_for(self, mode, caps, select):
+        """SQL + params for ``mode``; ``select`` is the column list to fetch."""
+        return self.bind(mode)(caps, select)
+
+    def bind(self, mode):
+        """``query_for`` with the window and filters as they are now, as
+        ``f(caps, select)``; safe to call later on a worker thread."""
+        before = after = None
+        if mode in ("older", "more") and self.rows:
+            before = self.rows[-1][0]
+        elif mode in ("newer", "head") and self.rows:
+            after = self.rows[0][0]
+        filters, limit = dict(self.filters), self.page_size
+        return lambda caps, select: history_query(caps, filters, select, before=before, after=after, limit=limit)
+
+    # --------------------- window ---------------------
+    def apply(self, mode, rows):
+        """Fold fetched ``rows`` into the window; returns the new window."""
+        rows = list(rows)
+        full = len(rows) == self.page_size
+        if not self.rows:
+            mode = "first"      # query_for() fetched the newest page
+        if mode in ("newer", "head"):
+            rows.reverse()
+
+        if mode == "first":
+            self.rows = rows
+            self.at_head = True
+            self.has_older = full
+        elif mode == "older":
+            if rows:
+                self.rows = rows
+                self.at_head = False
+            self.has_older = full
+        elif mode == "more":
+            self.rows = self.rows + rows
+            self.has_older = full
+            extra = len(self.rows) - self.max_rows
+            if extra > 0:
+                del self.rows[:extra]
+                self.at_head = False
+        elif mode == "newer":
+            if rows:
+                self.rows = rows
+                self.has_older = True
+            self.at_head = not full
+        elif mode == "head":
+            self.rows = rows + self.rows
+            self.at_head = not full
+            extra = len(self.rows) - self.max_rows
+            if extra > 0:
+                del self.rows[-extra:]
+                self.has_older = True
+        return self.rows
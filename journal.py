@@ -0,0 +1,383 @@
+"""Offline-first order journal and background sync to MySQL.
+
+``save_order`` appends the order to a local SQLite journal (WAL mode, one
+small transaction, well under a millisecond) and returns. The bill is then safe on disk
+whether or not MySQL is reachable. A ``Syncer`` thread replays pending
+entries to MySQL in batches. Each entry is keyed by its ``reference_no``, so a
+replay after a crash, or an entry that committed just before a lost
+connection, is never inserted twice: references already in ``orders`` are
+marked synced instead.
+
+An entry MySQL rejects as such (an integrity or data error) is retried on
+its own and parked after ``MAX_ATTEMPTS``; transient failures (deadlocks,
+lock-wait timeouts, lost connections) never count towards that. Parked
+entries stay in the journal until requeued:
+
+    python journal.py --parked                # list them with their last error
+    python journal.py --requeue [REF ...]     # retry them (all, or those given)
+
+(add ``--path``/``--terminal`` for api.py's journal), or through
+``GET /journal/parked`` / ``POST /journal/requeue`` on api.py.
+
+The journal also keeps the last menu read from MySQL, so the POS can start
+and sell from it while the database is down, and the running totals of the
+till's shift (shifts.py), counted in the same transaction as each entry.
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import customers
+import rollup
+from order_store import insert_order
+from references import ReferenceGenerator, decode
+from shifts import ShiftLedger
+
+SYNC_BATCH = 50
+SYNC_INTERVAL = 2.0          # seconds between polls when idle
+MAX_BACKOFF = 60.0           # seconds, while MySQL is unreachable
+MAX_ATTEMPTS = 5             # an entry rejected this often is parked for review
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    reference_no TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL,
+    payload TEXT NOT NULL,
+    synced_at REAL,
+    order_id INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_journal_pending ON journal (synced_at, seq);
+CREATE TABLE IF NOT EXISTS menu_snapshot (
+    id INTEGER PRIMARY KEY,
+    item_name TEXT, category TEXT, price TEXT, gst TEXT,
+    pos INTEGER NOT NULL
+);
+"""
+
+
+def _encode(v):
+    if isinstance(v, Decimal):
+        return {"$d": str(v)}
+    if isinstance(v, datetime):
+        return {"$t": v.isoformat()}
+    raise TypeError(f"cannot journal {type(v).__name__}")
+
+
+def _decode(obj):
+    if "$d" in obj:
+        return Decimal(obj["$d"])
+    if "$t" in obj:
+        return datetime.fromisoformat(obj["$t"])
+    return obj
+
+
+class OrderJournal:
+    """SQLite-backed journal; safe to share between the Tk thread and the syncer."""
+
+    def __init__(self, path="pos_journal.sqlite3", terminal=1):
+        self.path = path
+        self.terminal = terminal
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")     # durable across app crashes; fsync on checkpoint
+        self._db.executescript(_SCHEMA)
+        self.refs = ReferenceGenerator(terminal, floor=self._last_reference_id())
+        self.shifts = ShiftLedger(self._db, self._lock, terminal)
+
+    def _last_reference_id(self):
+        row = self._db.execute("SELECT reference_no FROM journal ORDER BY seq DESC LIMIT 1").fetchone()
+        try:
+            return decode(row[0]) if row else 0
+        except ValueError:          # journal written before generated references
+            return 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --------------------- orders ---------------------
+    def append(self, header, lines):
+        """Journal one order; returns its reference number.
+
+        ``header``/``lines`` are what ``insert_order`` takes. The reference is
+        generated locally (see references.py) and stored in the header. The
+        order is counted in the open shift in the same transaction.
+        """
+        ref = self.refs.next()
+        header = dict(header, reference_no=ref)
+        payload = json.dumps({"header": header, "lines": lines}, default=_encode)
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("INSERT INTO journal (reference_no, created, payload) VALUES (?,?,?)",
+                           (ref, time.time(), payload))
+                self.shifts.add(header)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return ref
+
+    def pending(self, limit=SYNC_BATCH):
+        """Oldest unsynced entries as (reference_no, header, lines)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT reference_no, payload FROM journal WHERE synced_at IS NULL AND attempts < ? "
+                "ORDER BY seq LIMIT ?", (MAX_ATTEMPTS, limit)
+            ).fetchall()
+        out = []
+        for ref, payload in rows:
+            p = json.loads(payload, object_hook=_decode)
+            out.append((ref, p["header"], [tuple(l) for l in p["lines"]]))
+        return out
+
+    def mark_synced(self, refs):
+        """``refs``: {reference_no: order_id or None}."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "UPDATE journal SET synced_at=?, order_id=?, last_error=NULL WHERE reference_no=?",
+                [(now, oid, ref) for ref, oid in refs.items()]
+            )
+
+    def mark_failed(self, ref, error, count=True):
+        """Record ``error`` for an entry; ``count`` it towards parking unless it was transient."""
+        with self._lock:
+            self._db.execute("UPDATE journal SET attempts=attempts+?, last_error=? WHERE reference_no=?",
+                             (1 if count else 0, str(error)[:500], ref))
+
+    def parked(self):
+        """Parked entries, oldest first, as (reference_no, created, attempts, last_error)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT reference_no, created, attempts, last_error FROM journal "
+                "WHERE synced_at IS NULL AND attempts >= ? ORDER BY seq", (MAX_ATTEMPTS,)
+            ).fetchall()
+        return [(ref, datetime.fromtimestamp(created).replace(microsecond=0), n, err) for ref, created, n, err in rows]
+
+    def requeue(self, refs=None):
+        """Give parked entries (all, or those in ``refs``) a fresh set of attempts; returns how many."""
+        sql = "UPDATE journal SET attempts=0 WHERE synced_at IS NULL AND attempts >= ?"
+        params = [MAX_ATTEMPTS]
+        if refs is not None:
+            refs = list(refs)
+            if not refs:
+                return 0
+            sql += f" AND reference_no IN ({','.join('?' * len(refs))})"
+            params += refs
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    def backlog(self):
+        """(waiting, parked) entry counts."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(attempts < ?), 0), COALESCE(SUM(attempts >= ?), 0) "
+                "FROM journal WHERE synced_at IS NULL", (MAX_ATTEMPTS, MAX_ATTEMPTS)
+            ).fetchone()
+
+    def unsynced(self, first_ref, last_ref):
+        """Entries in a reference range not in MySQL yet (parked ones included)."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM journal WHERE synced_at IS NULL AND reference_no BETWEEN ? AND ?",
+                (first_ref, last_ref)).fetchone()[0]
+
+    def prune(self, older_than_days=30):
+        """Drop synced entries older than the cut-off; returns rows removed."""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            return self._db.execute("DELETE FROM journal WHERE synced_at IS NOT NULL AND synced_at < ?",
+                                    (cutoff,)).rowcount
+
+    # --------------------- menu snapshot ---------------------
+    def save_menu(self, rows):
+        """Replace the local menu copy with ``rows`` (as MenuCatalog holds them)."""
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM menu_snapshot")
+                db.executemany(
+                    "INSERT INTO menu_snapshot (id, item_name, category, price, gst, pos) VALUES (?,?,?,?,?,?)",
+                    [(r[0], r[1], r[2], str(r[3]), str(r[4]), pos) for pos, r in enumerate(rows)]
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def load_menu(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, item_name, category, price, gst FROM menu_snapshot ORDER BY pos"
+            ).fetchall()
+        return [(i, n, c, Decimal(p), Decimal(g)) for i, n, c, p, g in rows]
+
+
+# ------------------------- SYNC ------------------------------
+def _permanent(error):
+    """True if retrying the same entry cannot help: the driver's IntegrityError
+    or DataError (DB-API names, whatever the driver), or a payload that does
+    not fit ``insert_order``."""
+    if isinstance(error, (KeyError, TypeError, ValueError)):
+        return True
+    return any(c.__name__ in ("IntegrityError", "DataError") for c in type(error).__mro__)
+
+
+class SchemaNotReady(RuntimeError):
+    """MySQL is reachable but lacks a migration the syncer depends on."""
+
+
+class Syncer(threading.Thread):
+    """Replays journal entries to MySQL until ``stop()``.
+
+    ``connect()`` returns a DB-API connection usable as a context manager
+    (``db_conn``); ``schema()`` returns ``SchemaCaps``. ``online``,
+    ``synced`` (running total), ``backlog`` ((waiting, parked)) and
+    ``blocked`` (why nothing can sync, e.g. a missing migration; None
+    otherwise) are plain attributes that UIs can poll from their own thread.
+    While blocked, ``forget_schema()`` (if given) is called before each retry
+    so that ``schema()`` detects a migration run in the meantime.
+    """
+
+    def __init__(self, journal, connect, schema, batch=SYNC_BATCH, interval=SYNC_INTERVAL, forget_schema=None):
+        super().__init__(name="pos-sync", daemon=True)
+        self.journal = journal
+        self.connect = connect
+        self.schema = schema
+        self.forget_schema = forget_schema
+        self.batch = batch
+        self.interval = interval
+        self._wake = threading.Event()
+        self._halt = threading.Event()
+        self.online = None
+        self.last_error = None
+        self.blocked = None
+        self.synced = 0
+        self.backlog = tuple(journal.backlog())
+
+    def kick(self):
+        """Sync now instead of at the next poll (e.g. right after a save)."""
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._halt.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        delay = self.interval
+        while not self._halt.is_set():
+            try:
+                synced = self.sync_once()
+                self.online, self.last_error, self.blocked = True, None, None
+                delay = 0 if synced == self.batch else self.interval
+            except SchemaNotReady as e:
+                synced = 0
+                self.online, self.last_error, self.blocked = True, e, str(e)
+                delay = MAX_BACKOFF
+                if self.forget_schema is not None:
+                    self.forget_schema()
+            except Exception as e:
+                synced = 0
+                self.online, self.last_error = False, e
+                delay = min(max(delay, 1.0) * 2, MAX_BACKOFF)
+            self.synced += synced
+            self.backlog = tuple(self.journal.backlog())
+            if delay:
+                self._wake.wait(delay)
+                self._wake.clear()
+
+    def sync_once(self):
+        """Push one batch; returns the number of entries synced.
+
+        Connection errors propagate (nothing is marked). If the batch is
+        rejected, entries are retried one by one so a single bad order cannot
+        hold back the rest; it is parked after ``MAX_ATTEMPTS`` rejections
+        (see ``_permanent``). Other failures are only noted on the entry.
+
+        Raises ``SchemaNotReady`` without touching anything if ``orders`` has
+        no ``reference_no``: without it a retried entry cannot be recognised
+        as already synced and would be inserted twice.
+        """
+        entries = self.journal.pending(self.batch)
+        if not entries:
+            return 0
+        caps = self.schema()
+        if not caps.has("orders", "reference_no"):
+            raise SchemaNotReady("orders.reference_no is missing (migration 3); run: python migrations.py")
+        with self.connect() as conn:
+            done = self._already_synced(conn, caps, [e[0] for e in entries])
+            todo = [e for e in entries if e[0] not in done]
+            try:
+                done.update(self._write(conn, caps, todo))
+            except Exception:
+                conn.rollback()             # raises if the connection itself is gone
+                for entry in todo:
+                    try:
+                        done.update(self._write(conn, caps, [entry]))
+                    except Exception as e:
+                        conn.rollback()
+                        self.journal.mark_failed(entry[0], e, count=_permanent(e))
+        self.journal.mark_synced(done)
+        return len(done)
+
+    @staticmethod
+    def _already_synced(conn, caps, refs):
+        cur = conn.cursor()
+        cur.execute(f"SELECT reference_no, id FROM orders WHERE reference_no IN ({','.join(['%s'] * len(refs))})",
+                    tuple(refs))
+        return {ref: oid for ref, oid in cur.fetchall()}
+
+    @staticmethod
+    def _write(conn, caps, entries):
+        cur = conn.cursor()
+        ids = {}
+        for ref, header, lines in entries:
+            ids[ref] = insert_order(cur, caps, header, lines)
+            if rollup.available(caps):
+                rollup.record_order(cur, header, lines)
+            if caps.has_table("customers"):
+                customers.record_visit(cur, header)
+        conn.commit()
+        return ids
+
+
+# ------------------------- CLI -------------------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect and requeue parked journal entries.")
+    ap.add_argument("--path", help="journal file (default: JOURNAL_PATH in main.py)")
+    ap.add_argument("--terminal", type=int, help="terminal that owns it (default: TERMINAL_ID in main.py; "
+                                                  "api.py's --terminal for its --journal)")
+    ap.add_argument("--parked", action="store_true", help="list parked entries with their last error")
+    ap.add_argument("--requeue", nargs="*", metavar="REF", help="retry parked entries (all if no REF is given)")
+    args = ap.parse_args(argv)
+    if not args.parked and args.requeue is None:
+        ap.error("nothing to do (use --parked or --requeue)")
+
+    from main import JOURNAL_PATH, TERMINAL_ID
+    terminal = TERMINAL_ID if args.terminal is None else args.terminal
+    journal = OrderJournal(args.path or JOURNAL_PATH, terminal=terminal)
+    try:
+        if args.parked:
+            for ref, created, attempts, error in journal.parked():
+                print(f"{ref}  {created}  {attempts} attempts  {error}")
+        if args.requeue is not None:
+            n = journal.requeue(args.requeue or None)
+            print(f"{n} entr{'y' if n == 1 else 'ies'} requeued; the app syncs them within {SYNC_INTERVAL:g} s")
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
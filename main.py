@@ -1,717 +1,1255 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from datetime import datetime
-import mysql.connector
-import csv
-import json
-
-try:
-    from fpdf import FPDF
-    PDF_ENABLED = True
-except Exception:
-    PDF_ENABLED = False
-
-# ------------------------- DB CONFIG -------------------------
-DB_CONFIG = dict(
-    host="localhost",
-    user="root",          
-    password=" ",  
-    database="restaurant_billing"
-)
-
-# ------------------------- DB UTILS --------------------------
-def db_conn():
-    return mysql.connector.connect(**DB_CONFIG)
-
-# ------------------------- APP -------------------------------
-class POSApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("🍴 Restaurant Billing System")
-        self.root.geometry("1280x820")
-        self.root.configure(bg="#f6f8fb")
-
-        self.cart = [] 
-        self.discount_pct = tk.DoubleVar(value=0.0)
-        self.service_pct = tk.DoubleVar(value=0.0)  
-        self.order_type = tk.StringVar(value="Dine-In")
-        self.payment_method = tk.StringVar(value="Cash")
-        self.customer_name = tk.StringVar()
-        self.customer_mobile = tk.StringVar()
-
-        self.search_text = tk.StringVar()
-        self.filter_category = tk.StringVar(value="All")
-
-        self._style()
-        self._build_tabs()
-        self._build_pos_tab()
-        self._build_admin_tab()
-        self._build_history_tab()
-        self._build_reports_tab()
-
-        try:
-            self._ensure_menu_seed()
-        except Exception as e:
-            messagebox.showwarning("Menu", f"Could not seed menu (will continue):{e}")
-
-        self.refresh_menu_tree()
-
-    # --------------------- THEME ---------------------
-    def _style(self):
-        style = ttk.Style()
-        try:
-            style.theme_use("clam")
-        except Exception:
-            pass
-        style.configure("TLabel", background="#f6f8fb", font=("Segoe UI", 11))
-        style.configure("Header.TLabel", font=("Segoe UI", 16, "bold"))
-        style.configure("TButton", font=("Segoe UI", 11, "bold"), padding=8)
-        style.configure("Primary.TButton", foreground="#fff", background="#2563eb")
-        style.map("Primary.TButton", background=[("active", "#1d4ed8")])
-        style.configure("Danger.TButton", foreground="#fff", background="#dc2626")
-        style.map("Danger.TButton", background=[("active", "#b91c1c")])
-        style.configure("Treeview", font=("Segoe UI", 11), rowheight=28)
-        style.configure("Treeview.Heading", font=("Segoe UI", 12, "bold"))
-
-    # --------------------- TABS ----------------------
-    def _build_tabs(self):
-        self.nb = ttk.Notebook(self.root)
-        self.nb.pack(fill="both", expand=True, padx=10, pady=10)
-
-        self.tab_pos = ttk.Frame(self.nb)
-        self.tab_admin = ttk.Frame(self.nb)
-        self.tab_history = ttk.Frame(self.nb)
-        self.tab_reports = ttk.Frame(self.nb)
-
-        self.nb.add(self.tab_pos, text="🧾 POS")
-        self.nb.add(self.tab_admin, text="🛠️ Menu Admin")
-        self.nb.add(self.tab_history, text="📚 Order History")
-        self.nb.add(self.tab_reports, text="📈 Reports")
-
-    # --------------------- POS TAB --------------------
-    def _build_pos_tab(self):
-        left = ttk.Frame(self.tab_pos)
-        left.pack(side="left", fill="both", expand=True, padx=(10,5), pady=10)
-
-        ttk.Label(left, text="Menu", style="Header.TLabel").pack(anchor="w")
-        filt = ttk.Frame(left)
-        filt.pack(fill="x", pady=6)
-        ttk.Entry(filt, textvariable=self.search_text, width=28).pack(side="left")
-        ttk.Button(filt, text="Search", command=self.refresh_menu_tree).pack(side="left", padx=6)
-        ttk.Label(filt, text="Category:").pack(side="left", padx=(10,4))
-        self.category_combo = ttk.Combobox(filt, textvariable=self.filter_category, state="readonly", width=16)
-        self.category_combo.pack(side="left")
-        self.category_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_menu_tree())
-
-        cols = ("ID", "Item", "Category", "Price", "GST%")
-        self.menu_tree = ttk.Treeview(left, columns=cols, show="headings")
-        for c in cols:
-            self.menu_tree.heading(c, text=c)
-            width = 70 if c in ("ID", "GST%") else (100 if c == "Price" else 240)
-            self.menu_tree.column(c, width=width, anchor="center")
-        self.menu_tree.pack(fill="both", expand=True)
-
-        addbar = ttk.Frame(left)
-        addbar.pack(fill="x", pady=8)
-        ttk.Button(addbar, text="➕ Add to Cart", command=self.add_selected_to_cart, style="Primary.TButton").pack(side="left")
-        ttk.Button(addbar, text="🔄 Refresh", command=self.refresh_menu_tree).pack(side="left", padx=6)
-
-        right = ttk.Frame(self.tab_pos)
-        right.pack(side="right", fill="both", expand=True, padx=(5,10), pady=10)
-
-        ttk.Label(right, text="Cart", style="Header.TLabel").pack(anchor="w")
-        ccols = ("Item", "Qty", "Price", "GST%", "Line Total")
-        self.cart_tree = ttk.Treeview(right, columns=ccols, show="headings")
-        for c in ccols:
-            self.cart_tree.heading(c, text=c)
-            width = 80 if c in ("Qty", "GST%") else (110 if c in ("Price",) else 240)
-            self.cart_tree.column(c, width=width, anchor="center")
-        self.cart_tree.pack(fill="both", expand=True)
-
-        ctrls = ttk.Frame(right)
-        ctrls.pack(fill="x", pady=6)
-        ttk.Button(ctrls, text="➖ Remove", command=self.remove_selected_cart, style="Danger.TButton").pack(side="left")
-        ttk.Button(ctrls, text="✏️ Edit Qty", command=self.edit_cart_qty).pack(side="left", padx=6)
-        ttk.Button(ctrls, text="🧹 Clear Cart", command=self.clear_cart).pack(side="left")
-
-        bill = ttk.LabelFrame(right, text="Billing")
-        bill.pack(fill="x", pady=8)
-
-        row = 0
-        ttk.Label(bill, text="Order Type:").grid(row=row, column=0, sticky="w", padx=8, pady=6)
-        ttk.Combobox(bill, textvariable=self.order_type, values=["Dine-In", "Takeaway"], state="readonly", width=12).grid(row=row, column=1, sticky="w")
-        ttk.Label(bill, text="Payment:").grid(row=row, column=2, sticky="w", padx=8)
-        ttk.Combobox(bill, textvariable=self.payment_method, values=["Cash", "Card", "UPI"], state="readonly", width=12).grid(row=row, column=3, sticky="w")
-
-        row += 1
-        ttk.Label(bill, text="Customer Name:").grid(row=row, column=0, sticky="w", padx=8)
-        ttk.Entry(bill, textvariable=self.customer_name, width=22).grid(row=row, column=1, sticky="w")
-        ttk.Label(bill, text="Mobile:").grid(row=row, column=2, sticky="w", padx=8)
-        ttk.Entry(bill, textvariable=self.customer_mobile, width=18).grid(row=row, column=3, sticky="w")
-
-        row += 1
-        ttk.Label(bill, text="Discount %:").grid(row=row, column=0, sticky="w", padx=8)
-        ttk.Entry(bill, textvariable=self.discount_pct, width=8).grid(row=row, column=1, sticky="w")
-        ttk.Label(bill, text="Service %:").grid(row=row, column=2, sticky="w", padx=8)
-        ttk.Entry(bill, textvariable=self.service_pct, width=8).grid(row=row, column=3, sticky="w")
-
-        row += 1
-        self.totals_lbl = ttk.Label(bill, text="Subtotal: ₹0.00 | GST: ₹0.00 | Discount: ₹0.00 | Service: ₹0.00 | Total: ₹0.00", font=("Segoe UI", 11, "bold"))
-        self.totals_lbl.grid(row=row, column=0, columnspan=4, sticky="w", padx=8, pady=6)
-
-        row += 1
-        ttk.Button(bill, text="🧮 Calculate", command=self.recompute_totals).grid(row=row, column=0, padx=8, pady=6, sticky="we")
-        ttk.Button(bill, text="✅ Confirm Payment", command=self.save_order, style="Primary.TButton").grid(row=row, column=1, padx=8, pady=6, sticky="we")
-        ttk.Button(bill, text="📄 Export Bill", command=self.export_current_bill).grid(row=row, column=2, padx=8, pady=6, sticky="we")
-
-    # --------------------- ADMIN TAB ------------------
-    def _build_admin_tab(self):
-        top = ttk.Frame(self.tab_admin)
-        top.pack(fill="x", pady=6)
-        ttk.Label(top, text="Manage Menu", style="Header.TLabel").pack(side="left", padx=10)
-        ttk.Button(top, text="➕ Add", command=self.admin_add).pack(side="left", padx=5)
-        ttk.Button(top, text="✏️ Edit", command=self.admin_edit).pack(side="left", padx=5)
-        ttk.Button(top, text="🗑 Delete", command=self.admin_delete, style="Danger.TButton").pack(side="left", padx=5)
-        ttk.Button(top, text="⬆️ Import CSV", command=self.import_menu_csv).pack(side="left", padx=5)
-        ttk.Button(top, text="🔄 Refresh", command=self.refresh_admin_tree).pack(side="left", padx=5)
-
-        cols = ("ID", "Item", "Category", "Price", "GST%", "Active")
-        self.admin_tree = ttk.Treeview(self.tab_admin, columns=cols, show="headings")
-        for c in cols:
-            self.admin_tree.heading(c, text=c)
-            self.admin_tree.column(c, width=100 if c in ("ID", "GST%", "Active") else 220, anchor="center")
-        self.admin_tree.pack(fill="both", expand=True, padx=10, pady=10)
-        self.refresh_admin_tree()
-
-    # --------------------- HISTORY TAB ----------------
-    def _build_history_tab(self):
-        top = ttk.Frame(self.tab_history)
-        top.pack(fill="x", pady=6)
-        ttk.Label(top, text="Orders", style="Header.TLabel").pack(side="left", padx=10)
-        ttk.Button(top, text="🔄 Refresh", command=self.refresh_orders_tree).pack(side="left", padx=5)
-        ttk.Button(top, text="📄 Export Selected Bill", command=self.export_selected_history_bill).pack(side="left", padx=5)
-
-        cols = ("ID", "Ref", "Date", "Type", "Payment", "Subtotal", "GST", "Discount", "Service", "Total", "Customer")
-        self.orders_tree = ttk.Treeview(self.tab_history, columns=cols, show="headings")
-        for c in cols:
-            self.orders_tree.heading(c, text=c)
-            self.orders_tree.column(c, width=90 if c in ("ID", "Type", "Payment") else 120, anchor="center")
-        self.orders_tree.pack(fill="both", expand=True, padx=10, pady=10)
-        self.refresh_orders_tree()
-
-    # --------------------- REPORTS TAB ---------------
-    def _build_reports_tab(self):
-        top = ttk.Frame(self.tab_reports)
-        top.pack(fill="x", pady=6)
-        ttk.Label(top, text="Sales Reports", style="Header.TLabel").pack(side="left", padx=10)
-        ttk.Button(top, text="📅 Daily CSV", command=lambda: self.export_sales("daily")).pack(side="left", padx=5)
-        ttk.Button(top, text="🗓 Weekly CSV", command=lambda: self.export_sales("weekly")).pack(side="left", padx=5)
-        ttk.Button(top, text="📆 Monthly CSV", command=lambda: self.export_sales("monthly")).pack(side="left", padx=5)
-        ttk.Button(top, text="🏆 Top Items CSV", command=self.export_top_items).pack(side="left", padx=5)
-
-    # ===================== MENU SEED ==========================
-    def _ensure_menu_seed(self):
-        """Insert our agreed sample items if menu is empty."""
-        conn = db_conn(); cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM menu")
-        count = cur.fetchone()[0]
-        if count and int(count) > 0:
-            conn.close(); return
-
-        items = [
-            ("Paneer Tikka", "Starters", 220.00, 5.0, 1),
-            ("Chicken Tikka", "Starters", 260.00, 5.0, 1),
-            ("Hara Bhara Kebab", "Starters", 180.00, 5.0, 1),
-    
-            ("Veg Burger", "Snacks", 120.00, 5.0, 1),
-            ("Chicken Burger", "Snacks", 150.00, 5.0, 1),
-            ("Margherita Pizza", "Snacks", 299.00, 5.0, 1),
-            ("Farmhouse Pizza", "Snacks", 399.00, 5.0, 1),
-   
-            ("Veg Biryani", "Main Course", 240.00, 5.0, 1),
-            ("Chicken Biryani", "Main Course", 290.00, 5.0, 1),
-            ("Dal Tadka", "Main Course", 180.00, 5.0, 1),
-            ("Butter Chicken", "Main Course", 320.00, 5.0, 1),
-            ("Paneer Butter Masala", "Main Course", 280.00, 5.0, 1),
-      
-            ("Tandoori Roti", "Breads", 25.00, 5.0, 1),
-            ("Butter Naan", "Breads", 45.00, 5.0, 1),
-          
-            ("Rasgulla", "Desserts", 120.00, 5.0, 1),
-            ("Gulab Jamun", "Desserts", 120.00, 5.0, 1),
-          
-            ("Cola (300ml)", "Drinks", 40.00, 5.0, 1),
-            ("Mineral Water", "Drinks", 30.00, 5.0, 1),
-        ]
-        cur.executemany(
-            "INSERT INTO menu (item_name, category, price, gst, is_active) VALUES (%s,%s,%s,%s,%s)",
-            items
-        )
-        conn.commit(); conn.close()
-
-    # ===================== MENU LOAD/FILTER =====================
-    def refresh_menu_tree(self):
-   
-        conn = db_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT DISTINCT category FROM menu WHERE is_active=1 ORDER BY category")
-        cats = [r[0] for r in cur.fetchall() if r[0]]
-        cats = ["All"] + cats
-        self.category_combo["values"] = cats
-        if self.filter_category.get() not in cats:
-            self.filter_category.set("All")
-
-        q = "SELECT id, item_name, category, price, gst FROM menu WHERE is_active=1"
-        params = []
-        if self.filter_category.get() != "All":
-            q += " AND category=%s"
-            params.append(self.filter_category.get())
-        if self.search_text.get().strip():
-            q += " AND item_name LIKE %s"
-            params.append(f"%{self.search_text.get().strip()}%")
-        q += " ORDER BY category, item_name"
-
-        cur.execute(q, tuple(params))
-        rows = cur.fetchall()
-        conn.close()
-
-        for i in self.menu_tree.get_children():
-            self.menu_tree.delete(i)
-        for r in rows:
-            self.menu_tree.insert("", "end", values=r)
-
-    # ===================== CART OPS ============================
-    def add_selected_to_cart(self):
-        sel = self.menu_tree.selection()
-        if not sel:
-            messagebox.showwarning("No selection", "Please select a menu item.")
-            return
-        row = self.menu_tree.item(sel[0], "values")
-        item_id, name, cat, price, gst = row
-
-        for it in self.cart:
-            if it["id"] == int(item_id):
-                it["qty"] += 1
-                self.refresh_cart_tree()
-                self.recompute_totals()
-                return
-        self.cart.append({"id": int(item_id), "name": name, "price": float(price), "gst": float(gst), "qty": 1})
-        self.refresh_cart_tree()
-        self.recompute_totals()
-
-    def refresh_cart_tree(self):
-        for i in self.cart_tree.get_children():
-            self.cart_tree.delete(i)
-        for it in self.cart:
-            line_total = it["price"] * it["qty"] * (1 + it["gst"]/100)
-            self.cart_tree.insert("", "end", values=(it["name"], it["qty"], f"{it['price']:.2f}", f"{it['gst']:.2f}", f"{line_total:.2f}"))
-
-    def remove_selected_cart(self):
-        sel = self.cart_tree.selection()
-        if not sel:
-            return
-        idx = self.cart_tree.index(sel[0])
-        del self.cart[idx]
-        self.refresh_cart_tree()
-        self.recompute_totals()
-
-    def edit_cart_qty(self):
-        sel = self.cart_tree.selection()
-        if not sel:
-            messagebox.showinfo("Edit Quantity", "Select a cart row first.")
-            return
-        idx = self.cart_tree.index(sel[0])
-        it = self.cart[idx]
-
-        win = tk.Toplevel(self.root)
-        win.title("Edit Quantity")
-        win.resizable(False, False)
-        ttk.Label(win, text=f"{it['name']} quantity:").grid(row=0, column=0, padx=10, pady=10)
-        qv = tk.IntVar(value=it["qty"]) 
-        ttk.Spinbox(win, from_=1, to=999, textvariable=qv, width=8).grid(row=0, column=1, padx=10)
-        def apply():
-            it["qty"] = max(1, int(qv.get()))
-            self.refresh_cart_tree()
-            self.recompute_totals()
-            win.destroy()
-        ttk.Button(win, text="Apply", command=apply).grid(row=1, column=0, columnspan=2, pady=10, sticky="we")
-
-    def clear_cart(self):
-        self.cart.clear()
-        self.refresh_cart_tree()
-        self.recompute_totals()
-
-    # ===================== TOTALS & SAVE =======================
-    def recompute_totals(self):
-        subtotal = sum(it["price"] * it["qty"] for it in self.cart)
-        gst_total = sum(it["price"] * it["qty"] * (it["gst"]/100) for it in self.cart)
-        disc_val = subtotal * (self.discount_pct.get()/100.0)
-        service_val = subtotal * (self.service_pct.get()/100.0)
-        total = subtotal + gst_total + service_val - disc_val
-        self.totals_lbl.config(
-            text=f"Subtotal: ₹{subtotal:.2f} | GST: ₹{gst_total:.2f} | Discount: ₹{disc_val:.2f} | Service: ₹{service_val:.2f} | Total: ₹{total:.2f}"
-        )
-        return subtotal, gst_total, disc_val, service_val, total
-
-    def _validate_customer(self):
-        name = self.customer_name.get().strip()
-        mobile = self.customer_mobile.get().strip()
-        if not name:
-            messagebox.showerror("Missing info", "Customer name is required.")
-            return False
-        if mobile and not mobile.isdigit():
-            messagebox.showerror("Invalid mobile", "Mobile must be digits only.")
-            return False
-        return True
-
-    def _gen_reference(self, order_id: int) -> str:
-        ts = datetime.now().strftime("%y%m%d%H%M")
-        return f"RB{ts}{order_id:05d}"
-
-    def save_order(self):
-        if not self.cart:
-            messagebox.showerror("Empty cart", "Add items before saving.")
-            return
-        if not self._validate_customer():
-            return
-
-        subtotal, gst_total, disc_val, service_val, total = self.recompute_totals()
-        try:
-            conn = db_conn()
-            cur = conn.cursor()
-  
-            try:
-                cur.execute(
-                    """
-                    INSERT INTO orders (order_type, payment_method, subtotal, tax, discount, service_charge, total, 
-                                        customer_name, customer_mobile, order_date)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                    """,
-                    (self.order_type.get(), self.payment_method.get(), subtotal, gst_total, disc_val, service_val, total,
-                     self.customer_name.get().strip(), self.customer_mobile.get().strip(), datetime.now())
-                )
-            except Exception:
-                
-                cur.execute(
-                    """
-                    INSERT INTO orders (order_type, payment_method, subtotal, tax, discount, total, 
-                                        customer_name, customer_mobile, order_date)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                    """,
-                    (self.order_type.get(), self.payment_method.get(), subtotal, gst_total, disc_val, total,
-                     self.customer_name.get().strip(), self.customer_mobile.get().strip(), datetime.now())
-                )
-            order_id = cur.lastrowid
-
-            for it in self.cart:
-                cur.execute(
-                    """
-                    INSERT INTO order_items (order_id, menu_item_id, quantity, price, gst)
-                    VALUES (%s,%s,%s,%s,%s)
-                    """,
-                    (order_id, it["id"], it["qty"], it["price"], it["gst"]))
-
-            try:
-                ref_no = self._gen_reference(order_id)
-                cur.execute("UPDATE orders SET reference_no=%s WHERE id=%s", (ref_no, order_id))
-            except Exception:
-                ref_no = str(order_id)
-
-            conn.commit()
-            conn.close()
-
-            self._last_saved = dict(order_id=order_id, reference_no=ref_no, subtotal=subtotal,
-                                    gst=gst_total, discount=disc_val, service=service_val, total=total,
-                                    items=[dict(**it) for it in self.cart],
-                                    order_type=self.order_type.get(), payment=self.payment_method.get(),
-                                    customer=self.customer_name.get().strip(), mobile=self.customer_mobile.get().strip(),
-                                    date=str(datetime.now()))
-
-            self._show_receipt_popup(self._last_saved)
-
-            self.clear_cart()
-            self.refresh_orders_tree()
-        except Exception as e:
-            messagebox.showerror("DB Error", f"Failed to save order: {e}")
-
-    def _show_receipt_popup(self, data: dict):
-        win = tk.Toplevel(self.root)
-        win.title(f"Receipt – {data['reference_no']}")
-        win.geometry("520x520")
-        txt = tk.Text(win, font=("Consolas", 10))
-        txt.pack(fill="both", expand=True)
-        txt.insert("end", "*** Restaurant Bill ***")
-        txt.insert("end", f"Ref: {data['reference_no']}")
-        txt.insert("end", f"Date: {data['date']}")
-        txt.insert("end", f"Customer: {data['customer']}  Mobile: {data['mobile']}")
-        txt.insert("end", "Items:")
-        txt.insert("end", "---------------------------------------------")
-        for it in data["items"]:
-            line_total = it["price"] * it["qty"] * (1 + it["gst"]/100)
-            txt.insert("end", f"{it['name']:<25} x{it['qty']:<3} ₹{it['price']:.2f}  GST {it['gst']:.1f}%  = ₹{line_total:.2f}")
-        txt.insert("end", "---------------------------------------------")
-        txt.insert("end", f"Subtotal:      ₹{data['subtotal']:.2f}")
-        txt.insert("end", f"GST:           ₹{data['gst']:.2f}")
-        txt.insert("end", f"Discount:      ₹{data['discount']:.2f}")
-        if 'service' in data:
-            txt.insert("end", f"Service:       ₹{data['service']:.2f}")
-        txt.insert("end", f"TOTAL:         ₹{data['total']:.2f}")
-        txt.configure(state="disabled")
-
-    # ===================== BILL EXPORT ========================
-    def export_current_bill(self):
-        if not hasattr(self, "_last_saved"):
-            messagebox.showinfo("Export", "Save an order first.")
-            return
-        data = self._last_saved
-        base = f"bill_{data['reference_no']}"
-
-        with open(base + ".json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-
-        with open(base + ".csv", "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["Item", "Qty", "Price", "GST%", "Line Total"])
-            for it in data["items"]:
-                line_total = it["price"] * it["qty"] * (1 + it["gst"]/100)
-                w.writerow([it["name"], it["qty"], f"{it['price']:.2f}", f"{it['gst']:.2f}", f"{line_total:.2f}"])
-            w.writerow([])
-            w.writerow(["Subtotal", f"{data['subtotal']:.2f}"])
-            w.writerow(["GST", f"{data['gst']:.2f}"])
-            w.writerow(["Discount", f"{data['discount']:.2f}"])
-            if 'service' in data:
-                w.writerow(["Service", f"{data['service']:.2f}"])
-            w.writerow(["Total", f"{data['total']:.2f}"])
-  
-        if PDF_ENABLED:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", "B", 16)
-            pdf.cell(0, 10, "Restaurant Bill", ln=True, align="C")
-            pdf.set_font("Arial", size=12)
-            pdf.cell(0, 8, f"Ref: {data['reference_no']}", ln=True)
-            pdf.cell(0, 8, f"Date: {data['date']}", ln=True)
-            pdf.cell(0, 8, f"Customer: {data['customer']}  Mobile: {data['mobile']}", ln=True)
-            pdf.ln(4)
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(90, 8, "Item", 1)
-            pdf.cell(20, 8, "Qty", 1)
-            pdf.cell(30, 8, "Price", 1)
-            pdf.cell(20, 8, "GST%", 1)
-            pdf.cell(30, 8, "Total", 1, ln=True)
-            pdf.set_font("Arial", size=12)
-            for it in data["items"]:
-                line_total = it["price"] * it["qty"] * (1 + it["gst"]/100)
-                pdf.cell(90, 8, it["name"], 1)
-                pdf.cell(20, 8, str(it["qty"]), 1)
-                pdf.cell(30, 8, f"{it['price']:.2f}", 1)
-                pdf.cell(20, 8, f"{it['gst']:.2f}", 1)
-                pdf.cell(30, 8, f"{line_total:.2f}", 1, ln=True)
-            pdf.ln(4)
-            pdf.cell(0, 8, f"Subtotal: ₹{data['subtotal']:.2f}", ln=True)
-            pdf.cell(0, 8, f"GST: ₹{data['gst']:.2f}", ln=True)
-            pdf.cell(0, 8, f"Discount: ₹{data['discount']:.2f}", ln=True)
-            if 'service' in data:
-                pdf.cell(0, 8, f"Service: ₹{data['service']:.2f}", ln=True)
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(0, 10, f"Total: ₹{data['total']:.2f}", ln=True)
-            pdf.output(base + ".pdf")
-        messagebox.showinfo("Export", f"Saved {base}.json / .csv" + (" / .pdf" if PDF_ENABLED else ""))
-
-    # ===================== ADMIN CRUD =========================
-    def refresh_admin_tree(self):
-        conn = db_conn(); cur = conn.cursor()
-        cur.execute("SELECT id, item_name, category, price, gst, is_active FROM menu ORDER BY item_name")
-        rows = cur.fetchall(); conn.close()
-        for i in self.admin_tree.get_children():
-            self.admin_tree.delete(i)
-        for r in rows:
-            self.admin_tree.insert("", "end", values=r)
-
-    def admin_add(self):
-        self._menu_form()
-
-    def admin_edit(self):
-        sel = self.admin_tree.selection()
-        if not sel:
-            messagebox.showinfo("Edit", "Select a row first.")
-            return
-        vals = self.admin_tree.item(sel[0], "values")
-        self._menu_form(prefill=vals)
-
-    def admin_delete(self):
-        sel = self.admin_tree.selection()
-        if not sel:
-            return
-        vals = self.admin_tree.item(sel[0], "values")
-        mid = int(vals[0])
-        if not messagebox.askyesno("Delete", f"Delete '{vals[1]}'?"):
-            return
-        conn = db_conn(); cur = conn.cursor()
-        cur.execute("DELETE FROM menu WHERE id=%s", (mid,))
-        conn.commit(); conn.close()
-        self.refresh_admin_tree(); self.refresh_menu_tree()
-
-    def _menu_form(self, prefill=None):
-        win = tk.Toplevel(self.root); win.title("Menu Item"); win.resizable(False, False)
-        ttk.Label(win, text="Item Name:").grid(row=0, column=0, padx=10, pady=8, sticky="e")
-        ttk.Label(win, text="Category:").grid(row=1, column=0, padx=10, pady=8, sticky="e")
-        ttk.Label(win, text="Price:").grid(row=2, column=0, padx=10, pady=8, sticky="e")
-        ttk.Label(win, text="GST %:").grid(row=3, column=0, padx=10, pady=8, sticky="e")
-        ttk.Label(win, text="Active (1/0):").grid(row=4, column=0, padx=10, pady=8, sticky="e")
-
-        namev = tk.StringVar(); catv = tk.StringVar(); pricev = tk.DoubleVar(value=0.0); gstv = tk.DoubleVar(value=5.0); actv = tk.IntVar(value=1)
-        if prefill:
-            _id, nm, cat, pr, gst, act = prefill
-            namev.set(nm); catv.set(cat); pricev.set(float(pr)); gstv.set(float(gst)); actv.set(int(act))
-
-        ttk.Entry(win, textvariable=namev, width=28).grid(row=0, column=1, padx=10)
-        ttk.Entry(win, textvariable=catv, width=28).grid(row=1, column=1, padx=10)
-        ttk.Entry(win, textvariable=pricev, width=12).grid(row=2, column=1, padx=10, sticky="w")
-        ttk.Entry(win, textvariable=gstv, width=12).grid(row=3, column=1, padx=10, sticky="w")
-        ttk.Entry(win, textvariable=actv, width=12).grid(row=4, column=1, padx=10, sticky="w")
-
-        def save():
-            name = namev.get().strip()
-            if not name:
-                messagebox.showerror("Validation", "Item name required.")
-                return
-            conn = db_conn(); cur = conn.cursor()
-            if prefill:
-                mid = int(prefill[0])
-                cur.execute("UPDATE menu SET item_name=%s, category=%s, price=%s, gst=%s, is_active=%s WHERE id=%s",
-                            (name, catv.get().strip(), pricev.get(), gstv.get(), actv.get(), mid))
-            else:
-                cur.execute("INSERT INTO menu (item_name, category, price, gst, is_active) VALUES (%s,%s,%s,%s,%s)",
-                            (name, catv.get().strip(), pricev.get(), gstv.get(), actv.get()))
-            conn.commit(); conn.close()
-            self.refresh_admin_tree(); self.refresh_menu_tree(); win.destroy()
-
-        ttk.Button(win, text="Save", command=save, style="Primary.TButton").grid(row=5, column=0, columnspan=2, pady=10, sticky="we")
-
-    def import_menu_csv(self):
-        path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-        if not path:
-            return
-        cnt = 0
-        conn = db_conn(); cur = conn.cursor()
-        with open(path, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for r in reader:
-                try:
-                    cur.execute(
-                        "INSERT INTO menu (item_name, category, price, gst, is_active) VALUES (%s,%s,%s,%s,%s)",
-                        (r.get('item_name') or r.get('name'), r.get('category'), float(r.get('price', 0)), float(r.get('gst', 0)), int(r.get('is_active', 1)))
-                    ); cnt += 1
-                except Exception:
-                    pass
-        conn.commit(); conn.close()
-        messagebox.showinfo("Import", f"Imported {cnt} items.")
-        self.refresh_admin_tree(); self.refresh_menu_tree()
-
-    # ===================== HISTORY & EXPORT ================
-    def refresh_orders_tree(self):
-        conn = db_conn(); cur = conn.cursor()
-    
-        try:
-            cur.execute(
-                """
-                SELECT id, COALESCE(reference_no,''), order_date, order_type, payment_method,
-                       subtotal, tax, discount, COALESCE(service_charge,0), total, customer_name
-                FROM orders ORDER BY id DESC LIMIT 200
-                """
-            )
-        except Exception:
-            cur.execute(
-                """
-                SELECT id, '' as ref, order_date, order_type, payment_method,
-                       subtotal, tax, discount, 0, total, customer_name
-                FROM orders ORDER BY id DESC LIMIT 200
-                """
-            )
-        rows = cur.fetchall(); conn.close()
-        for i in self.orders_tree.get_children():
-            self.orders_tree.delete(i)
-        for r in rows:
-            dt = r[2].strftime("%Y-%m-%d %H:%M") if hasattr(r[2], 'strftime') else str(r[2])
-            self.orders_tree.insert("", "end", values=(r[0], r[1], dt, r[3], r[4], f"{float(r[5]):.2f}", f"{float(r[6]):.2f}", f"{float(r[7]):.2f}", f"{float(r[8]):.2f}", f"{float(r[9]):.2f}", r[10]))
-
-    def export_selected_history_bill(self):
-        sel = self.orders_tree.selection()
-        if not sel:
-            return
-        order_id = int(self.orders_tree.item(sel[0], "values")[0])
-        self._export_order_by_id(order_id)
-
-    def _export_order_by_id(self, order_id: int):
-        conn = db_conn(); cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT * FROM orders WHERE id=%s", (order_id,))
-        order = cur.fetchone()
-        cur.execute(
-            """
-            SELECT oi.quantity, oi.price, oi.gst, m.item_name
-            FROM order_items oi JOIN menu m ON oi.menu_item_id=m.id
-            WHERE oi.order_id=%s
-            """, (order_id,)
-        )
-        items = cur.fetchall(); conn.close()
-        ref = order.get('reference_no') or f"{order_id}"
-        data = dict(
-            order_id=order_id,
-            reference_no=ref,
-            date=str(order.get('order_date')),
-            order_type=order.get('order_type'),
-            payment=order.get('payment_method'),
-            subtotal=float(order.get('subtotal') or 0),
-            gst=float(order.get('tax') or 0),
-            discount=float(order.get('discount') or 0),
-            service=float(order.get('service_charge') or 0),
-            total=float(order.get('total') or 0),
-            customer=order.get('customer_name'),
-            mobile=order.get('customer_mobile'),
-            items=[dict(name=i['item_name'], qty=int(i['quantity']), price=float(i['price']), gst=float(i['gst'])) for i in items]
-        )
-        self._last_saved = data
-        self.export_current_bill()
-
-    # ===================== REPORTS ===========================
-    def export_sales(self, period: str):
-        conn = db_conn(); cur = conn.cursor()
-        if period == "daily":
-            cur.execute("SELECT DATE(order_date) as day, SUM(total) FROM orders GROUP BY DATE(order_date) ORDER BY day DESC")
-            fname = "sales_daily.csv"
-        elif period == "weekly":
-            cur.execute("SELECT YEARWEEK(order_date,1) as week, SUM(total) FROM orders GROUP BY YEARWEEK(order_date,1) ORDER BY week DESC")
-            fname = "sales_weekly.csv"
-        else:
-            cur.execute("SELECT DATE_FORMAT(order_date,'%Y-%m') as month, SUM(total) FROM orders GROUP BY DATE_FORMAT(order_date,'%Y-%m') ORDER BY month DESC")
-            fname = "sales_monthly.csv"
-        rows = cur.fetchall(); conn.close()
-        with open(fname, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f); w.writerow(["Period", "Total Sales"])
-            for r in rows:
-                w.writerow([r[0], f"{float(r[1] or 0):.2f}"])
-        messagebox.showinfo("Reports", f"Exported {fname}")
-
-    def export_top_items(self):
-        conn = db_conn(); cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT m.item_name, SUM(oi.quantity) as qty, SUM(oi.quantity*oi.price) as revenue
-            FROM order_items oi JOIN menu m ON oi.menu_item_id=m.id
-            GROUP BY m.item_name ORDER BY qty DESC LIMIT 50
-            """
-        )
-        rows = cur.fetchall(); conn.close()
-        fname = "top_items.csv"
-        with open(fname, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f); w.writerow(["Item", "Quantity Sold", "Revenue"])
-            for r in rows:
-                w.writerow([r[0], int(r[1] or 0), f"{float(r[2] or 0):.2f}"])
-        messagebox.showinfo("Reports", f"Exported {fname}")
-
-# ------------------------- MAIN -----------------------------
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = POSApp(root)
-    root.mainloop()
+import time
+_T0 = time.perf_counter()       # startup timing starts here, see POSApp._startup_phase
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import atexit
+import threading
+
+from db_pool import ConnectionPool
+from menu_cache import MenuCatalog
+from order_store import SchemaCaps
+from tk_worker import TkExecutor
+from tree_sync import TreeSync
+from tk_suggest import SuggestBox
+from cart import Cart
+from history import HistoryPager, parse_day
+import rollup
+import bills
+import receipt
+import metrics
+import shifts
+import migrations
+from journal import OrderJournal, Syncer
+from service import BillingService, ServiceError
+
+# ------------------------- DB CONFIG -------------------------
+DB_CONFIG = dict(
+    host="localhost",
+    user="root",          
+    password=" ",  
+    database="restaurant_billing"
+)
+
+# Connections kept open per terminal. Raise `size` if pool stats show waits.
+DB_POOL = dict(
+    size=4,
+    timeout=10.0,       # seconds to wait for a free connection
+    ping_after=30.0     # idle seconds before a connection is health-checked
+)
+
+# Local order journal: sales are saved here first and synced to MySQL in the
+# background. Give every terminal sharing a database its own TERMINAL_ID
+# (0-1023); it is encoded into each order reference, see references.py.
+TERMINAL_ID = 1
+JOURNAL_PATH = "pos_journal.sqlite3"
+
+# ESC/POS thermal printer device (e.g. "/dev/usb/lp0"); None hides "Print".
+RECEIPT_PRINTER = None
+
+# Diagnostics tab + JSON-lines timing log (rotated by size). Actions and SQL
+# statements slower than the thresholds are flagged; see metrics.py.
+METRICS = dict(
+    log_path="pos_metrics.jsonl",
+    max_bytes=5_000_000,
+    backups=3,
+    slow_action_ms=300,
+    slow_sql_ms=100,
+    profile_dir="profiles"
+)
+
+# Closed months moved out of orders/order_items by `python archive.py`
+# (run it from cron); months older than `keep_months` full months are moved.
+ARCHIVE = dict(
+    path="archive",
+    keep_months=12
+)
+
+# Happy hours, GST slabs, combos, buy-X-get-Y and coupons (see pricing.py for
+# the format). Edits are picked up on the next cart change; no file, no rules.
+PRICING = dict(
+    path="pricing_rules.json"
+)
+
+# ------------------------- DB UTILS --------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+def _mysql_connect():
+    # imported on first connect (on a worker), not at startup: the till
+    # opens on the journal's menu and the driver import is not free
+    import mysql.connector
+    return mysql.connector.connect(**DB_CONFIG)
+
+def db_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(_mysql_connect, name="mysql",
+                                   on_cursor=metrics.timed_cursor, **DB_POOL)
+            atexit.register(_pool.close_all)
+        return _pool
+
+def db_conn():
+    """Check out a pooled connection. close() / leaving `with` returns it."""
+    with metrics.span("db.checkout"):
+        return db_pool().connection()
+
+_schema = None
+
+def db_schema():
+    """Optional-column capabilities of the live schema, detected once."""
+    global _schema
+    if _schema is None:
+        with db_conn() as conn:
+            _schema = SchemaCaps.detect(conn)
+    return _schema
+
+def forget_schema():
+    """Detect the schema again on next use, e.g. after migrations.py has run."""
+    global _schema
+    _schema = None
+
+# ------------------------- APP -------------------------------
+class POSApp:
+    def __init__(self, root):
+        self.root = root
+        self._startup = {}
+        self._startup_phase("imports")
+        self.root.title("🍴 Restaurant Billing System")
+        self.root.geometry("1280x820")
+        self.root.configure(bg="#f6f8fb")
+
+        self.cart = Cart()
+        self.discount_pct = tk.DoubleVar(value=0.0)
+        self.service_pct = tk.DoubleVar(value=0.0)  
+        self.order_type = tk.StringVar(value="Dine-In")
+        self.payment_method = tk.StringVar(value="Cash")
+        self.customer_name = tk.StringVar()
+        self.customer_mobile = tk.StringVar()
+        self.coupon = tk.StringVar()
+
+        self.search_text = tk.StringVar()
+        self.filter_category = tk.StringVar(value="All")
+        self.menu_catalog = MenuCatalog()
+        self._menu_loading = False
+        metrics.configure(**METRICS)
+        self.worker = TkExecutor(root, on_busy=self._show_busy, around=lambda label: metrics.action("job: " + label))
+        self.journal = OrderJournal(JOURNAL_PATH, terminal=TERMINAL_ID)
+        self.service = BillingService(db_conn, db_schema, journal=self.journal, catalog=self.menu_catalog,
+                                      archive=ARCHIVE["path"], pricing=PRICING["path"])
+        self._startup_phase("journal")
+
+        self.history = None     # HistoryPager, once the History tab is opened
+
+        self._style()
+        self._build_tabs()
+        self._build_pos_tab()
+
+        # Sell from the last known menu straight away; MySQL refreshes it below.
+        saved_menu = self.journal.load_menu()
+        if saved_menu:
+            self.menu_catalog.load_rows(saved_menu)
+            self._fill_menu_tree()
+
+        self.syncer = Syncer(self.journal, db_conn, db_schema, forget_schema=forget_schema)
+        self.syncer.start()
+        self._sync_seen = None
+        self._poll_sync()
+        self._perf_seen = None
+        self._poll_metrics()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        def seed_failed(e):
+            if not self.menu_catalog.loaded:
+                messagebox.showwarning("Menu", f"Could not seed menu (will continue):{e}")
+            self.refresh_menu_tree()
+        self.worker.submit(self._ensure_menu_seed, on_done=lambda _: self.refresh_menu_tree(check=True),
+                           on_error=seed_failed, label="Loading menu")
+        self.worker.submit(self._check_schema, on_done=self._schema_report, on_error=lambda e: None,
+                           label="Checking schema")
+        self._load_customers()
+        self._startup_phase("window")
+        self.root.after_idle(self._startup_phase, "paint")
+
+    # --------------------- THEME ---------------------
+    def _style(self):
+        style = ttk.Style()
+        try:
+            style.theme_use("clam")
+        except Exception:
+            pass
+        style.configure("TLabel", background="#f6f8fb", font=("Segoe UI", 11))
+        style.configure("Header.TLabel", font=("Segoe UI", 16, "bold"))
+        style.configure("TButton", font=("Segoe UI", 11, "bold"), padding=8)
+        style.configure("Primary.TButton", foreground="#fff", background="#2563eb")
+        style.map("Primary.TButton", background=[("active", "#1d4ed8")])
+        style.configure("Danger.TButton", foreground="#fff", background="#dc2626")
+        style.map("Danger.TButton", background=[("active", "#b91c1c")])
+        style.configure("Treeview", font=("Segoe UI", 11), rowheight=28)
+        style.configure("Treeview.Heading", font=("Segoe UI", 12, "bold"))
+
+    # --------------------- TABS ----------------------
+    def _build_tabs(self):
+        status = ttk.Frame(self.root)
+        status.pack(side="bottom", fill="x", padx=10, pady=(0, 6))
+        self.status_lbl = ttk.Label(status, text="Ready")
+        self.status_lbl.pack(side="left")
+        self.busy_bar = ttk.Progressbar(status, mode="indeterminate", length=160)
+        self.sync_lbl = ttk.Label(status, text="")
+        self.sync_lbl.pack(side="right", padx=(10, 0))
+        self.perf_lbl = ttk.Label(status, text="")
+        self.perf_lbl.pack(side="right", padx=(10, 0))
+
+        self.nb = ttk.Notebook(self.root)
+        self.nb.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.tab_pos = ttk.Frame(self.nb)
+        self.tab_admin = ttk.Frame(self.nb)
+        self.tab_history = ttk.Frame(self.nb)
+        self.tab_reports = ttk.Frame(self.nb)
+        self.tab_diag = ttk.Frame(self.nb)
+
+        self.nb.add(self.tab_pos, text="🧾 POS")
+        self.nb.add(self.tab_admin, text="🛠️ Menu Admin")
+        self.nb.add(self.tab_history, text="📚 Order History")
+        self.nb.add(self.tab_reports, text="📈 Reports")
+        self.nb.add(self.tab_diag, text="⏱ Diagnostics")
+
+        # Built (and loaded) on first visit; only the POS tab is built at startup.
+        self._lazy_tabs = {
+            str(self.tab_admin): ("admin", self._build_admin_tab),
+            str(self.tab_history): ("history", self._build_history_tab),
+            str(self.tab_reports): ("reports", self._build_reports_tab),
+            str(self.tab_diag): ("diagnostics", self._build_diagnostics_tab),
+        }
+        self.nb.bind("<<NotebookTabChanged>>", self._tab_changed)
+
+    def _tab_changed(self, _=None):
+        lazy = self._lazy_tabs.pop(self.nb.select(), None)
+        if lazy is not None:
+            name, build = lazy
+            with metrics.span("tab." + name):
+                build()
+
+    def _tab_built(self, tab):
+        return str(tab) not in self._lazy_tabs
+
+    # --------------------- STARTUP TIMING ------------
+    def _startup_phase(self, phase, **extra):
+        """Note ``phase`` as reached, in ms since main.py began importing.
+
+        imports (+ Tk()) -> journal (metrics, worker, local journal and service
+        opened) -> window (POS tab built) -> paint (first idle pass of the
+        mainloop, i.e. on screen) -> menu (catalog loaded from MySQL). Each
+        phase goes to the Diagnostics table; the set is logged once "menu"
+        is reached (or failed).
+        """
+        if phase in self._startup:
+            return
+        ms = (time.perf_counter() - _T0) * 1000
+        self._startup[phase] = round(ms, 1)
+        metrics.REGISTRY.record("startup." + phase, ms / 1000)
+        if phase == "menu":
+            metrics.event("startup", **self._startup, **extra)
+            menu = "unavailable" if extra else f"{ms / 1000:.2f} s"
+            self.status_lbl.config(text=f"Started in {self._startup.get('paint', ms) / 1000:.2f} s · menu {menu}")
+
+    def _show_busy(self, labels):
+        if labels:
+            self.status_lbl.config(text=" · ".join(dict.fromkeys(labels)) + "…")
+            if not self.busy_bar.winfo_ismapped():
+                self.busy_bar.pack(side="right")
+                self.busy_bar.start(12)
+        else:
+            self.status_lbl.config(text="Ready")
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+
+    def _poll_sync(self):
+        s = self.syncer
+        state = (s.online, s.synced, s.backlog, s.blocked)
+        if state != self._sync_seen:
+            synced = self._sync_seen is not None and s.synced != self._sync_seen[1]
+            self._sync_seen = state
+            self._sync_changed(synced, *s.backlog)
+        self.root.after(1000, self._poll_sync)
+
+    def _sync_changed(self, synced, waiting, parked):
+        if self.syncer.blocked:
+            text = f"⚠ Not syncing – {self.syncer.blocked}"
+        elif self.syncer.online is False:
+            text = f"⚠ Offline – {waiting} order(s) saved locally"
+        elif waiting:
+            text = f"⟳ {waiting} order(s) to sync"
+        else:
+            text = "✓ Synced"
+        if parked:
+            text += f" · {parked} need attention (python journal.py --parked)"
+        self.sync_lbl.config(text=text)
+        if self.syncer.online and not self.service.customers.loaded:
+            self._load_customers()      # started offline: load once MySQL is back
+        if synced and self.history is not None and self.history.at_head:
+            self._load_history("head")
+
+    def _poll_metrics(self):
+        last = metrics.REGISTRY.last_action
+        if last is not None and last is not self._perf_seen:
+            self._perf_seen = last
+            slow = last["ms"] >= metrics.SLOW_ACTION_MS
+            self.perf_lbl.config(text=f"⏱ {last['action']} {last['ms']:.0f} ms · {last['queries']} q",
+                                 foreground="#dc2626" if slow else "")
+        if self.nb.select() == str(self.tab_diag) and self._tab_built(self.tab_diag):
+            self.refresh_diagnostics()
+        self.root.after(1000, self._poll_metrics)
+
+    def _on_close(self):
+        self.syncer.stop(timeout=3.0)
+        self.journal.close()
+        self.worker.shutdown()
+        self.root.destroy()
+
+    # --------------------- POS TAB --------------------
+    def _build_pos_tab(self):
+        left = ttk.Frame(self.tab_pos)
+        left.pack(side="left", fill="both", expand=True, padx=(10,5), pady=10)
+
+        ttk.Label(left, text="Menu", style="Header.TLabel").pack(anchor="w")
+        filt = ttk.Frame(left)
+        filt.pack(fill="x", pady=6)
+        ttk.Entry(filt, textvariable=self.search_text, width=28).pack(side="left")
+        self.search_text.trace_add("write", lambda *a: self.refresh_menu_tree())
+        ttk.Button(filt, text="Search", command=self.refresh_menu_tree).pack(side="left", padx=6)
+        ttk.Label(filt, text="Category:").pack(side="left", padx=(10,4))
+        self.category_combo = ttk.Combobox(filt, textvariable=self.filter_category, state="readonly", width=16)
+        self.category_combo.pack(side="left")
+        self.category_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_menu_tree())
+
+        cols = ("ID", "Item", "Category", "Price", "GST%")
+        self.menu_tree = ttk.Treeview(left, columns=cols, show="headings")
+        for c in cols:
+            self.menu_tree.heading(c, text=c)
+            width = 70 if c in ("ID", "GST%") else (100 if c == "Price" else 240)
+            self.menu_tree.column(c, width=width, anchor="center")
+        self.menu_tree.pack(fill="both", expand=True)
+        self.menu_sync = TreeSync(self.menu_tree)
+
+        addbar = ttk.Frame(left)
+        addbar.pack(fill="x", pady=8)
+        ttk.Button(addbar, text="➕ Add to Cart", command=self.add_selected_to_cart, style="Primary.TButton").pack(side="left")
+        ttk.Button(addbar, text="🔄 Refresh", command=lambda: self.refresh_menu_tree(check=True)).pack(side="left", padx=6)
+
+        right = ttk.Frame(self.tab_pos)
+        right.pack(side="right", fill="both", expand=True, padx=(5,10), pady=10)
+
+        ttk.Label(right, text="Cart", style="Header.TLabel").pack(anchor="w")
+        ccols = ("Item", "Qty", "Price", "GST%", "Line Total")
+        self.cart_tree = ttk.Treeview(right, columns=ccols, show="headings")
+        for c in ccols:
+            self.cart_tree.heading(c, text=c)
+            width = 80 if c in ("Qty", "GST%") else (110 if c in ("Price",) else 240)
+            self.cart_tree.column(c, width=width, anchor="center")
+        self.cart_tree.pack(fill="both", expand=True)
+        self.cart_sync = TreeSync(self.cart_tree)
+
+        ctrls = ttk.Frame(right)
+        ctrls.pack(fill="x", pady=6)
+        ttk.Button(ctrls, text="➖ Remove", command=self.remove_selected_cart, style="Danger.TButton").pack(side="left")
+        ttk.Button(ctrls, text="✏️ Edit Qty", command=self.edit_cart_qty).pack(side="left", padx=6)
+        ttk.Button(ctrls, text="🧹 Clear Cart", command=self.clear_cart).pack(side="left")
+
+        bill = ttk.LabelFrame(right, text="Billing")
+        bill.pack(fill="x", pady=8)
+
+        row = 0
+        ttk.Label(bill, text="Order Type:").grid(row=row, column=0, sticky="w", padx=8, pady=6)
+        ttk.Combobox(bill, textvariable=self.order_type, values=["Dine-In", "Takeaway"], state="readonly", width=12).grid(row=row, column=1, sticky="w")
+        ttk.Label(bill, text="Payment:").grid(row=row, column=2, sticky="w", padx=8)
+        ttk.Combobox(bill, textvariable=self.payment_method, values=["Cash", "Card", "UPI"], state="readonly", width=12).grid(row=row, column=3, sticky="w")
+
+        row += 1
+        ttk.Label(bill, text="Customer Name:").grid(row=row, column=0, sticky="w", padx=8)
+        name_entry = ttk.Entry(bill, textvariable=self.customer_name, width=22)
+        name_entry.grid(row=row, column=1, sticky="w")
+        ttk.Label(bill, text="Mobile:").grid(row=row, column=2, sticky="w", padx=8)
+        mobile_entry = ttk.Entry(bill, textvariable=self.customer_mobile, width=18)
+        mobile_entry.grid(row=row, column=3, sticky="w")
+        SuggestBox(name_entry, self._suggest_customers, self._pick_customer)
+        SuggestBox(mobile_entry, self._suggest_customers, self._pick_customer)
+
+        row += 1
+        self.customer_lbl = ttk.Label(bill, text="", foreground="#2563eb")
+        self.customer_lbl.grid(row=row, column=0, columnspan=4, sticky="w", padx=8)
+        self.customer_mobile.trace_add("write", lambda *_: self._show_customer())
+
+        row += 1
+        ttk.Label(bill, text="Discount %:").grid(row=row, column=0, sticky="w", padx=8)
+        ttk.Entry(bill, textvariable=self.discount_pct, width=8).grid(row=row, column=1, sticky="w")
+        ttk.Label(bill, text="Service %:").grid(row=row, column=2, sticky="w", padx=8)
+        ttk.Entry(bill, textvariable=self.service_pct, width=8).grid(row=row, column=3, sticky="w")
+
+        row += 1
+        ttk.Label(bill, text="Coupon:").grid(row=row, column=0, sticky="w", padx=8)
+        coupon_entry = ttk.Entry(bill, textvariable=self.coupon, width=14)
+        coupon_entry.grid(row=row, column=1, sticky="w")
+        coupon_entry.bind("<Return>", lambda e: self.recompute_totals())
+        coupon_entry.bind("<FocusOut>", lambda e: self.recompute_totals())
+
+        row += 1
+        self.offers_lbl = ttk.Label(bill, text="", foreground="#15803d", wraplength=560, justify="left")
+        self.offers_lbl.grid(row=row, column=0, columnspan=4, sticky="w", padx=8)
+
+        row += 1
+        self.totals_lbl = ttk.Label(bill, text="Subtotal: ₹0.00 | GST: ₹0.00 | Discount: ₹0.00 | Service: ₹0.00 | Total: ₹0.00", font=("Segoe UI", 11, "bold"))
+        self.totals_lbl.grid(row=row, column=0, columnspan=4, sticky="w", padx=8, pady=6)
+
+        row += 1
+        ttk.Button(bill, text="🧮 Calculate", command=self.recompute_totals).grid(row=row, column=0, padx=8, pady=6, sticky="we")
+        self.confirm_btn = ttk.Button(bill, text="✅ Confirm Payment", command=self.save_order, style="Primary.TButton")
+        self.confirm_btn.grid(row=row, column=1, padx=8, pady=6, sticky="we")
+        ttk.Button(bill, text="📄 Export Bill", command=self.export_current_bill).grid(row=row, column=2, padx=8, pady=6, sticky="we")
+
+    # --------------------- ADMIN TAB ------------------
+    def _build_admin_tab(self):
+        top = ttk.Frame(self.tab_admin)
+        top.pack(fill="x", pady=6)
+        ttk.Label(top, text="Manage Menu", style="Header.TLabel").pack(side="left", padx=10)
+        ttk.Button(top, text="➕ Add", command=self.admin_add).pack(side="left", padx=5)
+        ttk.Button(top, text="✏️ Edit", command=self.admin_edit).pack(side="left", padx=5)
+        ttk.Button(top, text="🗑 Delete", command=self.admin_delete, style="Danger.TButton").pack(side="left", padx=5)
+        ttk.Button(top, text="⬆️ Import CSV", command=self.import_menu_csv).pack(side="left", padx=5)
+        ttk.Button(top, text="🔄 Refresh", command=self.refresh_admin_tree).pack(side="left", padx=5)
+
+        cols = ("ID", "Item", "Category", "Price", "GST%", "Active")
+        self.admin_tree = ttk.Treeview(self.tab_admin, columns=cols, show="headings")
+        for c in cols:
+            self.admin_tree.heading(c, text=c)
+            self.admin_tree.column(c, width=100 if c in ("ID", "GST%", "Active") else 220, anchor="center")
+        self.admin_tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.admin_sync = TreeSync(self.admin_tree)
+        self.refresh_admin_tree()
+
+    # --------------------- HISTORY TAB ----------------
+    def _build_history_tab(self):
+        self.history = HistoryPager()
+        self._hist_gen = 0
+        self._hist_loading = False
+        self._order_view = {}
+        self.hist_from = tk.StringVar(); self.hist_to = tk.StringVar()
+        self.hist_payment = tk.StringVar(value="All"); self.hist_type = tk.StringVar(value="All")
+        self.hist_customer = tk.StringVar()
+
+        top = ttk.Frame(self.tab_history)
+        top.pack(fill="x", pady=6)
+        ttk.Label(top, text="Orders", style="Header.TLabel").pack(side="left", padx=10)
+        ttk.Button(top, text="🔄 Refresh", command=self.refresh_orders_tree).pack(side="left", padx=5)
+        ttk.Button(top, text="📄 Export Selected Bill", command=self.export_selected_history_bill).pack(side="left", padx=5)
+        ttk.Button(top, text="🗂 Batch Export…", command=self.batch_export_dialog).pack(side="left", padx=5)
+        ttk.Button(top, text="Older ▶", command=lambda: self._load_history("older")).pack(side="right", padx=5)
+        ttk.Button(top, text="◀ Newer", command=lambda: self._load_history("newer")).pack(side="right", padx=5)
+        self.hist_info = ttk.Label(top, text="")
+        self.hist_info.pack(side="right", padx=10)
+
+        filt = ttk.Frame(self.tab_history)
+        filt.pack(fill="x", padx=10)
+        ttk.Label(filt, text="From (YYYY-MM-DD):").pack(side="left")
+        ttk.Entry(filt, textvariable=self.hist_from, width=11).pack(side="left", padx=(4, 10))
+        ttk.Label(filt, text="To:").pack(side="left")
+        ttk.Entry(filt, textvariable=self.hist_to, width=11).pack(side="left", padx=(4, 10))
+        ttk.Label(filt, text="Payment:").pack(side="left")
+        ttk.Combobox(filt, textvariable=self.hist_payment, values=["All", "Cash", "Card", "UPI"], state="readonly", width=7).pack(side="left", padx=(4, 10))
+        ttk.Label(filt, text="Type:").pack(side="left")
+        ttk.Combobox(filt, textvariable=self.hist_type, values=["All", "Dine-In", "Takeaway"], state="readonly", width=9).pack(side="left", padx=(4, 10))
+        ttk.Label(filt, text="Customer / Mobile:").pack(side="left")
+        ttk.Entry(filt, textvariable=self.hist_customer, width=16).pack(side="left", padx=(4, 10))
+        ttk.Button(filt, text="🔎 Apply", command=self.refresh_orders_tree).pack(side="left")
+
+        body = ttk.Frame(self.tab_history)
+        body.pack(fill="both", expand=True, padx=10, pady=10)
+        cols = ("ID", "Ref", "Date", "Type", "Payment", "Subtotal", "GST", "Discount", "Service", "Total", "Customer")
+        self.orders_tree = ttk.Treeview(body, columns=cols, show="headings")
+        for c in cols:
+            self.orders_tree.heading(c, text=c)
+            self.orders_tree.column(c, width=90 if c in ("ID", "Type", "Payment") else 120, anchor="center")
+        sb = ttk.Scrollbar(body, orient="vertical", command=self.orders_tree.yview)
+        def on_scroll(first, last):
+            sb.set(first, last)
+            self._history_scrolled(float(last))
+        self.orders_tree.configure(yscrollcommand=on_scroll)
+        sb.pack(side="right", fill="y")
+        self.orders_tree.pack(side="left", fill="both", expand=True)
+        self.orders_sync = TreeSync(self.orders_tree)
+        self.refresh_orders_tree()
+
+    # --------------------- REPORTS TAB ---------------
+    def _build_reports_tab(self):
+        top = ttk.Frame(self.tab_reports)
+        top.pack(fill="x", pady=6)
+        ttk.Label(top, text="Sales Reports", style="Header.TLabel").pack(side="left", padx=10)
+        ttk.Button(top, text="📅 Daily CSV", command=lambda: self.export_sales("daily")).pack(side="left", padx=5)
+        ttk.Button(top, text="🗓 Weekly CSV", command=lambda: self.export_sales("weekly")).pack(side="left", padx=5)
+        ttk.Button(top, text="📆 Monthly CSV", command=lambda: self.export_sales("monthly")).pack(side="left", padx=5)
+        ttk.Button(top, text="🏆 Top Items CSV", command=self.export_top_items).pack(side="left", padx=5)
+
+        self.rep_from = tk.StringVar(); self.rep_to = tk.StringVar(); self.rep_gzip = tk.BooleanVar(value=False)
+        rng = ttk.Frame(self.tab_reports)
+        rng.pack(fill="x", pady=6, padx=10)
+        ttk.Label(rng, text="From (YYYY-MM-DD):").pack(side="left")
+        ttk.Entry(rng, textvariable=self.rep_from, width=11).pack(side="left", padx=(4, 10))
+        ttk.Label(rng, text="To:").pack(side="left")
+        ttk.Entry(rng, textvariable=self.rep_to, width=11).pack(side="left", padx=(4, 10))
+        ttk.Button(rng, text="🧾 Order Detail CSV", command=self.export_order_detail).pack(side="left", padx=5)
+        ttk.Checkbutton(rng, text="gzip (.csv.gz)", variable=self.rep_gzip).pack(side="left", padx=10)
+
+        ana = ttk.Frame(self.tab_reports)
+        ana.pack(fill="x", pady=6, padx=10)
+        ttk.Label(ana, text="Analytics (From/To range):").pack(side="left")
+        for report, text in (("hourly_heatmap", "🔥 Hourly Heatmap"), ("sold_together", "🤝 Sold Together"),
+                             ("payment_mix", "💳 Payment Mix"), ("discount_impact", "🏷 Discount Impact"),
+                             ("ticket_by_type", "🎟 Avg Ticket by Type")):
+            ttk.Button(ana, text=text, command=lambda r=report: self.export_analytics(r)).pack(side="left", padx=5)
+
+        till = ttk.Frame(self.tab_reports)
+        till.pack(fill="x", pady=6, padx=10)
+        ttk.Label(till, text="Till shift:").pack(side="left")
+        ttk.Button(till, text="📊 X-Report", command=lambda: self.show_shift_report()).pack(side="left", padx=5)
+        ttk.Button(till, text="🔒 Close Shift (Z)…", command=self.close_shift_dialog).pack(side="left", padx=5)
+        ttk.Button(till, text="🗒 Last Z-Report", command=self.show_last_z_report).pack(side="left", padx=5)
+
+    # --------------------- DIAGNOSTICS TAB -----------
+    def _build_diagnostics_tab(self):
+        top = ttk.Frame(self.tab_diag)
+        top.pack(fill="x", pady=6)
+        ttk.Label(top, text="Diagnostics", style="Header.TLabel").pack(side="left", padx=10)
+        ttk.Button(top, text="🔄 Refresh", command=self.refresh_diagnostics).pack(side="left", padx=5)
+        ttk.Button(top, text="♻ Reset", command=self.reset_diagnostics).pack(side="left", padx=5)
+        self.profile_btn = ttk.Button(top, text="🔬 Profile next action", command=self.profile_next_action)
+        self.profile_btn.pack(side="left", padx=5)
+        self.worst_lbl = ttk.Label(top, text="")
+        self.worst_lbl.pack(side="right", padx=10)
+
+        body = ttk.PanedWindow(self.tab_diag, orient="vertical")
+        body.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        grid = ttk.Frame(body)
+        cols = ("Name", "Calls", "Avg ms", "p95 ms", "Max ms", "Last ms", "Queries", "DB ms", "Errors")
+        self.diag_tree = ttk.Treeview(grid, columns=cols, show="headings")
+        for c in cols:
+            self.diag_tree.heading(c, text=c)
+            self.diag_tree.column(c, width=260 if c == "Name" else 90, anchor="w" if c == "Name" else "e")
+        self.diag_tree.tag_configure("slow", foreground="#dc2626")
+        sb = ttk.Scrollbar(grid, orient="vertical", command=self.diag_tree.yview)
+        self.diag_tree.configure(yscrollcommand=sb.set)
+        sb.pack(side="right", fill="y")
+        self.diag_tree.pack(side="left", fill="both", expand=True)
+        self.diag_sync = TreeSync(self.diag_tree)
+        body.add(grid, weight=3)
+
+        bottom = ttk.Frame(body)
+        self.pool_lbl = ttk.Label(bottom, text="")
+        self.pool_lbl.pack(anchor="w")
+        self.profile_txt = tk.Text(bottom, font=("Consolas", 9), height=12, wrap="none")
+        self.profile_txt.pack(fill="both", expand=True)
+        self._profile_shown = None
+        body.add(bottom, weight=2)
+
+    def refresh_diagnostics(self):
+        """Redraw the timing table: worst p95 first; Queries / DB ms are per call."""
+        rows = metrics.REGISTRY.snapshot()
+        view = []
+        for r in rows:
+            values = (r["name"], r["count"], f"{r['avg_ms']:.1f}", f"{r['p95_ms']:.1f}", f"{r['max_ms']:.1f}",
+                      f"{r['last_ms']:.1f}", f"{r['queries']:.1f}" if r["queries"] else "",
+                      f"{r['db_ms']:.1f}" if r["db_ms"] else "", r["errors"] or "")
+            view.append((r["name"], values))
+        self.diag_sync.sync(view)
+        threshold = metrics.SLOW_ACTION_MS
+        for r in rows:
+            slow = r["p95_ms"] >= (metrics.SLOW_SQL_MS if r["name"].startswith("sql.") else threshold)
+            self.diag_tree.item(r["name"], tags=("slow",) if slow else ())
+        actions = [r for r in rows if r["name"].startswith(("ui:", "job:"))]
+        if actions:
+            w = actions[0]
+            self.worst_lbl.config(
+                text=f"Worst action: {w['name']} · p95 {w['p95_ms']:.0f} ms · {w['queries']:.1f} queries",
+                foreground="#dc2626" if w["p95_ms"] >= threshold else "")
+        else:
+            self.worst_lbl.config(text="No actions recorded yet", foreground="")
+        if _pool is not None:
+            p = _pool.stats()
+            self.pool_lbl.config(text=f"Pool '{p['name']}': {p['in_use']}/{p['size']} in use · {p['checkouts']} checkouts · "
+                                      f"{p['waits']} waits (avg {p['avg_wait'] * 1000:.1f} ms, max {p['max_wait'] * 1000:.1f} ms) · "
+                                      f"{p['timeouts']} timeouts · {p['reconnects']} reconnects")
+        prof = metrics.last_profile
+        if prof is not None and prof is not self._profile_shown:
+            self._profile_shown = prof
+            name, path, text = prof
+            self.profile_txt.delete("1.0", "end")
+            self.profile_txt.insert("end", f"cProfile of '{name}'" + (f" – saved to {path}" if path else "") + "\n" + text)
+        if not metrics.profile_armed():
+            self.profile_btn.state(["!disabled"])
+
+    def reset_diagnostics(self):
+        metrics.REGISTRY.reset()
+        self.diag_sync.sync(())
+        self.refresh_diagnostics()
+
+    def profile_next_action(self):
+        metrics.profile_next()
+        self.profile_btn.state(["disabled"])
+        self.status_lbl.config(text="Profiling the next action…")
+
+    # ===================== SCHEMA CHECK =======================
+    @staticmethod
+    def _check_schema():
+        with db_conn() as conn:
+            return migrations.check(conn)
+
+    def _schema_report(self, result):
+        todo, missing = result
+        if not (todo or missing):
+            return
+        text = ""
+        if todo:
+            text += "Pending schema migrations:\n  " + "\n  ".join(todo) + "\n\n"
+        if missing:
+            text += "Missing indexes (slow history/reports):\n  " + "\n  ".join(missing) + "\n\n"
+        messagebox.showwarning("Database schema", text + "Run: python migrations.py")
+
+    # ===================== MENU SEED ==========================
+    def _ensure_menu_seed(self):
+        """Insert our agreed sample items if menu is empty."""
+        with db_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM menu")
+            count = cur.fetchone()[0]
+        if count and int(count) > 0:
+            return
+
+        items = [
+            ("Paneer Tikka", "Starters", 220.00, 5.0, 1),
+            ("Chicken Tikka", "Starters", 260.00, 5.0, 1),
+            ("Hara Bhara Kebab", "Starters", 180.00, 5.0, 1),
+    
+            ("Veg Burger", "Snacks", 120.00, 5.0, 1),
+            ("Chicken Burger", "Snacks", 150.00, 5.0, 1),
+            ("Margherita Pizza", "Snacks", 299.00, 5.0, 1),
+            ("Farmhouse Pizza", "Snacks", 399.00, 5.0, 1),
+   
+            ("Veg Biryani", "Main Course", 240.00, 5.0, 1),
+            ("Chicken Biryani", "Main Course", 290.00, 5.0, 1),
+            ("Dal Tadka", "Main Course", 180.00, 5.0, 1),
+            ("Butter Chicken", "Main Course", 320.00, 5.0, 1),
+            ("Paneer Butter Masala", "Main Course", 280.00, 5.0, 1),
+      
+            ("Tandoori Roti", "Breads", 25.00, 5.0, 1),
+            ("Butter Naan", "Breads", 45.00, 5.0, 1),
+          
+            ("Rasgulla", "Desserts", 120.00, 5.0, 1),
+            ("Gulab Jamun", "Desserts", 120.00, 5.0, 1),
+          
+            ("Cola (300ml)", "Drinks", 40.00, 5.0, 1),
+            ("Mineral Water", "Drinks", 30.00, 5.0, 1),
+        ]
+        with db_conn() as conn:
+            cur = conn.cursor()
+            cur.executemany(
+                "INSERT INTO menu (item_name, category, price, gst, is_active) VALUES (%s,%s,%s,%s,%s)",
+                items
+            )
+            conn.commit()
+
+    # ===================== MENU LOAD/FILTER =====================
+    @metrics.action("ui: Menu search")
+    def refresh_menu_tree(self, check=False):
+        """Filter the menu from the in-memory catalog; SQL only on (re)load.
+
+        ``check`` runs the cheap version query and reloads only if the menu
+        table changed behind our back (e.g. edited from another terminal).
+        """
+        cat = self.menu_catalog
+        if (check or not cat.loaded) and not self._menu_loading:
+            self._menu_loading = True
+            def done(_):
+                self._menu_loading = False
+                self._fill_menu_tree()
+                self._startup_phase("menu")
+            def failed(e):
+                self._menu_loading = False
+                self._startup_phase("menu", error=str(e))
+                if cat.loaded:
+                    self.status_lbl.config(text=f"Menu from local copy (database unavailable: {e})")
+                else:
+                    messagebox.showerror("DB Error", f"Failed to load menu: {e}")
+            self.worker.submit(self._load_menu_catalog, on_done=done, on_error=failed, label="Loading menu")
+        self._fill_menu_tree()
+
+    def _load_menu_catalog(self):
+        self.service.refresh_menu(force=True)
+
+    def _fill_menu_tree(self):
+        cat = self.menu_catalog
+        cats = ["All"] + cat.categories()
+        self.category_combo["values"] = cats
+        if self.filter_category.get() not in cats:
+            self.filter_category.set("All")
+
+        rows = cat.search(self.search_text.get(), self.filter_category.get())
+
+        with metrics.span("tree.menu"):
+            self.menu_sync.sync((r[0], r) for r in rows)
+
+    # ===================== CART OPS ============================
+    @metrics.action("ui: Add to cart")
+    def add_selected_to_cart(self):
+        sel = self.menu_tree.selection()
+        if not sel:
+            messagebox.showwarning("No selection", "Please select a menu item.")
+            return
+        row = self.menu_tree.item(sel[0], "values")
+        item_id, name, cat, price, gst = row
+
+        self.cart.add(int(item_id), name, price, gst, category=cat)
+        self.refresh_cart_tree()
+        self.recompute_totals()
+
+    def refresh_cart_tree(self):
+        with metrics.span("tree.cart"):
+            self.cart_sync.sync(
+                (ln.item_id, (ln.name, ln.qty, f"{ln.price:.2f}", f"{ln.gst:.2f}", f"{ln.total:.2f}")) for ln in self.cart
+            )
+
+    def remove_selected_cart(self):
+        sel = self.cart_tree.selection()
+        if not sel:
+            return
+        self.cart.remove(int(sel[0]))
+        self.refresh_cart_tree()
+        self.recompute_totals()
+
+    def edit_cart_qty(self):
+        sel = self.cart_tree.selection()
+        if not sel:
+            messagebox.showinfo("Edit Quantity", "Select a cart row first.")
+            return
+        it = self.cart.get(int(sel[0]))
+
+        win = tk.Toplevel(self.root)
+        win.title("Edit Quantity")
+        win.resizable(False, False)
+        ttk.Label(win, text=f"{it.name} quantity:").grid(row=0, column=0, padx=10, pady=10)
+        qv = tk.IntVar(value=it.qty)
+        ttk.Spinbox(win, from_=1, to=999, textvariable=qv, width=8).grid(row=0, column=1, padx=10)
+        def apply():
+            self.cart.set_qty(it.item_id, max(1, int(qv.get())))
+            self.refresh_cart_tree()
+            self.recompute_totals()
+            win.destroy()
+        ttk.Button(win, text="Apply", command=apply).grid(row=1, column=0, columnspan=2, pady=10, sticky="we")
+
+    # ===================== CUSTOMERS ==========================
+    def _suggest_customers(self, text):
+        return [(f"{c.mobile}   {c.name}   · {c.visits} visit(s)", c)
+                for c in self.service.customers.complete(text)]
+
+    def _pick_customer(self, c):
+        self.customer_name.set(c.name)
+        self.customer_mobile.set(c.mobile)
+
+    def _show_customer(self):
+        c = self.service.customers.get(self.customer_mobile.get())
+        text = ""
+        if c is not None:
+            last = f" · last {c.last_visit:%d %b %Y}" if hasattr(c.last_visit, "strftime") else ""
+            text = f"★ {c.name}: {c.visits} visit(s) · ₹{c.spend:,.2f} spent{last}"
+        self.customer_lbl.config(text=text)
+
+    def _load_customers(self):
+        self.worker.submit(self.service.refresh_customers, on_error=lambda e: None, label="Loading customers")
+
+    def clear_cart(self):
+        self.cart.clear()
+        self.coupon.set("")
+        self.refresh_cart_tree()
+        self.recompute_totals()
+
+    # ===================== TOTALS & SAVE =======================
+    def recompute_totals(self):
+        try:
+            quote = self.service.price(self.cart, self.discount_pct.get(), self.service_pct.get(), self.coupon.get())
+        except ServiceError as e:
+            self.offers_lbl.config(text=f"⚠ {e}", foreground="#b91c1c")
+            quote = None
+        if quote is None:
+            subtotal, gst_total, disc_val, service_val, total = self.cart.totals(self.discount_pct.get(), self.service_pct.get())
+        else:
+            subtotal, gst_total, disc_val, service_val, total = quote.totals
+            offers = quote.notes()
+            rules_error = self.service.pricing.error
+            if rules_error:
+                offers.insert(0, f"⚠ Pricing rules not reloaded ({rules_error}); previous rules in use")
+            if quote.coupon_error:
+                offers.append(f"⚠ {quote.coupon_error}")
+            self.offers_lbl.config(text=" · ".join(offers),
+                                   foreground="#b91c1c" if quote.coupon_error or rules_error else "#15803d")
+        self.totals_lbl.config(
+            text=f"Subtotal: ₹{subtotal:.2f} | GST: ₹{gst_total:.2f} | Discount: ₹{disc_val:.2f} | Service: ₹{service_val:.2f} | Total: ₹{total:.2f}"
+        )
+        return subtotal, gst_total, disc_val, service_val, total
+
+    @metrics.action("ui: Save order")
+    def save_order(self):
+        # Local journal only: never waits on MySQL. The syncer pushes it on.
+        try:
+            bill = self.service.checkout(
+                self.cart, self.discount_pct.get(), self.service_pct.get(),
+                order_type=self.order_type.get(), payment_method=self.payment_method.get(),
+                customer_name=self.customer_name.get(), customer_mobile=self.customer_mobile.get(),
+                coupon=self.coupon.get())
+        except ServiceError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("Save Error", f"Failed to save order: {e}")
+            return
+        self.syncer.kick()
+        self._show_customer()
+
+        self._last_saved = bill
+        self._show_receipt_popup(bill)
+        self.clear_cart()
+
+    def _show_receipt_popup(self, data: dict):
+        win = tk.Toplevel(self.root)
+        win.title(f"Receipt – {data['reference_no']}")
+        win.geometry("560x520")
+        if RECEIPT_PRINTER:
+            ttk.Button(win, text="🖨 Print", command=lambda: self.print_receipt(data)).pack(side="bottom", pady=6)
+        txt = tk.Text(win, font=("Consolas", 10))
+        txt.pack(fill="both", expand=True)
+        txt.insert("end", receipt.SCREEN.text(data))
+        txt.configure(state="disabled")
+
+    def print_receipt(self, data):
+        def send():
+            with open(RECEIPT_PRINTER, "wb") as dev:
+                dev.write(receipt.THERMAL.escpos(data))
+        self.worker.submit(send, on_error=lambda e: messagebox.showerror("Print", f"Printer error: {e}"),
+                           label="Printing receipt")
+
+    # ===================== BILL EXPORT ========================
+    def export_current_bill(self):
+        if not hasattr(self, "_last_saved"):
+            messagebox.showinfo("Export", "Save an order first.")
+            return
+        data = self._last_saved
+        base = f"bill_{data['reference_no']}"
+        self.worker.submit(
+            bills.write_bill_files, data, base,
+            on_done=lambda _: messagebox.showinfo("Export", f"Saved {base}.json / .csv / .pdf"),
+            on_error=lambda e: messagebox.showerror("Export", f"Failed to export bill: {e}"),
+            label="Exporting bill"
+        )
+
+    # ===================== ADMIN CRUD =========================
+    def refresh_admin_tree(self):
+        def fetch():
+            with db_conn() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT id, item_name, category, price, gst, is_active FROM menu ORDER BY item_name")
+                return cur.fetchall()
+        self.worker.submit(fetch, on_done=self._fill_admin_tree,
+                           on_error=lambda e: messagebox.showerror("DB Error", f"Failed to load menu: {e}"),
+                           label="Loading menu admin")
+
+    def _fill_admin_tree(self, rows):
+        with metrics.span("tree.admin"):
+            self.admin_sync.sync((r[0], r) for r in rows)
+
+    def _menu_changed(self, _=None):
+        self.menu_catalog.invalidate()
+        if self._tab_built(self.tab_admin):
+            self.refresh_admin_tree()
+        self.refresh_menu_tree()
+
+    def admin_add(self):
+        self._menu_form()
+
+    def admin_edit(self):
+        sel = self.admin_tree.selection()
+        if not sel:
+            messagebox.showinfo("Edit", "Select a row first.")
+            return
+        vals = self.admin_tree.item(sel[0], "values")
+        self._menu_form(prefill=vals)
+
+    def admin_delete(self):
+        sel = self.admin_tree.selection()
+        if not sel:
+            return
+        vals = self.admin_tree.item(sel[0], "values")
+        mid = int(vals[0])
+        if not messagebox.askyesno("Delete", f"Delete '{vals[1]}'?\n\nIt is hidden from the POS menu; "
+                                             "past orders keep it. Edit it and set Active to 1 to restore."):
+            return
+        def delete():
+            # soft delete: order lines and rollups still reference the id
+            with db_conn() as conn:
+                cur = conn.cursor()
+                cur.execute("UPDATE menu SET is_active=0 WHERE id=%s", (mid,))
+                conn.commit()
+        self.worker.submit(delete, on_done=self._menu_changed,
+                           on_error=lambda e: messagebox.showerror("DB Error", f"Failed to delete item: {e}"),
+                           label="Deleting item")
+
+    def _menu_form(self, prefill=None):
+        win = tk.Toplevel(self.root); win.title("Menu Item"); win.resizable(False, False)
+        ttk.Label(win, text="Item Name:").grid(row=0, column=0, padx=10, pady=8, sticky="e")
+        ttk.Label(win, text="Category:").grid(row=1, column=0, padx=10, pady=8, sticky="e")
+        ttk.Label(win, text="Price:").grid(row=2, column=0, padx=10, pady=8, sticky="e")
+        ttk.Label(win, text="GST %:").grid(row=3, column=0, padx=10, pady=8, sticky="e")
+        ttk.Label(win, text="Active (1/0):").grid(row=4, column=0, padx=10, pady=8, sticky="e")
+
+        namev = tk.StringVar(); catv = tk.StringVar(); pricev = tk.DoubleVar(value=0.0); gstv = tk.DoubleVar(value=5.0); actv = tk.IntVar(value=1)
+        if prefill:
+            _id, nm, cat, pr, gst, act = prefill
+            namev.set(nm); catv.set(cat); pricev.set(float(pr)); gstv.set(float(gst)); actv.set(int(act))
+
+        ttk.Entry(win, textvariable=namev, width=28).grid(row=0, column=1, padx=10)
+        ttk.Entry(win, textvariable=catv, width=28).grid(row=1, column=1, padx=10)
+        ttk.Entry(win, textvariable=pricev, width=12).grid(row=2, column=1, padx=10, sticky="w")
+        ttk.Entry(win, textvariable=gstv, width=12).grid(row=3, column=1, padx=10, sticky="w")
+        ttk.Entry(win, textvariable=actv, width=12).grid(row=4, column=1, padx=10, sticky="w")
+
+        def save():
+            name = namev.get().strip()
+            if not name:
+                messagebox.showerror("Validation", "Item name required.")
+                return
+            vals = (name, catv.get().strip(), pricev.get(), gstv.get(), actv.get())
+            def write():
+                with db_conn() as conn:
+                    cur = conn.cursor()
+                    if prefill:
+                        mid = int(prefill[0])
+                        cur.execute("UPDATE menu SET item_name=%s, category=%s, price=%s, gst=%s, is_active=%s WHERE id=%s",
+                                    vals + (mid,))
+                    else:
+                        cur.execute("INSERT INTO menu (item_name, category, price, gst, is_active) VALUES (%s,%s,%s,%s,%s)",
+                                    vals)
+                    conn.commit()
+            def done(_):
+                self._menu_changed()
+                win.destroy()
+            self.worker.submit(write, on_done=done,
+                               on_error=lambda e: messagebox.showerror("DB Error", f"Failed to save item: {e}"),
+                               label="Saving item")
+
+        ttk.Button(win, text="Save", command=save, style="Primary.TButton").grid(row=5, column=0, columnspan=2, pady=10, sticky="we")
+
+    def import_menu_csv(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        def progress(res):
+            text = f"Importing menu… {res.rows:,} rows ({res.rate:,.0f} rows/s, {res.errors} rejected)"
+            self.worker.post(self.status_lbl.config, {"text": text})
+        def run():
+            import menu_import
+            with db_conn() as conn:
+                return menu_import.import_menu(conn, path, progress=progress)
+        def done(res):
+            messagebox.showinfo("Import", res.summary())
+            self._menu_changed()
+        self.worker.submit(run, on_done=done,
+                           on_error=lambda e: messagebox.showerror("Import", f"Import failed, nothing was changed: {e}"),
+                           label="Importing menu")
+
+    # ===================== HISTORY & EXPORT ================
+    def refresh_orders_tree(self):
+        """Apply the filter bar and show the newest matching page."""
+        try:
+            date_from, date_to = parse_day(self.hist_from.get()), parse_day(self.hist_to.get())
+        except ValueError:
+            messagebox.showerror("Filter", "Dates must be YYYY-MM-DD.")
+            return
+        self.history.set_filters(date_from=date_from, date_to=date_to, payment=self.hist_payment.get(),
+                                 order_type=self.hist_type.get(), customer=self.hist_customer.get())
+        self._load_history("first")
+
+    def _load_history(self, mode):
+        """Keyset fetch for ``mode`` (see history.HistoryPager) on the worker."""
+        query = self.history.bind(mode)
+        self._hist_gen += 1
+        gen = self._hist_gen
+        self._hist_loading = True
+
+        def fetch():
+            caps = db_schema()          # connects if MySQL was down at startup: never on the Tk thread
+            sql, params = query(caps, self.service.history_select(caps))
+            with db_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(sql, params)
+                return cur.fetchall()
+
+        def done(rows):
+            if gen != self._hist_gen:
+                return  # superseded by a newer request
+            self._hist_loading = False
+            self._fill_orders_tree(self.history.apply(mode, rows))
+
+        def failed(e):
+            if gen == self._hist_gen:
+                self._hist_loading = False
+            messagebox.showerror("DB Error", f"Failed to load orders: {e}")
+
+        self.worker.submit(fetch, on_done=done, on_error=failed, label="Loading orders")
+
+    def _history_scrolled(self, last):
+        # lazily pull the next older page once the user nears the bottom
+        if last > 0.95 and self.history.has_older and self.history.rows and not self._hist_loading:
+            self._load_history("more")
+
+    @metrics.action("ui: Show orders")
+    def _fill_orders_tree(self, rows):
+        cache, view = {}, []
+        for r in rows:
+            vals = self._order_view.get(r[0])
+            if vals is None:
+                dt = r[2].strftime("%Y-%m-%d %H:%M") if hasattr(r[2], 'strftime') else str(r[2])
+                vals = (r[0], r[1], dt, r[3], r[4], f"{float(r[5]):.2f}", f"{float(r[6]):.2f}", f"{float(r[7]):.2f}", f"{float(r[8]):.2f}", f"{float(r[9]):.2f}", r[10])
+            cache[r[0]] = vals
+            view.append((r[0], vals))
+        self._order_view = cache
+        with metrics.span("tree.orders"):
+            self.orders_sync.sync(view)
+        h = self.history
+        info = f"{len(rows)} orders"
+        if not h.at_head:
+            info += " · newer ◀"
+        if h.has_older:
+            info += " · older ▶"
+        self.hist_info.config(text=info)
+
+    def export_selected_history_bill(self):
+        sel = self.orders_tree.selection()
+        if not sel:
+            return
+        order_id = int(self.orders_tree.item(sel[0], "values")[0])
+        self._export_order_by_id(order_id)
+
+    def _export_order_by_id(self, order_id: int):
+        def loaded(data):
+            self._last_saved = data
+            self.export_current_bill()
+        self.worker.submit(self.service.order, order_id, on_done=loaded,
+                           on_error=lambda e: messagebox.showerror("Export", f"Failed to load order {order_id}: {e}"),
+                           label="Loading order")
+
+    def batch_export_dialog(self):
+        win = tk.Toplevel(self.root); win.title("Batch Bill Export"); win.resizable(False, False)
+        idf, idt, df, dt = tk.StringVar(), tk.StringVar(), tk.StringVar(), tk.StringVar()
+        fmts = {f: tk.BooleanVar(value=(f == "pdf")) for f in bills.FORMATS}
+        as_zip = tk.BooleanVar(value=True)
+
+        ttk.Label(win, text="Order ID from / to:").grid(row=0, column=0, padx=10, pady=6, sticky="e")
+        ttk.Entry(win, textvariable=idf, width=10).grid(row=0, column=1, sticky="w")
+        ttk.Entry(win, textvariable=idt, width=10).grid(row=0, column=2, sticky="w", padx=(0, 10))
+        ttk.Label(win, text="Date from / to (YYYY-MM-DD):").grid(row=1, column=0, padx=10, pady=6, sticky="e")
+        ttk.Entry(win, textvariable=df, width=11).grid(row=1, column=1, sticky="w")
+        ttk.Entry(win, textvariable=dt, width=11).grid(row=1, column=2, sticky="w", padx=(0, 10))
+        ff = ttk.Frame(win); ff.grid(row=2, column=0, columnspan=3, pady=6)
+        for f, v in fmts.items():
+            ttk.Checkbutton(ff, text=f.upper(), variable=v).pack(side="left", padx=6)
+        ttk.Checkbutton(ff, text="Single .zip", variable=as_zip).pack(side="left", padx=6)
+        bar = ttk.Progressbar(win, mode="determinate", length=360)
+        bar.grid(row=3, column=0, columnspan=3, padx=10, pady=6)
+        info = ttk.Label(win, text="")
+        info.grid(row=4, column=0, columnspan=3, padx=10)
+
+        def start():
+            try:
+                sel = dict(id_from=int(idf.get()) if idf.get().strip() else None,
+                           id_to=int(idt.get()) if idt.get().strip() else None,
+                           date_from=parse_day(df.get()), date_to=parse_day(dt.get()))
+            except ValueError:
+                messagebox.showerror("Batch Export", "IDs must be numbers and dates YYYY-MM-DD.", parent=win)
+                return
+            sel["date_from"] = sel["date_from"] and sel["date_from"].date()
+            sel["date_to"] = sel["date_to"] and sel["date_to"].date()
+            formats = [f for f, v in fmts.items() if v.get()]
+            zipped = as_zip.get()
+
+            def progress(done, total):
+                def show():
+                    if bar.winfo_exists():
+                        bar.configure(maximum=max(total, 1), value=done)
+                        info.config(text=f"{done} / {total} bills")
+                self.worker.post(show)
+
+            def run():
+                import batch_export
+                with db_conn() as conn:
+                    return batch_export.export_bills(conn, formats=formats, as_zip=zipped, progress=progress,
+                                                    caps=db_schema(), **sel)
+
+            def done(res):
+                btn.state(["!disabled"])
+                messagebox.showinfo("Batch Export", res.summary(), parent=win if win.winfo_exists() else None)
+
+            def failed(e):
+                btn.state(["!disabled"])
+                messagebox.showerror("Batch Export", f"Export failed: {e}")
+
+            btn.state(["disabled"])
+            self.worker.submit(run, on_done=done, on_error=failed, label="Batch exporting bills")
+
+        btn = ttk.Button(win, text="Start", command=start, style="Primary.TButton")
+        btn.grid(row=5, column=0, columnspan=3, pady=10, sticky="we", padx=10)
+
+    # ===================== REPORTS ===========================
+    def export_sales(self, period: str):
+        self._run_report(self._sales_report, period, self.rep_gzip.get(), label=f"Exporting {period} sales")
+
+    def export_top_items(self):
+        self._run_report(self._top_items_report, self.rep_gzip.get(), label="Exporting top items")
+
+    def export_order_detail(self):
+        try:
+            date_from, date_to = parse_day(self.rep_from.get()), parse_day(self.rep_to.get())
+        except ValueError:
+            messagebox.showerror("Reports", "Dates must be YYYY-MM-DD.")
+            return
+        self._run_report(self._order_detail_report, date_from and date_from.date(), date_to and date_to.date(),
+                         self.rep_gzip.get(), label="Exporting order detail")
+
+    def export_analytics(self, report):
+        try:
+            date_from, date_to = parse_day(self.rep_from.get()), parse_day(self.rep_to.get())
+        except ValueError:
+            messagebox.showerror("Reports", "Dates must be YYYY-MM-DD.")
+            return
+        self._run_report(self._analytics_report, report, date_from and date_from.date(), date_to and date_to.date(),
+                         self.rep_gzip.get(), label=f"Analysing {report.replace('_', ' ')}")
+
+    def _analytics_report(self, report, date_from, date_to, gz=False):
+        import exports
+        header, rows = self.service.analytics(report, date_from, date_to)
+        span = f"{date_from or 'start'}_{date_to or 'today'}"
+        fname = exports.output_name(f"{report}_{span}", gz)
+        exports.write_csv(fname, header, rows, gz=gz)
+        return fname
+
+    # --------------------- shift close -------------
+    def show_shift_report(self, report=None):
+        """X-report of the open shift (read from the journal, no MySQL), or ``report``."""
+        report = report or self.service.shift()
+        win = tk.Toplevel(self.root)
+        win.title(f"{'Z' if report['closed'] else 'X'}-Report – shift #{report['shift']}")
+        win.geometry("460x560")
+        bar = ttk.Frame(win)
+        bar.pack(side="bottom", pady=6)
+        ttk.Button(bar, text="✔ Verify against orders",
+                   command=lambda: self.verify_shift(report["shift"])).pack(side="left", padx=5)
+        if RECEIPT_PRINTER:
+            ttk.Button(bar, text="🖨 Print", command=lambda: self.print_shift_report(report)).pack(side="left", padx=5)
+        txt = tk.Text(win, font=("Consolas", 10))
+        txt.pack(fill="both", expand=True)
+        txt.insert("end", shifts.text(report, width=48))
+        txt.configure(state="disabled")
+
+    def show_last_z_report(self):
+        closed = [r for r in self.service.recent_shifts(5) if r[2] is not None]
+        if not closed:
+            messagebox.showinfo("Shifts", "No shift has been closed on this till yet.")
+            return
+        self.show_shift_report(self.service.shift(closed[0][0]))
+
+    def close_shift_dialog(self):
+        report = self.service.shift()
+        win = tk.Toplevel(self.root)
+        win.title("Close Shift")
+        win.resizable(False, False)
+        cash = report["methods"].get("Cash", {}).get("total", 0)
+        ttk.Label(win, text=f"Shift #{report['shift']}: {report['totals']['orders']} orders, "
+                            f"₹{report['totals']['total']:.2f} (cash ₹{cash:.2f})").grid(
+            row=0, column=0, columnspan=2, padx=10, pady=(10, 4), sticky="w")
+        by, counted = tk.StringVar(), tk.StringVar()
+        ttk.Label(win, text="Closed by:").grid(row=1, column=0, padx=10, pady=4, sticky="w")
+        ttk.Entry(win, textvariable=by, width=24).grid(row=1, column=1, padx=10, sticky="we")
+        ttk.Label(win, text="Cash counted (₹):").grid(row=2, column=0, padx=10, pady=4, sticky="w")
+        ttk.Entry(win, textvariable=counted, width=24).grid(row=2, column=1, padx=10, sticky="we")
+
+        def close():
+            try:
+                z = self.service.close_shift(by.get(), counted.get().strip())
+            except ServiceError as e:
+                messagebox.showerror(e.title, str(e), parent=win)
+                return
+            win.destroy()
+            self.show_shift_report(z)
+        ttk.Button(win, text="Close Shift", command=close, style="Primary.TButton").grid(
+            row=3, column=0, columnspan=2, pady=10, sticky="we")
+
+    def verify_shift(self, shift_id):
+        def done(res):
+            if res["ok"]:
+                messagebox.showinfo("Shift audit", f"Shift #{res['shift']} matches the orders table.")
+                return
+            lines = [f"{m} {f}: ledger {a} / orders {b}" for m, f, a, b in res["differences"][:15]]
+            if res["unsynced"]:
+                lines.append(f"\n{res['unsynced']} order(s) of this shift are still waiting to sync.")
+            messagebox.showwarning("Shift audit", f"Shift #{res['shift']} differs from orders:\n" + "\n".join(lines))
+        self.worker.submit(self.service.verify_shift, shift_id, on_done=done,
+                           on_error=lambda e: messagebox.showerror("Shift audit", f"Audit failed: {e}"),
+                           label="Verifying shift")
+
+    def print_shift_report(self, report):
+        def send():
+            with open(RECEIPT_PRINTER, "wb") as dev:
+                dev.write(receipt.ESC_INIT + shifts.text(report).encode(receipt.ESCPOS_ENCODING, "replace")
+                          + b"\n" + receipt.GS_FEED_CUT)
+        self.worker.submit(send, on_error=lambda e: messagebox.showerror("Print", f"Printer error: {e}"),
+                           label="Printing shift report")
+
+    def _run_report(self, fn, *args, label):
+        self.worker.submit(fn, *args,
+                           on_done=lambda fname: messagebox.showinfo("Reports", f"Exported {fname}"),
+                           on_error=lambda e: messagebox.showerror("Reports", f"Export failed: {e}"),
+                           label=label)
+
+    @staticmethod
+    def _sales_report(period: str, gz=False):
+        import exports
+        if period not in ("daily", "weekly"):
+            period = "monthly"
+        fname = exports.output_name(f"sales_{period}", gz)
+        with db_conn() as conn:
+            rows = exports.stream_rows(conn, rollup.sales_sql(db_schema(), period))
+            exports.write_csv(fname, ["Period", "Total Sales"],
+                              ((r[0], f"{float(r[1] or 0):.2f}") for r in rows), gz=gz)
+        return fname
+
+    @staticmethod
+    def _top_items_report(gz=False):
+        import exports
+        fname = exports.output_name("top_items", gz)
+        with db_conn() as conn:
+            rows = exports.stream_rows(conn, rollup.top_items_sql(db_schema()))
+            exports.write_csv(fname, ["Item", "Quantity Sold", "Revenue"],
+                              ((r[0], int(r[1] or 0), f"{float(r[2] or 0):.2f}") for r in rows), gz=gz)
+        return fname
+
+    def _order_detail_report(self, date_from, date_to, gz=False):
+        import exports
+        span = f"{date_from or 'start'}_{date_to or 'today'}"
+        fname = exports.output_name(f"orders_detail_{span}", gz)
+        with db_conn() as conn:
+            n = exports.export_order_detail(conn, db_schema(), fname, date_from, date_to, gz=gz,
+                                            archive=self.service.archive())
+        return f"{fname} ({n} lines)"
+
+# ------------------------- MAIN -----------------------------
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = POSApp(root)
+    root.mainloop()
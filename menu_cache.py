@@ -0,0 +1,132 @@
+"""In-memory menu catalog for the POS tab.
+
+The active menu is loaded once and kept in memory with per-category buckets
+and an n-gram index over ``item_name``. Search-as-you-type and category
+filtering never touch MySQL. The catalog is reloaded only after it is
+invalidated (admin add/edit/delete/import) or when ``is_stale()`` sees the
+table fingerprint change.
+"""
+import threading
+import time
+
+# Rows are stored exactly as the Treeview shows them.
+MENU_SQL = ("SELECT id, item_name, category, price, gst FROM menu "
+            "WHERE is_active=1 ORDER BY category, item_name")
+
+# One cheap aggregate instead of re-reading the table. It changes whenever a
+# row is inserted, deleted or edited in any column the POS shows.
+VERSION_SQL = ("SELECT COUNT(*), COALESCE(MAX(id),0), "
+               "COALESCE(SUM(CRC32(CONCAT_WS('|',id,item_name,category,price,gst,is_active))),0) "
+               "FROM menu")
+
+NGRAM = 3
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class _Snapshot:
+    __slots__ = ("rows", "by_id", "categories", "by_category", "index", "names", "version")
+
+    def __init__(self, rows, version):
+        self.rows = rows
+        self.version = version
+        self.by_id = {r[0]: r for r in rows}
+        self.names = [str(r[1] or "").lower() for r in rows]
+        self.by_category = {}
+        self.index = {}
+        for pos, r in enumerate(rows):
+            if r[2]:
+                self.by_category.setdefault(r[2], []).append(pos)
+            name = self.names[pos]
+            # every 1..NGRAM-length substring -> row positions
+            for n in range(1, NGRAM + 1):
+                for g in _grams(name, n):
+                    self.index.setdefault(g, set()).add(pos)
+        self.categories = sorted(self.by_category)
+
+
+class MenuCatalog:
+    def __init__(self, max_age=30.0):
+        """``max_age``: seconds between version checks in ``is_stale()``."""
+        self.max_age = max_age
+        self._snap = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # --------------------- load / invalidate ---------------------
+    @property
+    def loaded(self):
+        return self._snap is not None
+
+    def load(self, conn):
+        cur = conn.cursor()
+        cur.execute(VERSION_SQL)
+        version = tuple(cur.fetchone())
+        cur.execute(MENU_SQL)
+        return self.load_rows([tuple(r) for r in cur.fetchall()], version)
+
+    def load_rows(self, rows, version=None):
+        """Install ``rows`` (e.g. a saved offline copy). With no ``version``
+        the next ``is_stale()`` check reports stale, so MySQL wins once reachable."""
+        snap = _Snapshot(rows, version)
+        with self._lock:
+            self._snap = snap
+            self._checked_at = time.monotonic()
+        return snap
+
+    def invalidate(self):
+        with self._lock:
+            self._snap = None
+
+    def is_stale(self, conn, force=False):
+        """Compare the table fingerprint with the loaded one (throttled)."""
+        snap = self._snap
+        if snap is None:
+            return True
+        if not force and time.monotonic() - self._checked_at < self.max_age:
+            return False
+        cur = conn.cursor()
+        cur.execute(VERSION_SQL)
+        version = tuple(cur.fetchone())
+        self._checked_at = time.monotonic()
+        return version != snap.version
+
+    # --------------------- queries ---------------------
+    def categories(self):
+        snap = self._snap
+        return list(snap.categories) if snap else []
+
+    def get(self, item_id):
+        snap = self._snap
+        return snap.by_id.get(item_id) if snap else None
+
+    def search(self, text="", category="All"):
+        """Active rows whose name contains ``text`` (case-insensitive), in menu order."""
+        snap = self._snap
+        if snap is None:
+            return []
+        q = (text or "").strip().lower()
+        if category and category != "All":
+            pool = snap.by_category.get(category, [])
+        else:
+            pool = None
+
+        if not q:
+            positions = pool if pool is not None else range(len(snap.rows))
+            return [snap.rows[p] for p in positions]
+
+        if len(q) <= NGRAM:
+            hits = snap.index.get(q, set())
+        else:
+            grams = sorted(_grams(q, NGRAM), key=lambda g: len(snap.index.get(g, ())))
+            hits = set(snap.index.get(grams[0], ()))
+            for g in grams[1:]:
+                if not hits:
+                    break
+                hits &= snap.index.get(g, set())
+            hits = {p for p in hits if q in snap.names[p]}
+        if pool is not None:
+            hits = hits.intersection(pool)
+        return [snap.rows[p] for p in sorted(hits)]
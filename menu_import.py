@@ -0,0 +1,143 @@
+"""Bulk menu import from CSV.
+
+The file is parsed as a stream and validated row by row. Valid rows are
+written in batches with one multi-row upsert per batch, all inside a single
+transaction. Rows are matched to existing items by ``item_name``
+(case-insensitive). Known names are upserted on their primary key, so this
+works whether or not ``menu.item_name`` has a unique index. Rejected rows go
+to ``<file>.errors.csv`` with the reason, instead of being dropped silently.
+
+Accepted columns: item_name (or name), category, price, gst, is_active.
+"""
+import csv
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+BATCH_ROWS = 1000
+MAX_NAME = 100
+MAX_CATEGORY = 50
+MAX_PRICE = Decimal("99999999.99")    # DECIMAL(10,2)
+
+
+class ImportResult:
+    __slots__ = ("rows", "inserted", "updated", "errors", "seconds", "error_file")
+
+    def __init__(self):
+        self.rows = self.inserted = self.updated = self.errors = 0
+        self.seconds = 0.0
+        self.error_file = None
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        s = (f"{self.inserted} added, {self.updated} updated, {self.errors} rejected "
+             f"({self.rows} rows in {self.seconds:.1f}s, {self.rate:,.0f} rows/s)")
+        if self.error_file:
+            s += f"\nRejected rows: {self.error_file}"
+        return s
+
+
+# ------------------------- VALIDATION ------------------------
+def _decimal(value, field, lo, hi):
+    try:
+        d = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if not d.is_finite() or d < lo or d > hi:
+        raise ValueError(f"{field} out of range ({lo}..{hi}): {value!r}")
+    return d.quantize(Decimal("0.01"))
+
+
+def validate_row(r):
+    """CSV dict -> (item_name, category, price, gst, is_active). Raises ValueError."""
+    name = (r.get("item_name") or r.get("name") or "").strip()
+    if not name:
+        raise ValueError("item_name is required")
+    if len(name) > MAX_NAME:
+        raise ValueError(f"item_name longer than {MAX_NAME} characters")
+    cat = (r.get("category") or "").strip()
+    if not cat:
+        raise ValueError("category is required")
+    if len(cat) > MAX_CATEGORY:
+        raise ValueError(f"category longer than {MAX_CATEGORY} characters")
+    price = _decimal(r.get("price") or "", "price", Decimal(0), MAX_PRICE)
+    gst = _decimal(r.get("gst") or "0", "gst", Decimal(0), Decimal(100))
+    act = (r.get("is_active") or "1").strip().lower()
+    if act not in ("0", "1", "true", "false", "yes", "no"):
+        raise ValueError(f"is_active must be 0/1: {act!r}")
+    return name, cat, price, gst, 1 if act in ("1", "true", "yes") else 0
+
+
+# ------------------------- IMPORT ----------------------------
+UPSERT_HEAD = "INSERT INTO menu (id, item_name, category, price, gst, is_active) VALUES "
+UPSERT_TAIL = (" ON DUPLICATE KEY UPDATE item_name=VALUES(item_name), category=VALUES(category), "
+               "price=VALUES(price), gst=VALUES(gst), is_active=VALUES(is_active)")
+
+
+def _flush(cur, batch):
+    cur.execute(UPSERT_HEAD + ",".join(["(%s,%s,%s,%s,%s,%s)"] * len(batch)) + UPSERT_TAIL,
+                tuple(v for row in batch for v in row))
+
+
+def import_menu(conn, path, batch_size=BATCH_ROWS, progress=None, error_path=None):
+    """Import ``path`` into ``menu`` in one transaction; returns ImportResult.
+
+    ``progress(result)`` is called after every batch (from this thread).
+    """
+    res = ImportResult()
+    t0 = time.perf_counter()
+    error_path = error_path or os.path.splitext(path)[0] + ".errors.csv"
+    err_f = err_w = None
+
+    cur = conn.cursor()
+    cur.execute("SELECT id, item_name FROM menu")
+    known = {str(n).strip().lower(): i for i, n in cur.fetchall() if n is not None}
+    seen = {}           # lower name -> CSV line number, for duplicates within the file
+    batch = []
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            for r in reader:
+                res.rows += 1
+                line = reader.line_num
+                try:
+                    name, cat, price, gst, act = validate_row(r)
+                    key = name.lower()
+                    if key in seen:
+                        raise ValueError(f"duplicate item_name (first seen on line {seen[key]})")
+                    seen[key] = line
+                except ValueError as e:
+                    res.errors += 1
+                    if err_w is None:
+                        err_f = open(error_path, "w", newline="", encoding="utf-8")
+                        err_w = csv.writer(err_f)
+                        err_w.writerow(["line", "error"] + list(reader.fieldnames or []))
+                    err_w.writerow([line, str(e)] + [r.get(k, "") for k in (reader.fieldnames or [])])
+                    continue
+
+                mid = known.get(key)
+                if mid is None:
+                    res.inserted += 1
+                else:
+                    res.updated += 1
+                batch.append((mid, name, cat, price, gst, act))
+                if len(batch) >= batch_size:
+                    _flush(cur, batch)
+                    batch = []
+                    res.seconds = time.perf_counter() - t0
+                    if progress:
+                        progress(res)
+        if batch:
+            _flush(cur, batch)
+        conn.commit()
+    finally:
+        if err_f is not None:
+            err_f.close()
+            res.error_file = error_path
+    res.seconds = time.perf_counter() - t0
+    if progress:
+        progress(res)
+    return res
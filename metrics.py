@@ -0,0 +1,269 @@
+"""Hot-path timing for the till: where does a slow click spend its time?
+
+``span(name)`` times a block: a ``db_conn()`` checkout, a Treeview refresh, a
+bill render or an export. ``action(name)`` times one user-visible operation,
+either a click handled on the Tk thread or a background job. SQL statements
+run through ``TimedCursor`` (the pool's ``on_cursor`` hook). Each statement
+is timed as a ``sql.<VERB>`` span and counted against the action running on
+that thread. That gives queries and DB time per action.
+
+Everything lands in one in-process ``Registry`` (count, avg, p95, max), shown
+on the Diagnostics tab. With ``configure(log_path=...)`` every finished action,
+and every statement slower than ``slow_sql_ms``, is also written as a JSON line
+to a size-rotated log. ``profile_next()`` arms cProfile for the next action
+that starts. Its stats are saved as a ``.prof`` file in ``profile_dir`` and
+summarised in ``last_profile``.
+"""
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+RECENT = 512              # samples kept per name for percentiles
+SLOW_ACTION_MS = 300.0
+SLOW_SQL_MS = 100.0
+
+_log = logging.getLogger("pos.metrics")
+_log.propagate = False
+_current = contextvars.ContextVar("pos_metrics_action", default=None)
+_profile_dir = "profiles"
+
+
+# ------------------------- REGISTRY --------------------------
+class Stat:
+    __slots__ = ("count", "total", "max", "last", "queries", "db", "errors", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = self.max = self.last = self.db = 0.0
+        self.queries = self.errors = 0
+        self.recent = deque(maxlen=RECENT)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.last_action = None       # dict of the most recently finished action
+
+    def record(self, name, seconds, queries=0, db=0.0, error=False):
+        with self._lock:
+            s = self._stats.get(name)
+            if s is None:
+                s = self._stats[name] = Stat()
+            s.count += 1
+            s.total += seconds
+            s.last = seconds
+            s.max = max(s.max, seconds)
+            s.queries += queries
+            s.db += db
+            s.errors += error
+            s.recent.append(seconds)
+
+    def snapshot(self):
+        """One dict per name (times in ms), worst p95 first."""
+        with self._lock:
+            items = [(name, s.count, s.total, s.max, s.last, s.queries, s.db, s.errors, sorted(s.recent))
+                     for name, s in self._stats.items()]
+        out = []
+        for name, count, total, mx, last, queries, db, errors, recent in items:
+            p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+            out.append(dict(name=name, count=count, avg_ms=total / count * 1000, p95_ms=p95 * 1000,
+                            max_ms=mx * 1000, last_ms=last * 1000, queries=queries / count,
+                            db_ms=db / count * 1000, errors=errors))
+        out.sort(key=lambda r: r["p95_ms"], reverse=True)
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.last_action = None
+
+
+REGISTRY = Registry()
+
+
+# ------------------------- SPANS -----------------------------
+@contextmanager
+def span(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.record(name, time.perf_counter() - t)
+
+
+class _Action:
+    __slots__ = ("name", "queries", "db")
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.db = 0.0
+
+
+@contextmanager
+def action(name):
+    """Time one user-visible operation and the SQL it runs (also a decorator)."""
+    act = _Action(name)
+    token = _current.set(act)
+    prof = _claim_profiler()
+    failed = False
+    t = time.perf_counter()
+    try:
+        yield act
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        dt = time.perf_counter() - t
+        _current.reset(token)
+        if prof is not None:
+            prof.disable()
+            _save_profile(prof, name)
+        REGISTRY.record(name, dt, act.queries, act.db, failed)
+        rec = dict(ts=datetime.now().isoformat(timespec="milliseconds"), action=name, ms=round(dt * 1000, 2),
+                   queries=act.queries, db_ms=round(act.db * 1000, 2))
+        if failed:
+            rec["error"] = True
+        REGISTRY.last_action = rec
+        if _log.handlers:
+            _log.info(json.dumps(rec))
+
+
+def sql_timed(sql, seconds):
+    verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "?"
+    REGISTRY.record("sql." + verb, seconds)
+    act = _current.get()
+    if act is not None:
+        act.queries += 1
+        act.db += seconds
+    if seconds * 1000 >= SLOW_SQL_MS and _log.handlers:
+        _log.info(json.dumps(dict(ts=datetime.now().isoformat(timespec="milliseconds"),
+                                  slow_sql=" ".join(sql.split())[:300], ms=round(seconds * 1000, 2),
+                                  action=act.name if act else None)))
+
+
+class TimedCursor:
+    """Cursor proxy that times ``execute``/``executemany`` (see ``sql_timed``)."""
+    __slots__ = ("_cur",)
+
+    def __init__(self, cur):
+        self._cur = cur
+
+    def execute(self, sql, *args, **kw):
+        t = time.perf_counter()
+        try:
+            r = self._cur.execute(sql, *args, **kw)
+        finally:
+            sql_timed(sql, time.perf_counter() - t)
+        return self if r is self._cur else r
+
+    def executemany(self, sql, *args, **kw):
+        t = time.perf_counter()
+        try:
+            r = self._cur.executemany(sql, *args, **kw)
+        finally:
+            sql_timed(sql, time.perf_counter() - t)
+        return self if r is self._cur else r
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cur.close()
+        return False
+
+
+def timed_cursor(cur):
+    return TimedCursor(cur)
+
+
+def event(name, **fields):
+    """Log a one-off JSON line, e.g. the startup phases."""
+    if _log.handlers:
+        _log.info(json.dumps(dict(ts=datetime.now().isoformat(timespec="milliseconds"), event=name, **fields)))
+
+
+# ------------------------- PROFILING -------------------------
+_profile_lock = threading.Lock()
+_profile_armed = False
+last_profile = None       # (action name, .prof path, text summary)
+
+
+def profile_next():
+    """Capture a cProfile of the next action that starts (on any thread)."""
+    global _profile_armed
+    with _profile_lock:
+        _profile_armed = True
+
+
+def profile_armed():
+    return _profile_armed
+
+
+def _claim_profiler():
+    global _profile_armed
+    if not _profile_armed:
+        return None
+    with _profile_lock:
+        if not _profile_armed:
+            return None
+        _profile_armed = False
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:          # another profiler already active on this thread
+        return None
+    return prof
+
+
+def _save_profile(prof, name, top=30):
+    global last_profile
+    path = None
+    try:
+        os.makedirs(_profile_dir, exist_ok=True)
+        safe = "".join(c if c.isalnum() else "_" for c in name).strip("_")
+        path = os.path.join(_profile_dir, f"{datetime.now():%Y%m%d_%H%M%S}_{safe}.prof")
+        prof.dump_stats(path)
+    except OSError:
+        path = None
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+    last_profile = (name, path, buf.getvalue())
+
+
+# ------------------------- SETUP -----------------------------
+def configure(log_path=None, max_bytes=5_000_000, backups=3, slow_action_ms=None, slow_sql_ms=None,
+              profile_dir=None):
+    """Turn on the JSON-lines log and set thresholds; call once at startup."""
+    global SLOW_ACTION_MS, SLOW_SQL_MS, _profile_dir
+    if slow_action_ms is not None:
+        SLOW_ACTION_MS = float(slow_action_ms)
+    if slow_sql_ms is not None:
+        SLOW_SQL_MS = float(slow_sql_ms)
+    if profile_dir is not None:
+        _profile_dir = profile_dir
+    for h in list(_log.handlers):
+        _log.removeHandler(h)
+        h.close()
+    if log_path:
+        h = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        h.setFormatter(logging.Formatter("%(message)s"))
+        _log.addHandler(h)
+        _log.setLevel(logging.INFO)
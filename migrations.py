@@ -0,0 +1,443 @@
+"""Versioned schema migrations for the MySQL database.
+
+Older installs were created from earlier copies of database.sql. Their menu
+column is ``name`` instead of ``item_name``, and ``service_charge``,
+``customer_mobile``, ``reference_no``, the report rollups, the item snapshot
+and rule discount on order lines, the customers directory and the indexes
+the queries rely on may be missing. Each migration below inspects the live
+schema and emits only the DDL still needed. It is therefore safe on any of
+those databases, and on a fresh one where it changes nothing. Applied versions are recorded in
+``schema_migrations``.
+
+    python migrations.py                 # apply pending migrations
+    python migrations.py --status        # applied / pending + missing indexes
+    python migrations.py --dry-run       # print the SQL instead of running it
+    python migrations.py --partition-orders [--months-ahead 3]
+    python migrations.py --extend-partitions [--months-ahead 3]
+
+Partitioning ``orders`` by month is opt-in, for large installations: date
+filters and rollup rebuilds then read only the months they need. MySQL does
+not allow foreign keys on partitioned tables. Every unique key must also
+include the partition column, so ``--partition-orders`` drops the
+order_items -> orders foreign key and widens the primary key and
+``uq_orders_reference_no`` with ``order_date``. Run ``--extend-partitions``
+monthly (e.g. from cron) so new months get their own partition instead of
+landing in ``pmax``.
+
+The app calls ``check()`` at startup and warns about pending migrations and
+missing indexes; it never changes the schema by itself.
+"""
+import argparse
+from datetime import date
+
+import customers
+import rollup
+from order_store import SchemaCaps
+
+# Expected secondary indexes: table -> (name, columns, unique). An existing
+# index whose leading columns match counts as present, whatever its name.
+INDEXES = {
+    "menu": [
+        ("uq_menu_item_name", ("item_name",), True),
+        ("idx_menu_active", ("is_active", "category", "item_name"), False),   # menu catalog load
+    ],
+    "orders": [
+        ("uq_orders_reference_no", ("reference_no",), True),                # journal replay
+        ("idx_orders_order_date", ("order_date",), False),                  # date filters, rebuilds
+        ("idx_orders_customer_name", ("customer_name",), False),            # history prefix search
+        ("idx_orders_customer_mobile", ("customer_mobile",), False),
+        ("idx_orders_payment_method", ("payment_method",), False),          # history filter, keyset on id
+    ],
+    "order_items": [
+        # covering: bill lines, batch export and the order-detail CSV never touch the row
+        ("idx_order_items_order", ("order_id", "menu_item_id", "quantity", "price", "gst"), False),
+        # covering: top-items fallback and rollup rebuild aggregate by item
+        ("idx_order_items_item", ("menu_item_id", "quantity", "price"), False),
+    ],
+    "sales_daily_items": [
+        ("idx_sdi_item", ("menu_item_id",), False),
+    ],
+    "customers": [
+        ("idx_customers_name", ("name",), False),
+    ],
+}
+
+ROLLUP_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        sale_date DATE NOT NULL,
+        payment_method VARCHAR(10) NOT NULL,
+        orders INT NOT NULL DEFAULT 0,
+        subtotal DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        tax DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        discount DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        service DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        total DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        PRIMARY KEY (sale_date, payment_method)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales_daily_items (
+        sale_date DATE NOT NULL,
+        menu_item_id INT NOT NULL,
+        payment_method VARCHAR(10) NOT NULL,
+        quantity INT NOT NULL DEFAULT 0,
+        gross DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        tax DECIMAL(14,4) NOT NULL DEFAULT 0.0000,
+        PRIMARY KEY (sale_date, menu_item_id, payment_method)
+    )
+    """,
+)
+
+CUSTOMERS_DDL = """
+    CREATE TABLE IF NOT EXISTS customers (
+        mobile VARCHAR(15) PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        visits INT NOT NULL DEFAULT 0,
+        total_spend DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        first_visit TIMESTAMP NULL,
+        last_visit TIMESTAMP NULL,
+        INDEX idx_customers_name (name)
+    )
+    """
+
+
+# ------------------------- INSPECTION ------------------------
+class Schema:
+    """Columns (name -> COLUMN_TYPE) and indexes (name -> columns) per table."""
+
+    def __init__(self, conn):
+        cur = conn.cursor()
+        cur.execute("SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE()")
+        self.columns = {}
+        for table, col, ctype in cur.fetchall():
+            self.columns.setdefault(str(table).lower(), {})[str(col).lower()] = str(ctype).lower()
+        cur.execute("SELECT TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME FROM information_schema.STATISTICS "
+                    "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX")
+        self.indexes = {}
+        for table, index, _, col in cur.fetchall():
+            self.indexes.setdefault(str(table).lower(), {}).setdefault(str(index), []).append(str(col).lower())
+
+    def has(self, table, column):
+        return column in self.columns.get(table, {})
+
+    def has_index(self, table, columns):
+        n = len(columns)
+        return any(tuple(cols[:n]) == tuple(columns) for cols in self.indexes.get(table, {}).values())
+
+
+def missing_indexes(schema):
+    """[(table, name, columns, unique)] expected by INDEXES but absent.
+
+    Tables or columns that do not exist yet are skipped (a migration adds them).
+    """
+    out = []
+    for table, wanted in INDEXES.items():
+        if table not in schema.columns:
+            continue
+        for name, cols, unique in wanted:
+            if all(schema.has(table, c) for c in cols) and not schema.has_index(table, cols):
+                out.append((table, name, cols, unique))
+    return out
+
+
+def _add_index(table, name, cols, unique):
+    kind = "UNIQUE KEY" if unique else "INDEX"
+    return f"ALTER TABLE {table} ADD {kind} {name} ({', '.join(cols)})"
+
+
+# ------------------------- MIGRATIONS ------------------------
+# Each step takes the current Schema and returns what is still to do: SQL
+# strings, or callables(conn) for data steps.
+def _menu_item_name(s):
+    steps = []
+    if s.has("menu", "name") and not s.has("menu", "item_name"):
+        steps.append("ALTER TABLE menu CHANGE COLUMN name item_name VARCHAR(100) NOT NULL")
+    if s.columns.get("menu", {}).get("category", "").startswith("enum("):
+        # the shipped ENUM rejects Starters / Breads / Rice from the seed menu and CSV imports
+        steps.append("ALTER TABLE menu MODIFY category VARCHAR(50) NOT NULL")
+    return steps
+
+
+def _order_columns(s):
+    steps = []
+    if not s.has("orders", "customer_mobile"):
+        steps.append("ALTER TABLE orders ADD COLUMN customer_mobile VARCHAR(15) NULL AFTER customer_name")
+    if not s.has("orders", "service_charge"):
+        steps.append("ALTER TABLE orders ADD COLUMN service_charge DECIMAL(10,2) NOT NULL DEFAULT 0.00 AFTER discount")
+    return steps
+
+
+def _reference_no(s):
+    steps = []
+    if not s.has("orders", "reference_no"):
+        steps.append("ALTER TABLE orders ADD COLUMN reference_no VARCHAR(32) NULL")
+    if not s.has_index("orders", ("reference_no",)):
+        steps.append(_no_duplicates("orders", "uq_orders_reference_no", ("reference_no",)))
+        steps.append(_add_index("orders", "uq_orders_reference_no", ("reference_no",), True))
+    return steps
+
+
+def _rollup_tables(s):
+    if all(t in s.columns for t in rollup.ROLLUP_TABLES):
+        return []
+
+    def rebuild(conn):
+        rollup.rebuild(conn, SchemaCaps.detect(conn))
+    rebuild.__doc__ = "rebuild the rollups from orders (rollup.rebuild)"
+    return list(ROLLUP_DDL) + [rebuild]
+
+
+def _no_duplicates(table, name, cols):
+    """Step that stops before ``name`` is added if ``cols`` already repeat.
+
+    A legacy menu can hold the same item twice; MySQL would reject the
+    UNIQUE KEY (1062) with no hint which rows. They are listed instead, to be
+    renamed or merged by hand (order lines point at the ids).
+    """
+    def check(conn):
+        keys = ", ".join(cols)
+        cur = conn.cursor()
+        cur.execute(f"SELECT {keys}, GROUP_CONCAT(id ORDER BY id) FROM {table} "
+                    f"WHERE {' AND '.join(f'{c} IS NOT NULL' for c in cols)} "
+                    f"GROUP BY {keys} HAVING COUNT(*) > 1 ORDER BY {keys}")
+        dups = cur.fetchall()
+        if dups:
+            lines = "\n".join(f"  {', '.join(repr(v) for v in row[:-1])}: ids {row[-1]}" for row in dups)
+            raise SystemExit(f"cannot add {name}: {table}({keys}) has duplicates\n{lines}\n"
+                             f"rename or merge them, then run migrations.py again")
+    check.__doc__ = f"check {table}({', '.join(cols)}) has no duplicates"
+    return check
+
+
+def _indexes(s):
+    steps = []
+    for table, name, cols, unique in missing_indexes(s):
+        if unique:
+            steps.append(_no_duplicates(table, name, cols))
+        steps.append(_add_index(table, name, cols, unique))
+    return steps
+
+
+BACKFILL_BATCH = 50000
+
+
+def backfill_item_snapshot(conn, batch=BACKFILL_BATCH):
+    """copy menu name/category onto order lines that have none"""
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM order_items")
+    lo, hi = (int(v) for v in cur.fetchone())
+    for start in range(lo, hi + 1, batch):
+        cur.execute(
+            "UPDATE order_items oi JOIN menu m ON m.id = oi.menu_item_id "
+            "SET oi.item_name = m.item_name, oi.category = m.category "
+            "WHERE oi.id BETWEEN %s AND %s AND oi.item_name IS NULL", (start, start + batch - 1))
+        conn.commit()
+
+
+def _item_snapshot(s):
+    steps = []
+    if not s.has("order_items", "item_name"):
+        steps.append("ALTER TABLE order_items ADD COLUMN item_name VARCHAR(100) NULL")
+    if not s.has("order_items", "category"):
+        steps.append("ALTER TABLE order_items ADD COLUMN category VARCHAR(50) NULL")
+    return steps + [backfill_item_snapshot]
+
+
+def _customers(s):
+    if "customers" in s.columns:
+        return []
+
+    def rebuild(conn):
+        customers.rebuild(conn)
+    rebuild.__doc__ = "fill customers from orders (customers.rebuild)"
+    return [CUSTOMERS_DDL, rebuild]
+
+
+def _line_discount(s):
+    if s.has("order_items", "discount"):
+        return []
+    # older lines had their rule savings only in orders.discount; they stay at 0
+    return ["ALTER TABLE order_items ADD COLUMN discount DECIMAL(10,2) NOT NULL DEFAULT 0.00"]
+
+
+MIGRATIONS = [
+    (1, "menu.item_name and free-text category", _menu_item_name),
+    (2, "orders.customer_mobile and orders.service_charge", _order_columns),
+    (3, "orders.reference_no", _reference_no),
+    (4, "sales_daily rollup tables", _rollup_tables),
+    (5, "covering indexes for history, bills and reports", _indexes),
+    (6, "order_items item name/category snapshot", _item_snapshot),
+    (7, "customers directory", _customers),
+    (8, "order_items line discount", _line_discount),
+]
+
+
+# ------------------------- RUNNER ----------------------------
+MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+
+
+def applied(conn):
+    """Versions recorded in ``schema_migrations`` (empty if it does not exist yet)."""
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'schema_migrations'")
+    if not cur.fetchone()[0]:
+        return set()
+    cur.execute("SELECT version FROM schema_migrations")
+    return {int(v) for (v,) in cur.fetchall()}
+
+
+def pending(conn):
+    done = applied(conn)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def migrate(conn, dry_run=False, log=print):
+    """Apply pending migrations in order; returns the versions applied.
+
+    MySQL commits DDL implicitly, so each migration is recorded right after
+    its statements; a failure leaves the earlier ones applied and recorded.
+    """
+    done = []
+    todo = pending(conn)
+    if todo and not dry_run:
+        conn.cursor().execute(MIGRATIONS_DDL)
+    for version, name, plan in todo:
+        steps = plan(Schema(conn))
+        log(f"-- {version:03d} {name}" + ("" if steps else " (nothing to change)"))
+        for step in steps:
+            log(f"   {step.__doc__}" if callable(step) else "   " + " ".join(step.split()) + ";")
+            if dry_run:
+                continue
+            if callable(step):
+                step(conn)
+            else:
+                conn.cursor().execute(step)
+        if not dry_run:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+        done.append(version)
+    return done
+
+
+def check(conn):
+    """(pending migration names, missing index descriptions) for the startup warning."""
+    todo = [f"{v:03d} {name}" for v, name, _ in pending(conn)]
+    missing = [f"{t}({', '.join(cols)})" for t, _, cols, _ in missing_indexes(Schema(conn))]
+    return todo, missing
+
+
+# ------------------------- PARTITIONING ----------------------
+def _month(d, n=0):
+    m = d.year * 12 + d.month - 1 + n
+    return date(m // 12, m % 12 + 1, 1)
+
+
+def _partition(start):
+    nxt = _month(start, 1)
+    return f"PARTITION p{start:%Y%m} VALUES LESS THAN (UNIX_TIMESTAMP('{nxt:%Y-%m-%d} 00:00:00'))"
+
+
+def _partitions(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT PARTITION_NAME FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA = DATABASE() "
+                "AND TABLE_NAME = 'orders' AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION")
+    return [r[0] for r in cur.fetchall()]
+
+
+def partition_orders(conn, months_ahead=3, dry_run=False, log=print):
+    """Repartition ``orders`` by month of ``order_date`` (see module docstring)."""
+    if _partitions(conn):
+        raise SystemExit("orders is already partitioned; use --extend-partitions")
+    cur = conn.cursor()
+    cur.execute("SELECT MIN(order_date) FROM orders")
+    first = cur.fetchone()[0] or date.today()
+    cur.execute("SELECT CONSTRAINT_NAME, TABLE_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+                "WHERE CONSTRAINT_SCHEMA = DATABASE() AND (REFERENCED_TABLE_NAME = 'orders' OR TABLE_NAME = 'orders')")
+    steps = [f"ALTER TABLE {table} DROP FOREIGN KEY {name}" for name, table in cur.fetchall()]
+    keys = ["MODIFY order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+            "DROP PRIMARY KEY", "ADD PRIMARY KEY (id, order_date)"]
+    if Schema(conn).has_index("orders", ("reference_no",)):
+        keys += ["DROP INDEX uq_orders_reference_no", "ADD UNIQUE KEY uq_orders_reference_no (reference_no, order_date)"]
+    steps.append("ALTER TABLE orders " + ", ".join(keys))
+    month, last = _month(first), _month(date.today(), months_ahead)
+    parts = []
+    while month <= last:
+        parts.append(_partition(month))
+        month = _month(month, 1)
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    steps.append("ALTER TABLE orders PARTITION BY RANGE (UNIX_TIMESTAMP(order_date)) (\n  "
+                 + ",\n  ".join(parts) + ")")
+    for sql in steps:
+        log(sql + ";")
+        if not dry_run:
+            conn.cursor().execute(sql)
+    return len(parts)
+
+
+def extend_partitions(conn, months_ahead=3, dry_run=False, log=print):
+    """Split ``pmax`` so every month up to ``months_ahead`` has a partition."""
+    names = [n for n in _partitions(conn) if n != "pmax"]
+    if not names:
+        raise SystemExit("orders is not partitioned; use --partition-orders first")
+    latest = max(names)
+    month = _month(date(int(latest[1:5]), int(latest[5:7]), 1), 1)
+    last = _month(date.today(), months_ahead)
+    parts = []
+    while month <= last:
+        parts.append(_partition(month))
+        month = _month(month, 1)
+    if not parts:
+        log("-- partitions already cover the next months")
+        return 0
+    sql = ("ALTER TABLE orders REORGANIZE PARTITION pmax INTO (\n  " + ",\n  ".join(parts)
+           + ",\n  PARTITION pmax VALUES LESS THAN MAXVALUE)")
+    log(sql + ";")
+    if not dry_run:
+        conn.cursor().execute(sql)
+    return len(parts)
+
+
+# ------------------------- CLI -------------------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bring the billing database schema up to date.")
+    ap.add_argument("--status", action="store_true", help="show applied/pending migrations and missing indexes")
+    ap.add_argument("--dry-run", action="store_true", help="print the SQL without running it")
+    ap.add_argument("--partition-orders", action="store_true", help="partition orders by month (large installs)")
+    ap.add_argument("--extend-partitions", action="store_true", help="add partitions for the coming months")
+    ap.add_argument("--months-ahead", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    from main import db_conn
+    with db_conn() as conn:
+        if args.status:
+            done = applied(conn)
+            for version, name, _ in MIGRATIONS:
+                print(f"{'applied' if version in done else 'PENDING':>8}  {version:03d} {name}")
+            missing = missing_indexes(Schema(conn))
+            for table, name, cols, _ in missing:
+                print(f"{'MISSING':>8}  {name} ON {table} ({', '.join(cols)})")
+            parts = _partitions(conn)
+            print(f"orders partitions: {len(parts) if parts else 'none'}")
+        elif args.partition_orders:
+            n = partition_orders(conn, args.months_ahead, args.dry_run)
+            print(f"-- {n} partitions")
+        elif args.extend_partitions:
+            extend_partitions(conn, args.months_ahead, args.dry_run)
+        else:
+            done = migrate(conn, args.dry_run)
+            print(f"{len(done)} migration(s) {'planned' if args.dry_run else 'applied'}" if done
+                  else "schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Order persistence with a fixed number of round trips per bill.
+
+A bill is written as one INSERT into ``orders`` and one multi-row INSERT into
+``order_items``, whatever the cart size. Optional columns (``service_charge``,
+``customer_mobile``, ...) are detected once per process by ``SchemaCaps``
+instead of by catching errors on every save. Orders from the local journal
+carry their own ``reference_no``; older rows without one get a reference
+derived from the order id and timestamp, so no follow-up UPDATE is needed.
+Each line keeps the item's name and category as sold (``price`` and ``gst``
+already are per line), so bills and exports never join ``menu``, and its
+share of the pricing-rule savings (``discount``), so per-item revenue is
+what was actually charged.
+"""
+
+ORDER_COLUMNS = ("order_type", "payment_method", "subtotal", "tax", "discount", "service_charge",
+                 "total", "customer_name", "customer_mobile", "order_date", "reference_no")
+ITEM_COLUMNS = ("order_id", "menu_item_id", "quantity", "price", "gst")
+SNAPSHOT_COLUMNS = ("item_name", "category")      # the menu row as sold; see item_name_sql
+
+
+class SchemaCaps:
+    """Which tables and columns the connected database actually has."""
+
+    def __init__(self, columns):
+        self.columns = {t: set(cols) for t, cols in columns.items()}
+
+    @classmethod
+    def detect(cls, conn):
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            """
+        )
+        columns = {}
+        for table, col in cur.fetchall():
+            columns.setdefault(str(table).lower(), set()).add(str(col).lower())
+        return cls(columns)
+
+    def has(self, table, column):
+        return column in self.columns.get(table, ())
+
+    def has_table(self, table):
+        return table in self.columns
+
+
+# ------------------------- REFERENCES ------------------------
+def reference_for(order_id, order_date):
+    return f"RB{order_date:%y%m%d%H%M}{order_id:05d}"
+
+
+def reference_sql(caps, alias=""):
+    """SQL expression giving the same value as ``reference_for`` for stored rows."""
+    p = f"{alias}." if alias else ""
+    derived = (f"CONCAT('RB', DATE_FORMAT({p}order_date,'%y%m%d%H%i'), "
+               f"IF({p}id < 100000, LPAD({p}id,5,'0'), {p}id))")
+    if caps.has("orders", "reference_no"):
+        return f"COALESCE({p}reference_no, {derived})"
+    return derived
+
+
+def item_name_sql(caps, alias="oi"):
+    """(expression, join) giving an order line's item name.
+
+    The name snapshotted on the line when the schema has it; otherwise the
+    current menu name, which needs the returned ``LEFT JOIN menu m``.
+    """
+    if caps.has("order_items", "item_name"):
+        return f"COALESCE({alias}.item_name, CONCAT('#', {alias}.menu_item_id))", ""
+    return (f"COALESCE(m.item_name, CONCAT('#', {alias}.menu_item_id))",
+            f" LEFT JOIN menu m ON m.id={alias}.menu_item_id")
+
+
+def line_net_sql(caps, alias="oi"):
+    """SQL expression for what an order line was charged before tax:
+    ``quantity * price`` less its rule savings when the schema keeps them."""
+    gross = f"{alias}.quantity*{alias}.price"
+    if caps.has("order_items", "discount"):
+        return f"({gross} - {alias}.discount)"
+    return gross
+
+
+def line_net(line):
+    """``line_net_sql`` for a line tuple as ``insert_order`` takes it."""
+    return line[2] * line[1] - (line[6] if len(line) > 6 else 0)
+
+
+# ------------------------- WRITE -----------------------------
+def insert_order(cur, caps, header, lines):
+    """Insert one order and its lines; returns the new order id.
+
+    ``header`` maps ``ORDER_COLUMNS`` names to values (missing columns are
+    skipped); ``lines`` is a sequence of (menu_item_id, qty, price, gst,
+    item_name, category, discount). Journal entries written before the
+    snapshot have only the first four, and before line discounts the first
+    six (no discount). The caller owns the transaction.
+    """
+    cols = [c for c in ORDER_COLUMNS if c in header and caps.has("orders", c)]
+    cur.execute(
+        f"INSERT INTO orders ({', '.join(cols)}) VALUES ({','.join(['%s'] * len(cols))})",
+        tuple(header[c] for c in cols)
+    )
+    order_id = cur.lastrowid
+
+    if lines:
+        snap = caps.has("order_items", "item_name")
+        disc = caps.has("order_items", "discount")
+        cols = ITEM_COLUMNS + (SNAPSHOT_COLUMNS if snap else ()) + (("discount",) if disc else ())
+        row = "(" + ",".join(["%s"] * len(cols)) + ")"
+        params = []
+        for line in lines:
+            menu_item_id, qty, price, gst = line[:4]
+            params.extend((order_id, menu_item_id, qty, price, gst))
+            if snap:
+                params.extend((tuple(line[4:6]) + (None, None))[:2])
+            if disc:
+                params.append(line[6] if len(line) > 6 else 0)
+        cur.execute(
+            f"INSERT INTO order_items ({', '.join(cols)}) VALUES {','.join([row] * len(lines))}",
+            tuple(params)
+        )
+    return order_id
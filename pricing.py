@@ -0,0 +1,455 @@
+"""Pricing rules: GST slabs, happy hours, combos, buy-X-get-Y and coupons.
+
+Rules live in a JSON file (``PRICING["path"]`` in main.py, ``--pricing`` for
+api.py):
+
+    {"rules": [
+      {"id": "gst-drinks", "type": "gst", "category": "Drinks", "rate": 18},
+      {"id": "happy-hour", "type": "happy_hour", "category": "Drinks", "pct": 20,
+       "days": ["Mon", "Tue", "Wed", "Thu", "Fri"], "from": "17:00", "to": "19:00"},
+      {"id": "meal-deal", "type": "combo", "items": {"4": 1, "9": 1}, "price": 299},
+      {"id": "fries-b2g1", "type": "buy_get", "item": 1, "buy": 2, "get": 1},
+      {"id": "welcome", "type": "coupon", "code": "WELCOME10", "pct": 10,
+       "min_subtotal": 500, "max_off": 150}
+    ]}
+
+``item``/``items`` (menu ids) or ``category``/``categories`` limit a rule to
+those items; without them it covers the whole menu (combos always name their
+items). Any rule may have ``starts``/``ends`` (YYYY-MM-DD) and
+``"active": false``. A coupon takes ``pct`` or a flat ``amount``.
+
+``compile_rules`` builds lookup tables keyed by menu id and by category once
+per file change. ``RuleSet.price`` is then one pass over the cart in which
+each line fetches only the rules that name its item or its category:
+
+1. GST slab: an item slab, else a category slab, else the menu's rate.
+2. Combos, then buy-X-get-Y, in file order. A unit goes into at most one
+   deal; buy-X-get-Y gives away the cheapest units.
+3. Happy hour: the best live percentage, on units in no deal.
+4. Coupon: on what is left of the lines it covers.
+
+Rule savings lower each line's taxable value, so GST is charged on what the
+customer pays for. They are rounded to paise per line (adding up to the
+bill's rounded savings), and checkout saves them on the order lines, so
+per-item revenue and tax add up to the order. The manual discount % and service % then apply to the net
+subtotal, as before. With no rules (or no file) the result equals
+``Cart.totals``. Every line carries a trace of what was applied.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from cart import CENT, HUNDRED, Totals, cents, money
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+ZERO = Decimal(0)
+
+
+class PricingError(ValueError):
+    """A rules file that cannot be compiled."""
+
+
+# ------------------------- RULES -----------------------------
+def _ids(value):
+    return frozenset(int(v) for v in (value if isinstance(value, (list, tuple, dict)) else [value]))
+
+
+def _names(value):
+    return frozenset(str(v) for v in (value if isinstance(value, (list, tuple)) else [value]))
+
+
+def _minute(text):
+    h, m = str(text).split(":")
+    if not (0 <= int(h) <= 24 and 0 <= int(m) < 60):
+        raise ValueError(f"bad time {text!r}")
+    return int(h) * 60 + int(m)
+
+
+class _Rule:
+    kind = None
+
+    def __init__(self, spec, pos):
+        self.id = str(spec.get("id") or f"{self.kind}-{pos + 1}")
+        self.pos = pos
+        self.starts = date.fromisoformat(spec["starts"]) if spec.get("starts") else None
+        self.ends = date.fromisoformat(spec["ends"]) if spec.get("ends") else None
+        items = spec.get("items", spec.get("item"))
+        self.items = _ids(items) if items is not None else None
+        cats = spec.get("categories", spec.get("category"))
+        self.categories = _names(cats) if cats is not None else None
+
+    def live(self, today):
+        return (self.starts is None or self.starts <= today) and (self.ends is None or today <= self.ends)
+
+    def covers(self, line):
+        if self.items is None and self.categories is None:
+            return True
+        return ((self.items is not None and line.item_id in self.items)
+                or (self.categories is not None and line.category in self.categories))
+
+    def index(self, rs, table):
+        """Register under each item and category in scope (or for every line)."""
+        if self.items is None and self.categories is None:
+            rs.everywhere[table].append(self)
+            return
+        for i in self.items or ():
+            rs.by_item[table].setdefault(i, []).append(self)
+        for c in self.categories or ():
+            rs.by_category[table].setdefault(c, []).append(self)
+
+
+class GstSlab(_Rule):
+    kind = "gst"
+
+    def __init__(self, spec, pos):
+        super().__init__(spec, pos)
+        self.rate = money(spec["rate"])
+        if not 0 <= self.rate <= 100:
+            raise ValueError("rate must be between 0 and 100")
+
+
+class HappyHour(_Rule):
+    kind = "happy_hour"
+
+    def __init__(self, spec, pos):
+        super().__init__(spec, pos)
+        self.pct = money(spec["pct"])
+        if not 0 < self.pct <= 100:
+            raise ValueError("pct must be between 0 and 100")
+        days = spec.get("days")
+        self.days = frozenset(DAYS.index(str(d).lower()[:3]) for d in days) if days else None
+        self.start = _minute(spec["from"]) if spec.get("from") else 0
+        self.stop = _minute(spec["to"]) if spec.get("to") else 24 * 60
+
+    def on(self, today, weekday, minute):
+        if not self.live(today) or (self.days is not None and weekday not in self.days):
+            return False
+        if self.start <= self.stop:
+            return self.start <= minute < self.stop
+        return minute >= self.start or minute < self.stop         # e.g. 22:00-02:00
+
+
+class Combo(_Rule):
+    kind = "combo"
+
+    def __init__(self, spec, pos):
+        super().__init__(spec, pos)
+        items = spec["items"]
+        need = {int(k): int(v) for k, v in items.items()} if isinstance(items, dict) else {int(i): 1 for i in items}
+        if len(need) < 2 or min(need.values()) < 1:
+            raise ValueError("a combo needs at least two items")
+        self.need = need
+        self.price = money(spec["price"])
+        self.categories = None
+
+    def apply(self, lines):
+        by_item = {p.line.item_id: p for p in lines}
+        if len(by_item) < len(self.need):
+            return
+        n = min(by_item[i].left // q for i, q in self.need.items())
+        base = sum(by_item[i].line.price * q for i, q in self.need.items())
+        if n < 1 or base <= self.price:
+            return
+        off = base - self.price
+        for i, q in self.need.items():
+            p = by_item[i]
+            share = off * n * p.line.price * q / base
+            p.left -= q * n
+            p.save(share, f"{self.id} x{n}")
+
+
+class BuyGet(_Rule):
+    kind = "buy_get"
+
+    def __init__(self, spec, pos):
+        super().__init__(spec, pos)
+        self.buy, self.get = int(spec["buy"]), int(spec["get"])
+        if self.buy < 1 or self.get < 1:
+            raise ValueError("buy and get must be at least 1")
+
+    def apply(self, lines):
+        deals = sum(p.left for p in lines) // (self.buy + self.get)
+        if not deals:
+            return
+        cheapest = sorted(lines, key=lambda p: p.line.price)
+        free, paid = deals * self.get, deals * self.buy
+        for p in cheapest:                  # the free units
+            t = min(free, p.left)
+            if t:
+                p.left -= t
+                free -= t
+                p.save(p.line.price * t, f"{self.id} {t} free")
+        for p in reversed(cheapest):        # the units paid for, so no later deal counts them
+            t = min(paid, p.left)
+            p.left -= t
+            paid -= t
+
+
+class Coupon(_Rule):
+    kind = "coupon"
+
+    def __init__(self, spec, pos):
+        super().__init__(spec, pos)
+        self.code = str(spec["code"]).strip().upper()
+        self.pct = money(spec["pct"]) if spec.get("pct") is not None else None
+        self.amount = money(spec["amount"]) if spec.get("amount") is not None else None
+        if (self.pct is None) == (self.amount is None):
+            raise ValueError("a coupon takes either pct or amount")
+        self.min_subtotal = money(spec.get("min_subtotal", 0))
+        self.max_off = money(spec["max_off"]) if spec.get("max_off") is not None else None
+
+    def apply(self, lines, today):
+        """Spread the coupon over the lines it covers; returns an error message or None."""
+        if not self.live(today):
+            return f"Coupon {self.code} is not valid today."
+        mine = [p for p in lines if self.covers(p.line)]
+        base = sum(p.net for p in mine)
+        if not base:
+            return f"Coupon {self.code} does not apply to these items."
+        if base < self.min_subtotal:
+            return f"Coupon {self.code} needs ₹{self.min_subtotal:.2f} of eligible items."
+        off = base * self.pct / HUNDRED if self.pct is not None else min(self.amount, base)
+        if self.max_off is not None:
+            off = min(off, self.max_off)
+        for p in mine:
+            if p.net:
+                p.save(off * p.net / base, f"coupon {self.code}")
+        return None
+
+
+KINDS = {c.kind: c for c in (GstSlab, HappyHour, Combo, BuyGet, Coupon)}
+
+
+# ------------------------- COMPILED SET ----------------------
+class _Line:
+    """One cart line during a pricing pass."""
+    __slots__ = ("line", "rate", "gross", "savings", "left", "happy", "notes")
+
+    def __init__(self, line):
+        self.line = line
+        self.happy = None
+        self.rate = line.gst
+        self.gross = line.price * line.qty
+        self.savings = ZERO
+        self.left = line.qty            # units not yet in a deal
+        self.notes = []
+
+    @property
+    def net(self):
+        return self.gross - self.savings
+
+    def save(self, amount, note):
+        self.savings += amount
+        self.notes.append(f"{note}: -{cents(amount):.2f}")
+
+
+def _round_savings(lines):
+    """Round each line's savings to paise so that they add up to their rounded sum."""
+    exact = [p.savings for p in lines]
+    for p in lines:
+        p.savings = cents(p.savings)
+    short = cents(sum(exact, ZERO)) - sum((p.savings for p in lines), ZERO)
+    if short:
+        # the lines rounded furthest the other way take the odd paise
+        step = CENT if short > 0 else -CENT
+        by_error = sorted(zip(exact, lines), key=lambda e: (e[0] - e[1].savings) * step, reverse=True)
+        for _, p in by_error[:int(abs(short) / CENT)]:
+            p.savings += step
+
+
+class LinePrice:
+    __slots__ = ("item_id", "name", "gst", "gross", "savings", "tax", "notes")
+
+    def __init__(self, p):
+        self.item_id = p.line.item_id
+        self.name = p.line.name
+        self.gst = p.rate
+        self.gross = p.gross
+        self.savings = p.savings
+        self.tax = p.net * p.rate / HUNDRED
+        self.notes = p.notes
+
+    def as_dict(self):
+        return dict(id=self.item_id, name=self.name, gst=self.gst, gross=cents(self.gross), savings=cents(self.savings),
+                    tax=cents(self.tax), notes=list(self.notes))
+
+
+class Quote:
+    """``totals`` (cart.Totals; ``discount`` includes rule savings), per-line
+    ``lines`` (empty when no rule could apply) and ``coupon_error``."""
+    __slots__ = ("totals", "lines", "savings", "coupon_error")
+
+    def __init__(self, totals, lines=(), savings=ZERO, coupon_error=None):
+        self.totals = totals
+        self.lines = {lp.item_id: lp for lp in lines}
+        self.savings = savings
+        self.coupon_error = coupon_error
+
+    def gst(self, line):
+        """Rate charged on a cart line (its GST slab, or the menu rate)."""
+        lp = self.lines.get(line.item_id)
+        return lp.gst if lp is not None else line.gst
+
+    def discount(self, line):
+        """Rule savings on a cart line, in paise; what checkout saves on the order line."""
+        lp = self.lines.get(line.item_id)
+        return lp.savings if lp is not None else ZERO
+
+    def notes(self):
+        """Every line's trace as "item: note" strings."""
+        return [f"{lp.name}: {n}" for lp in self.lines.values() for n in lp.notes]
+
+    def as_dict(self):
+        return dict(self.totals._asdict(), savings=self.savings, coupon_error=self.coupon_error,
+                    lines=[lp.as_dict() for lp in self.lines.values()])
+
+
+class RuleSet:
+    """Rules compiled into per-item / per-category lookup tables."""
+
+    TABLES = ("gst", "deal", "happy")
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self.by_item = {t: {} for t in self.TABLES}
+        self.by_category = {t: {} for t in self.TABLES}
+        self.everywhere = {t: [] for t in self.TABLES}
+        self.coupons = {}
+        for r in self.rules:
+            if isinstance(r, GstSlab):
+                r.index(self, "gst")
+            elif isinstance(r, HappyHour):
+                r.index(self, "happy")
+            elif isinstance(r, (Combo, BuyGet)):
+                r.index(self, "deal")
+            elif r.code in self.coupons:
+                raise PricingError(f"coupon code {r.code} is used twice")
+            else:
+                self.coupons[r.code] = r
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _candidates(self, table, line):
+        a = self.by_item[table].get(line.item_id)
+        b = self.by_category[table].get(line.category)
+        c = self.everywhere[table]
+        if b is None and not c:
+            return a or ()
+        return (a or []) + (b or []) + c
+
+    def price(self, cart, discount_pct=0, service_pct=0, coupon="", now=None):
+        """Quote for ``cart`` at ``now`` (default: the current time)."""
+        code = (coupon or "").strip().upper()
+        if not self.rules and not code:
+            return Quote(cart.totals(discount_pct, service_pct))
+        now = now or datetime.now()
+        today, weekday, minute = now.date(), now.weekday(), now.hour * 60 + now.minute
+
+        lines, deals = [], {}
+        for ln in cart:
+            p = _Line(ln)
+            for r in self._candidates("gst", ln):
+                if r.live(today):           # item slabs come first
+                    p.rate = r.rate
+                    p.notes.append(f"{r.id}: GST {r.rate}%")
+                    break
+            for r in self._candidates("deal", ln):
+                if r.live(today):
+                    mine = deals.setdefault(r, [])
+                    if not mine or mine[-1] is not p:
+                        mine.append(p)
+            for r in self._candidates("happy", ln):
+                if (p.happy is None or r.pct > p.happy.pct) and r.on(today, weekday, minute):
+                    p.happy = r
+            lines.append(p)
+
+        for r in sorted(deals, key=lambda r: r.pos):
+            r.apply(deals[r])
+        for p in lines:
+            if p.happy is not None and p.left:
+                p.save(p.line.price * p.left * p.happy.pct / HUNDRED, f"{p.happy.id} {p.happy.pct}%")
+
+        error = None
+        if code:
+            r = self.coupons.get(code)
+            error = r.apply(lines, today) if r is not None else f"Unknown coupon {code}."
+
+        _round_savings(lines)
+        priced = [LinePrice(p) for p in lines]
+        gross = sum((p.gross for p in priced), ZERO)
+        savings = sum((p.savings for p in priced), ZERO)
+        net = gross - savings
+        subtotal = cents(gross)
+        gst = cents(sum((p.tax for p in priced), ZERO))
+        manual = cents(net * money(discount_pct) / HUNDRED)
+        service = cents(net * money(service_pct) / HUNDRED)
+        discount = savings + manual
+        return Quote(Totals(subtotal, gst, discount, service, subtotal + gst + service - discount),
+                     priced, savings, error)
+
+
+def compile_rules(specs):
+    """RuleSet from a list of rule dicts; raises PricingError naming the bad rule."""
+    rules = []
+    for pos, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            raise PricingError(f"rule {pos + 1} is not an object")
+        if spec.get("active", True) is False:
+            continue
+        kind = KINDS.get(spec.get("type"))
+        if kind is None:
+            raise PricingError(f"rule {spec.get('id') or pos + 1}: unknown type {spec.get('type')!r}")
+        try:
+            rules.append(kind(spec, pos))
+        except KeyError as e:
+            raise PricingError(f"rule {spec.get('id') or pos + 1}: missing {e}") from None
+        except (TypeError, ValueError, ArithmeticError) as e:
+            raise PricingError(f"rule {spec.get('id') or pos + 1}: {e}") from None
+    return RuleSet(rules)
+
+
+def load(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f, parse_float=Decimal)
+    except ValueError as e:
+        raise PricingError(f"{path}: {e}") from None
+    return compile_rules(doc.get("rules", []) if isinstance(doc, dict) else doc)
+
+
+class RuleFile:
+    """The rules in ``path``, compiled on first use and again when the file changes.
+
+    A missing file (or no path) means no rules. A change that does not
+    compile keeps the last good rules in force (none if there never were
+    any) and sets ``error`` until the file is fixed; the bad version is not
+    re-read on every call.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.error = None
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._rules = RuleSet()
+
+    def rules(self):
+        if not self.path:
+            return self._rules
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    try:
+                        self._rules, self.error = load(self.path) if stamp else RuleSet(), None
+                    except (PricingError, OSError) as e:
+                        self.error = str(e)
+                    self._stamp = stamp
+        return self._rules
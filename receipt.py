@@ -0,0 +1,235 @@
+"""Receipt rendering from one precomputed template.
+
+Everything static about a receipt is worked out once, when a ReceiptTemplate
+is created: the title, the column geometry, the format strings, the rules and
+the compiled PDF fragments. Rendering a bill only formats its data into those
+pieces. Three backends share the template:
+
+    text(data)    plain text, for the on-screen receipt
+    escpos(data)  ESC/POS bytes for 58/80 mm thermal printers
+    pdf(data)     A4 PDF from a small built-in writer (core Helvetica fonts)
+
+The module has no Tk, DB or third-party dependencies, so it is safe to use in
+worker threads and in the batch-export process pool.
+"""
+import zlib
+
+TITLE = "Restaurant Bill"
+TOTALS = (("Subtotal", "subtotal"), ("GST", "gst"), ("Discount", "discount"), ("Service", "service"))
+
+
+def line_total(it):
+    return it["price"] * it["qty"] * (1 + it["gst"]/100)
+
+
+def _info(data):
+    return (f"Ref: {data['reference_no']}",
+            f"Date: {data['date']}",
+            f"Customer: {data.get('customer') or '-'}  Mobile: {data.get('mobile') or '-'}")
+
+
+# ------------------------- ESC/POS ---------------------------
+ESC_INIT = b"\x1b@"
+ESC_CODEPAGE = b"\x1bt\x13"          # PC858 (Latin-1 + euro) on Epson-compatible printers
+ESC_CENTER, ESC_LEFT = b"\x1ba\x01", b"\x1ba\x00"
+ESC_BOLD, ESC_PLAIN = b"\x1bE\x01", b"\x1bE\x00"
+GS_DOUBLE, GS_NORMAL = b"\x1d!\x11", b"\x1d!\x00"
+GS_FEED_CUT = b"\x1dVB\x04"          # feed 4 lines, partial cut
+ESCPOS_ENCODING = "cp858"
+
+# ------------------------- PDF -------------------------------
+MM = 72 / 25.4
+PAGE_W, PAGE_H = 210 * MM, 297 * MM
+MARGIN = 10 * MM
+BOTTOM = PAGE_H - 20 * MM            # same auto page break as FPDF's default
+PDF_COLUMNS = (("Item", 90), ("Qty", 20), ("Price", 30), ("GST%", 20), ("Total", 30))
+PDF_NAME_CHARS = 40                  # what fits in the 90 mm item cell at 12 pt
+
+# Helvetica-Bold advance widths (1/1000 em) for ASCII 32..126; used to centre the title.
+_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+
+
+def _bold_width(s, size):
+    return sum(_BOLD_WIDTHS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in s) * size / 1000
+
+
+def _pdf_str(s):
+    # WinAnsi has no rupee glyph; escape the PDF string delimiters.
+    s = str(s).replace("₹", "Rs.")
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_op(font, size, x, y, s):
+    return f"BT /{font} {size} Tf {x:.2f} {y:.2f} Td ({_pdf_str(s)}) Tj ET\n"
+
+
+_FONTS = (b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+          b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+_PAGE = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_W:.2f} {PAGE_H:.2f}] "
+         f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>")
+
+
+def _pdf_document(pages):
+    """Assemble content streams (bytes, one per page) into a PDF file."""
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", None, *_FONTS]
+    kids = " ".join(f"{5 + 2*i} 0 R" for i in range(len(pages)))
+    objs[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode()
+    for i, content in enumerate(pages):
+        objs.append((_PAGE % (6 + 2*i)).encode())
+        z = zlib.compress(content)
+        objs.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(z) + z + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+class ReceiptTemplate:
+    """A receipt layout ``width`` characters wide (text/ESC-POS) plus its A4 PDF form."""
+
+    def __init__(self, title=TITLE, width=42, currency="₹"):
+        self.title = title
+        self.width = width
+        self.currency = currency
+        self._compile_text()
+        self._compile_pdf()
+
+    # ---------- text / ESC-POS ----------
+    def _compile_text(self):
+        w = self.width
+        nums = "{:>4} {:>9.2f} {:>6.1f} {:>10.2f}"      # Qty, Price, GST%, Total
+        name_w = w - 33
+        if name_w >= 16:
+            self._wrap = False
+            self._row = f"{{:<{name_w}.{name_w}}} " + nums
+            heading = f"{'Item':<{name_w}} " + "{:>4} {:>9} {:>6} {:>10}".format("Qty", "Price", "GST%", "Total")
+        else:
+            # Narrow paper: item name on its own line, numbers beneath it.
+            self._wrap = True
+            self._row = " " * (w - 32) + nums
+            heading = f"{'Item':<{w - 32}}" + "{:>4} {:>9} {:>6} {:>10}".format("Qty", "Price", "GST%", "Total")
+        self._name = f"{{:.{w}}}"
+        self._rule = "-" * w
+        self._money = f"{{:<{max(w - len(self.currency) - 10, 10)}}}{self.currency}{{:>10.2f}}"
+        self._head = [f"*** {self.title} ***".center(w).rstrip()]
+        self._table = [self._rule, heading, self._rule]
+        self._escpos_head = (ESC_INIT + ESC_CODEPAGE + ESC_CENTER + ESC_BOLD + GS_DOUBLE
+                             + self.title.encode(ESCPOS_ENCODING, "replace") + b"\n"
+                             + GS_NORMAL + ESC_PLAIN + ESC_LEFT)
+
+    def _items(self, data):
+        row, name = self._row, self._name
+        out = []
+        for it in data["items"]:
+            total = line_total(it)
+            if self._wrap:
+                out.append(name.format(it["name"]))
+                out.append(row.format(it["qty"], it["price"], it["gst"], total))
+            else:
+                out.append(row.format(it["name"], it["qty"], it["price"], it["gst"], total))
+        return out
+
+    def _totals(self, data):
+        return [self._money.format(label + ":", data[key]) for label, key in TOTALS if key in data]
+
+    def lines(self, data):
+        """Receipt as a list of lines; the last line is the grand total."""
+        return (self._head + list(_info(data)) + self._table + self._items(data) + [self._rule]
+                + self._totals(data) + [self._money.format("TOTAL:", data["total"])])
+
+    def text(self, data):
+        return "\n".join(self.lines(data)) + "\n"
+
+    def escpos(self, data, encoding=ESCPOS_ENCODING):
+        body = self.lines(data)
+        enc = lambda ls: "".join(l + "\n" for l in ls).replace("₹", "Rs.").encode(encoding, "replace")
+        return b"".join((
+            self._escpos_head,
+            enc(body[1:-1]),
+            ESC_BOLD, enc(body[-1:]), ESC_PLAIN,
+            GS_FEED_CUT,
+        ))
+
+    # ---------- PDF ----------
+    def _compile_pdf(self):
+        # Static page furniture is kept as content-stream text with row-local
+        # coordinates; each table row is drawn by translating the same fragment.
+        xs, x = [], MARGIN
+        for _, w in PDF_COLUMNS:
+            xs.append(x)
+            x += w * MM
+        pad = 1 * MM
+        row_h = 8 * MM
+        base = -(row_h / 2 + 0.3 * 12)
+        borders = "".join(f"{cx:.2f} {-row_h:.2f} {w * MM:.2f} {row_h:.2f} re " for cx, (_, w) in zip(xs, PDF_COLUMNS))
+        self._pdf_row_h = row_h
+        steps = [f"{nx - cx:.2f} 0 Td" for cx, nx in zip(xs, xs[1:])]
+        self._pdf_heading = (f"q 1 0 0 1 0 %.2f cm {borders}S BT /F2 12 Tf {xs[0] + pad:.2f} {base:.2f} Td "
+                             + " ".join(f"{step} ({_pdf_str(h).replace('%', '%%')}) Tj" for step, (h, _) in
+                                        zip([""] + steps, PDF_COLUMNS)).strip()
+                             + " ET Q\n")
+        self._pdf_row = (f"q 1 0 0 1 0 %.2f cm {borders}S BT /F1 12 Tf {xs[0] + pad:.2f} {base:.2f} Td "
+                         f"(%s) Tj {steps[0]} (%d) Tj {steps[1]} (%.2f) Tj "
+                         f"{steps[2]} (%.2f) Tj {steps[3]} (%.2f) Tj ET Q\n")
+        title_w = _bold_width(self.title, 16)
+        self._pdf_title = _text_op("F2", 16, (PAGE_W - title_w) / 2, PAGE_H - (MARGIN + 5 * MM + 0.3 * 16), self.title)
+        self._pdf_x = MARGIN + pad
+
+    def pdf(self, data):
+        pages, ops = [], [self._pdf_title]
+        y = MARGIN + 10 * MM                 # top-down cursor, in points
+
+        def text_line(s, h=8 * MM, font="F1", size=12):
+            nonlocal y
+            ops.append(_text_op(font, size, self._pdf_x, PAGE_H - (y + h / 2 + 0.3 * size), s))
+            y += h
+
+        def room(h, heading=False):
+            nonlocal y, ops
+            if y + h > BOTTOM:
+                pages.append("".join(ops))
+                ops, y = [], MARGIN
+                if heading:
+                    ops.append(self._pdf_heading % (PAGE_H - y))
+                    y += self._pdf_row_h
+
+        for s in _info(data):
+            text_line(s)
+        y += 4 * MM
+        room(2 * self._pdf_row_h)
+        ops.append(self._pdf_heading % (PAGE_H - y))
+        y += self._pdf_row_h
+        row = self._pdf_row
+        for it in data["items"]:
+            room(self._pdf_row_h, heading=True)
+            ops.append(row % (PAGE_H - y, _pdf_str(str(it["name"])[:PDF_NAME_CHARS]), it["qty"],
+                              it["price"], it["gst"], line_total(it)))
+            y += self._pdf_row_h
+        y += 4 * MM
+        for label, key in TOTALS:
+            if key in data:
+                room(8 * MM)
+                text_line(f"{label}: {self.currency}{data[key]:.2f}")
+        room(10 * MM)
+        text_line(f"Total: {self.currency}{data['total']:.2f}", h=10 * MM, font="F2")
+        pages.append("".join(ops))
+        return _pdf_document([p.encode("cp1252", "replace") for p in pages])
+
+
+# Shared layouts: the on-screen receipt and the 80 mm counter printer.
+SCREEN = ReceiptTemplate(width=60)
+THERMAL = ReceiptTemplate(width=42, currency="Rs.")
@@ -0,0 +1,90 @@
+"""Order reference numbers generated on the terminal, with no DB round trip.
+
+A reference packs a 64-bit, Snowflake-style id:
+
+    41 bits  milliseconds since EPOCH   (good until ~2093)
+    10 bits  terminal id                (0..1023, one per till/process)
+    12 bits  sequence within the ms     (4096 bills/ms per terminal)
+
+and writes it as ``RB`` + 13 Crockford base32 characters. The text is fixed
+width, so references sort the same way as their ids, i.e. by time. Two
+terminals with different ids can never collide. Within one terminal the
+generator is monotonic even if the wall clock steps back: it keeps issuing
+from the last millisecond it used. Pass ``floor`` (the last id issued, e.g.
+from the journal) so that also holds across restarts.
+
+References from before this scheme (``RB{yymmddHHMM}{id:05d}``) are still
+produced by ``order_store.reference_for`` for old rows.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+EPOCH_MS = 1704067200000            # 2024-01-01T00:00:00Z
+TERMINAL_BITS = 10
+SEQUENCE_BITS = 12
+MAX_TERMINAL = (1 << TERMINAL_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+PREFIX = "RB"
+DIGITS = 13
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"       # Crockford: no I, L, O, U
+_VALUE = {c: i for i, c in enumerate(_ALPHABET)}
+
+
+def encode(n):
+    out = []
+    for _ in range(DIGITS):
+        n, r = divmod(n, 32)
+        out.append(_ALPHABET[r])
+    return PREFIX + "".join(reversed(out))
+
+
+def decode(ref):
+    """Reference -> id. Raises ValueError for anything not from ``encode``."""
+    body = ref[len(PREFIX):].upper() if ref.startswith(PREFIX) else ""
+    if len(body) != DIGITS or any(c not in _VALUE for c in body):
+        raise ValueError(f"not a generated reference: {ref!r}")
+    n = 0
+    for c in body:
+        n = n * 32 + _VALUE[c]
+    return n
+
+
+def parts(ref):
+    """Reference -> (UTC datetime, terminal, sequence)."""
+    n = decode(ref)
+    ms = (n >> (TERMINAL_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    return (datetime.fromtimestamp(ms / 1000, tz=timezone.utc),
+            (n >> SEQUENCE_BITS) & MAX_TERMINAL, n & MAX_SEQUENCE)
+
+
+class ReferenceGenerator:
+    def __init__(self, terminal, floor=0, clock=time.time):
+        if not 0 <= int(terminal) <= MAX_TERMINAL:
+            raise ValueError(f"terminal must be 0..{MAX_TERMINAL}, got {terminal!r}")
+        self.terminal = int(terminal)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = floor >> (TERMINAL_BITS + SEQUENCE_BITS) if floor else -1
+        self._seq = floor & MAX_SEQUENCE if floor else MAX_SEQUENCE
+
+    def next_id(self):
+        with self._lock:
+            ms = int(self._clock() * 1000) - EPOCH_MS
+            if ms <= self._last_ms:
+                # Same millisecond, or the clock stepped back: continue the
+                # last millisecond; borrow the next one if it is used up.
+                ms = self._last_ms
+                if self._seq == MAX_SEQUENCE:
+                    ms += 1
+                    self._seq = 0
+                else:
+                    self._seq += 1
+            else:
+                self._seq = 0
+            self._last_ms = ms
+            return (ms << (TERMINAL_BITS + SEQUENCE_BITS)) | (self.terminal << SEQUENCE_BITS) | self._seq
+
+    def next(self):
+        return encode(self.next_id())
@@ -0,0 +1,196 @@
+"""Pre-aggregated daily sales for the Reports tab.
+
+Two summary tables (see database.sql) are kept up to date inside the same
+transaction as ``save_order``:
+
+    sales_daily        day x payment method   - order-level money (incl. discount/service)
+    sales_daily_items  day x item x payment   - quantities and line revenue
+
+Line revenue (``gross``) is what the line was charged before tax, i.e. net
+of the pricing-rule savings kept on the line (``order_items.discount``), and
+its tax is charged on that; so the items of an order add up to the order's
+subtotal less rule savings, and to its (unrounded) tax.
+
+Reports then aggregate a few hundred rows per year instead of scanning
+``orders``/``order_items``. If the tables are missing, reports fall back to
+the base tables. Rebuild the rollup after creating the tables, or whenever it
+is in doubt:
+
+    python rollup.py --rebuild [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from order_store import line_net, line_net_sql
+
+ROLLUP_TABLES = ("sales_daily", "sales_daily_items")
+
+
+def available(caps):
+    return all(caps.has_table(t) for t in ROLLUP_TABLES)
+
+
+# ------------------------- INCREMENTAL -----------------------
+def record_order(cur, header, lines):
+    """Add one saved order to the rollup; call inside the save transaction.
+
+    ``header``/``lines`` are the same values passed to ``insert_order``.
+    """
+    day = header["order_date"].date()
+    pay = header["payment_method"]
+    cur.execute(
+        """
+        INSERT INTO sales_daily (sale_date, payment_method, orders, subtotal, tax, discount, service, total)
+        VALUES (%s,%s,1,%s,%s,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE orders=orders+1, subtotal=subtotal+VALUES(subtotal), tax=tax+VALUES(tax),
+            discount=discount+VALUES(discount), service=service+VALUES(service), total=total+VALUES(total)
+        """,
+        (day, pay, header["subtotal"], header["tax"], header["discount"], header.get("service_charge", 0), header["total"])
+    )
+    if not lines:
+        return
+    params = []
+    for line in lines:
+        menu_item_id, qty, gst = line[0], line[1], line[3]
+        gross = line_net(line)
+        params.extend((day, menu_item_id, pay, qty, gross, gross * gst / 100))
+    cur.execute(
+        "INSERT INTO sales_daily_items (sale_date, menu_item_id, payment_method, quantity, gross, tax) VALUES "
+        + ",".join(["(%s,%s,%s,%s,%s,%s)"] * len(lines))
+        + " ON DUPLICATE KEY UPDATE quantity=quantity+VALUES(quantity), gross=gross+VALUES(gross), tax=tax+VALUES(tax)",
+        tuple(params)
+    )
+
+
+# ------------------------- REBUILD ---------------------------
+def rebuild(conn, caps, date_from=None, date_to=None, archive=None):
+    """Recompute the rollup from orders/order_items for [date_from, date_to].
+
+    Dates are ``date`` objects (inclusive); ``None`` means unbounded. Runs as
+    one transaction, so reports see either the old or the new numbers. Pass
+    the ``archive`` (archive.Archive) to add archived months back; without it
+    their days are left empty.
+    """
+    where, params = [], []
+    if date_from:
+        where.append("order_date >= %s"); params.append(datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        where.append("order_date < %s"); params.append(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    order_where = (" WHERE " + " AND ".join(where)) if where else ""
+    item_where = (" WHERE " + " AND ".join("o." + w for w in where)) if where else ""
+    day_where, day_params = [], []
+    if date_from:
+        day_where.append("sale_date >= %s"); day_params.append(date_from)
+    if date_to:
+        day_where.append("sale_date <= %s"); day_params.append(date_to)
+    day_where = (" WHERE " + " AND ".join(day_where)) if day_where else ""
+    service = "COALESCE(service_charge,0)" if caps.has("orders", "service_charge") else "0"
+    net = line_net_sql(caps)
+
+    cur = conn.cursor()
+    for t in ROLLUP_TABLES:
+        cur.execute(f"DELETE FROM {t}{day_where}", tuple(day_params))
+    cur.execute(
+        f"""
+        INSERT INTO sales_daily (sale_date, payment_method, orders, subtotal, tax, discount, service, total)
+        SELECT DATE(order_date), payment_method, COUNT(*), SUM(subtotal), SUM(tax), SUM(discount), SUM({service}), SUM(total)
+        FROM orders{order_where}
+        GROUP BY DATE(order_date), payment_method
+        """, tuple(params)
+    )
+    days = cur.rowcount
+    cur.execute(
+        f"""
+        INSERT INTO sales_daily_items (sale_date, menu_item_id, payment_method, quantity, gross, tax)
+        SELECT DATE(o.order_date), oi.menu_item_id, o.payment_method, SUM(oi.quantity),
+               SUM({net}), SUM({net}*oi.gst/100)
+        FROM order_items oi JOIN orders o ON o.id=oi.order_id{item_where}
+        GROUP BY DATE(o.order_date), oi.menu_item_id, o.payment_method
+        """, tuple(params)
+    )
+    items = cur.rowcount
+    for month in (archive.covering(date_from, date_to) if archive is not None else ()):
+        rows = month.daily(date_from, date_to)
+        cur.executemany(
+            """
+            INSERT INTO sales_daily (sale_date, payment_method, orders, subtotal, tax, discount, service, total)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+            ON DUPLICATE KEY UPDATE orders=orders+VALUES(orders), subtotal=subtotal+VALUES(subtotal),
+                tax=tax+VALUES(tax), discount=discount+VALUES(discount), service=service+VALUES(service),
+                total=total+VALUES(total)
+            """, rows)
+        days += len(rows)
+        rows = month.daily_items(date_from, date_to)
+        cur.executemany(
+            "INSERT INTO sales_daily_items (sale_date, menu_item_id, payment_method, quantity, gross, tax) "
+            "VALUES (%s,%s,%s,%s,%s,%s) ON DUPLICATE KEY UPDATE quantity=quantity+VALUES(quantity), "
+            "gross=gross+VALUES(gross), tax=tax+VALUES(tax)", rows)
+        items += len(rows)
+    conn.commit()
+    return days, items
+
+
+# ------------------------- REPORT QUERIES --------------------
+_PERIODS = {
+    "daily": ("DATE({c}) as day", "DATE({c})", "day"),
+    "weekly": ("YEARWEEK({c},1) as week", "YEARWEEK({c},1)", "week"),
+    "monthly": ("DATE_FORMAT({c},'%Y-%m') as month", "DATE_FORMAT({c},'%Y-%m')", "month"),
+}
+
+
+def sales_sql(caps, period):
+    """(Period, SUM(total)) rows, newest first, from the rollup when present."""
+    col, grp, alias = _PERIODS.get(period, _PERIODS["monthly"])
+    table, c = ("sales_daily", "sale_date") if available(caps) else ("orders", "order_date")
+    return (f"SELECT {col.format(c=c)}, SUM(total) FROM {table} "
+            f"GROUP BY {grp.format(c=c)} ORDER BY {alias} DESC")
+
+
+def top_items_sql(caps, limit=50):
+    """(item name, quantity, revenue) for the best sellers; revenue is net of rule savings.
+
+    Aggregated by menu id; only the top rows look up their (current) name.
+    Menu items are never deleted, only deactivated, so the lookup holds for
+    old sales too.
+    """
+    if available(caps):
+        return f"""
+            SELECT COALESCE(m.item_name, CONCAT('#', r.menu_item_id)), r.qty, r.revenue
+            FROM (SELECT menu_item_id, SUM(quantity) as qty, SUM(gross) as revenue
+                  FROM sales_daily_items GROUP BY menu_item_id ORDER BY qty DESC LIMIT {int(limit)}) r
+            LEFT JOIN menu m ON m.id=r.menu_item_id
+            ORDER BY r.qty DESC
+            """
+    return f"""
+        SELECT COALESCE(m.item_name, CONCAT('#', r.menu_item_id)), r.qty, r.revenue
+        FROM (SELECT oi.menu_item_id, SUM(oi.quantity) as qty, SUM({line_net_sql(caps)}) as revenue
+              FROM order_items oi GROUP BY oi.menu_item_id ORDER BY qty DESC LIMIT {int(limit)}) r
+        LEFT JOIN menu m ON m.id=r.menu_item_id
+        ORDER BY r.qty DESC
+        """
+
+
+# ------------------------- CLI -------------------------------
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Maintain the daily sales rollup tables.")
+    ap.add_argument("--rebuild", action="store_true", help="recompute the rollup from orders")
+    ap.add_argument("--from", dest="date_from", help="first day to rebuild (YYYY-MM-DD)")
+    ap.add_argument("--to", dest="date_to", help="last day to rebuild (YYYY-MM-DD)")
+    args = ap.parse_args(argv)
+    if not args.rebuild:
+        ap.error("nothing to do (use --rebuild)")
+
+    from archive import open_archive
+    from main import ARCHIVE, db_conn, db_schema
+    day = lambda s: datetime.strptime(s, "%Y-%m-%d").date() if s else None
+    caps = db_schema()
+    if not available(caps):
+        ap.exit(1, "rollup tables missing - create them from database.sql first\n")
+    with db_conn() as conn:
+        days, items = rebuild(conn, caps, day(args.date_from), day(args.date_to), open_archive(ARCHIVE["path"]))
+    print(f"rebuilt {days} day/payment rows and {items} day/item/payment rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""UI-free billing operations, shared by the Tk app and the HTTP API.
+
+``BillingService`` is everything a till does apart from drawing widgets:
+menu lookup from one shared in-memory catalog, cart pricing (with the rules
+in pricing.py), checkout, order
+history, single-order lookup, sales reports and the till's shift close. It keeps no UI state and is
+safe to call from several threads. One process can therefore serve the
+desktop app, tablets and kiosks (api.py) from one connection pool and one
+menu cache. Methods block; async callers run them on a thread pool.
+
+``connect()`` returns a pooled connection used as a context manager
+(``main.db_conn`` for MySQL, or a pool over ``sqlite_store.connect``);
+``schema()`` returns ``SchemaCaps``.
+"""
+import os
+from datetime import datetime
+
+import bills
+import customers
+import rollup
+import shifts
+from cart import Cart, money
+from history import PAGE_SIZE, history_query
+from customers import CustomerDirectory
+from menu_cache import MenuCatalog
+from order_store import insert_order, item_name_sql, reference_for, reference_sql
+from pricing import RuleFile
+from references import ReferenceGenerator
+
+ORDER_TYPES = ("Dine-In", "Takeaway")
+PAYMENT_METHODS = ("Cash", "Card", "UPI")
+SALES_PERIODS = ("daily", "weekly", "monthly")
+
+
+class ServiceError(ValueError):
+    """A request the service refuses (bad input); ``title`` is for dialogs."""
+
+    def __init__(self, message, title="Invalid order"):
+        super().__init__(message)
+        self.title = title
+
+
+class NotFound(ServiceError):
+    def __init__(self, message):
+        super().__init__(message, title="Not found")
+
+
+class BillingService:
+    def __init__(self, connect, schema, journal=None, terminal=0, catalog=None, archive=None, directory=None,
+                 ledger=None, pricing=None):
+        """With a ``journal`` (journal.OrderJournal) checkout only appends to
+        it and its syncer writes MySQL; without one, checkout writes directly
+        and references come from a generator for ``terminal``. ``archive`` is
+        the directory of months moved out by archive.py; ``directory`` the
+        shared customers.CustomerDirectory. Shift totals are kept by the
+        journal, or by ``ledger`` (shifts.ShiftLedger) without one. ``pricing``
+        is the pricing rules file, re-read when it changes."""
+        self.connect = connect
+        self.schema = schema
+        self.journal = journal
+        self.catalog = catalog or MenuCatalog()
+        self.customers = directory or CustomerDirectory()
+        self.refs = journal.refs if journal is not None else ReferenceGenerator(terminal)
+        self.ledger = journal.shifts if journal is not None else ledger
+        self.pricing = RuleFile(pricing)
+        self._frames = None         # analytics.FrameCache, created on first use
+        self.archive_path = archive
+        self._archive = None
+
+    # --------------------- menu ---------------------
+    def refresh_menu(self, force=False):
+        """Reload the catalog if the menu table changed; returns True if it did."""
+        with self.connect() as conn:
+            if not self.catalog.is_stale(conn, force=force):
+                return False
+            snap = self.catalog.load(conn)
+        if self.journal is not None:
+            self.journal.save_menu(snap.rows)
+        return True
+
+    def menu(self, text="", category="All"):
+        if not self.catalog.loaded:
+            self.refresh_menu(force=True)
+        return self.catalog.search(text, category)
+
+    def categories(self):
+        if not self.catalog.loaded:
+            self.refresh_menu(force=True)
+        return self.catalog.categories()
+
+    # --------------------- pricing ---------------------
+    def build_cart(self, items):
+        """``items``: (menu_item_id, qty) pairs -> Cart priced from the catalog."""
+        if not self.catalog.loaded:
+            self.refresh_menu(force=True)
+        cart = Cart()
+        for item_id, qty in items:
+            row = self.catalog.get(int(item_id))
+            if row is None:
+                raise NotFound(f"menu item {item_id} does not exist or is inactive")
+            try:
+                cart.add(row[0], row[1], row[3], row[4], int(qty), category=row[2])
+            except ValueError as e:
+                raise ServiceError(f"menu item {item_id}: {e}")
+        return cart
+
+    def price(self, cart, discount_pct=0, service_pct=0, coupon="", now=None):
+        """pricing.Quote for ``cart``: totals after the pricing rules, with a per-line trace.
+
+        A rules file that no longer compiles does not stop pricing: the last
+        good rules apply and ``self.pricing.error`` says why.
+        """
+        for label, pct in (("discount", discount_pct), ("service charge", service_pct)):
+            try:
+                pct = money(pct)
+            except ArithmeticError:
+                raise ServiceError(f"{label} % is not a number: {pct!r}")
+            if not 0 <= pct <= 100:
+                raise ServiceError(f"{label} % must be between 0 and 100")
+        return self.pricing.rules().price(cart, discount_pct, service_pct, coupon, now)
+
+    # --------------------- checkout ---------------------
+    @staticmethod
+    def validate_customer(name, mobile):
+        if not (name or "").strip():
+            raise ServiceError("Customer name is required.", title="Missing info")
+        mobile = (mobile or "").strip()
+        if mobile and not mobile.isdigit():
+            raise ServiceError("Mobile must be digits only.", title="Invalid mobile")
+
+    def checkout(self, cart, discount_pct=0, service_pct=0, order_type="Dine-In", payment_method="Cash",
+                 customer_name="", customer_mobile="", now=None, coupon=""):
+        """Save ``cart`` as an order; returns the bill dict (bills.bill_data shape).
+
+        ``order_id`` is None when the order went to the journal and has not
+        reached MySQL yet; ``reference_no`` is always set. Rule savings are
+        part of ``discount`` and are also saved on each line, with the line's
+        GST slab rate.
+        """
+        if not cart:
+            raise ServiceError("Add items before saving.", title="Empty cart")
+        self.validate_customer(customer_name, customer_mobile)
+        if order_type not in ORDER_TYPES:
+            raise ServiceError(f"order type must be one of {', '.join(ORDER_TYPES)}")
+        if payment_method not in PAYMENT_METHODS:
+            raise ServiceError(f"payment method must be one of {', '.join(PAYMENT_METHODS)}")
+        now = now or datetime.now()
+        quote = self.price(cart, discount_pct, service_pct, coupon, now)
+        if quote.coupon_error:
+            raise ServiceError(quote.coupon_error, title="Coupon")
+        t = quote.totals
+        header = dict(order_type=order_type, payment_method=payment_method,
+                      subtotal=t.subtotal, tax=t.gst, discount=t.discount, service_charge=t.service,
+                      total=t.total, customer_name=customer_name.strip(),
+                      customer_mobile=(customer_mobile or "").strip(), order_date=now)
+        lines = [(ln.item_id, ln.qty, ln.price, quote.gst(ln), ln.name, ln.category, quote.discount(ln)) for ln in cart]
+
+        if self.journal is not None:
+            order_id, ref = None, self.journal.append(header, lines)
+        else:
+            ref = header["reference_no"] = self.refs.next()
+            caps = self.schema()
+            with self.connect() as conn:
+                cur = conn.cursor()
+                order_id = insert_order(cur, caps, header, lines)
+                if rollup.available(caps):
+                    rollup.record_order(cur, header, lines)
+                if caps.has_table("customers"):
+                    customers.record_visit(cur, header)
+                conn.commit()
+            if self.ledger is not None:
+                self.ledger.record(header)      # after the commit; verify_shift catches a crash in between
+        self.customers.record(header["customer_mobile"], header["customer_name"], t.total, now)
+
+        return dict(order_id=order_id, reference_no=ref, subtotal=t.subtotal,
+                    gst=t.gst, discount=t.discount, service=t.service, total=t.total,
+                    items=[dict(ln.as_dict(), gst=quote.gst(ln)) for ln in cart], savings=quote.savings,
+                    offers=quote.notes(),
+                    order_type=order_type, payment=payment_method,
+                    customer=header["customer_name"], mobile=header["customer_mobile"],
+                    date=str(now))
+
+    # --------------------- shifts ---------------------
+    def _shifts(self):
+        if self.ledger is None:
+            raise ServiceError("This till keeps no shift totals (it has no journal).", title="Shifts")
+        return self.ledger
+
+    def shift(self, shift_id=None):
+        """X-report of the open shift, or the Z-report of a closed one."""
+        report = self._shifts().report(shift_id)
+        if report is None:
+            raise NotFound(f"Shift {shift_id} not found on this till.")
+        return report
+
+    def recent_shifts(self, limit=20):
+        return self._shifts().recent(limit)
+
+    def close_shift(self, closed_by="", counted_cash=None):
+        """Close the open shift; returns its Z-report. The next one starts at once."""
+        ledger = self._shifts()
+        if counted_cash not in (None, ""):
+            try:
+                counted_cash = money(counted_cash)
+            except ArithmeticError:
+                raise ServiceError(f"counted cash is not a number: {counted_cash!r}", title="Shifts")
+            if counted_cash < 0:
+                raise ServiceError("counted cash cannot be negative", title="Shifts")
+        else:
+            counted_cash = None
+        return ledger.close((closed_by or "").strip(), counted_cash)
+
+    def verify_shift(self, shift_id=None):
+        """Recompute a shift from ``orders``; returns dict(shift, ok, differences, unsynced).
+
+        ``differences`` are (method, field, ledger, orders). ``unsynced`` counts
+        the shift's orders still in the journal, which explain a shortfall.
+        """
+        report = self.shift(shift_id)
+        if not self.schema().has("orders", "reference_no"):
+            raise ServiceError("orders.reference_no is missing; run: python migrations.py", title="Shifts")
+        with self.connect() as conn:
+            diffs = shifts.verify(conn, report)
+        unsynced = 0
+        if self.journal is not None and report["first_ref"]:
+            unsynced = self.journal.unsynced(report["first_ref"], report["last_ref"])
+        return dict(shift=report["shift"], ok=not diffs, differences=diffs, unsynced=unsynced)
+
+    # --------------------- journal ---------------------
+    def _journal(self):
+        if self.journal is None:
+            raise ServiceError("This till has no journal.", title="Journal")
+        return self.journal
+
+    def parked_orders(self):
+        """Journal entries MySQL kept rejecting, as (reference_no, created, attempts, last_error)."""
+        return self._journal().parked()
+
+    def requeue_parked(self, refs=None):
+        """Retry parked entries (all, or the references in ``refs``); returns how many."""
+        if refs is not None and (not isinstance(refs, list) or not all(isinstance(r, str) for r in refs)):
+            raise ServiceError("refs must be a list of reference numbers")
+        return self._journal().requeue(refs)
+
+    # --------------------- customers ---------------------
+    def refresh_customers(self):
+        """Load the customers table into the directory; returns the count."""
+        if not self.schema().has_table("customers"):
+            return 0
+        with self.connect() as conn:
+            return self.customers.load(conn)
+
+    def find_customers(self, text, limit=8):
+        """Customers whose mobile or a name word starts with ``text``, regulars first."""
+        if not self.customers.loaded:
+            self.refresh_customers()
+        return self.customers.complete(text, limit)
+
+    def customer(self, mobile):
+        if not self.customers.loaded:
+            self.refresh_customers()
+        c = self.customers.get(mobile)
+        if c is None:
+            raise NotFound(f"no customer with mobile {mobile}")
+        return c
+
+    # --------------------- history ---------------------
+    @staticmethod
+    def history_select(caps):
+        """Column list of a History row (what the Order History tree shows)."""
+        service = "COALESCE(service_charge,0)" if caps.has("orders", "service_charge") else "0"
+        return (f"id, {reference_sql(caps)}, order_date, order_type, payment_method, "
+                f"subtotal, tax, discount, {service}, total, customer_name")
+
+    def history(self, filters=None, before=None, after=None, limit=PAGE_SIZE):
+        """One keyset page of orders (see history.history_query)."""
+        caps = self.schema()
+        sql, params = history_query(caps, filters or {}, self.history_select(caps),
+                                    before=before, after=after, limit=limit)
+        with self.connect() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def archive(self):
+        """archive.Archive of the closed months, or None if nothing is archived."""
+        if self._archive is None and self.archive_path and os.path.isdir(self.archive_path):
+            from archive import Archive     # pulls in NumPy
+            self._archive = Archive(self.archive_path)
+        return self._archive
+
+    def order(self, order_id):
+        """Bill dict for a stored order, from the archive if it was moved there."""
+        arc = self.archive()
+        if arc is not None and arc.months():
+            try:
+                hit = arc.find_order(order_id)
+            except RuntimeError as e:       # archived month but no NumPy
+                raise ServiceError(str(e), title="Archive")
+            if hit is not None:
+                order, items = hit
+                return bills.bill_data(order, items, order['reference_no'] or reference_for(order_id, order['order_date']))
+        with self.connect() as conn:
+            cur = conn.cursor(dictionary=True)
+            cur.execute("SELECT * FROM orders WHERE id=%s", (order_id,))
+            order = cur.fetchone()
+            if order is None:
+                raise NotFound(f"order {order_id} does not exist")
+            name, join = item_name_sql(self.schema())
+            cur.execute(
+                f"""
+                SELECT oi.quantity, oi.price, oi.gst, {name} AS item_name
+                FROM order_items oi{join}
+                WHERE oi.order_id=%s ORDER BY oi.id
+                """, (order_id,)
+            )
+            items = cur.fetchall()
+        ref = order.get('reference_no') or reference_for(order_id, order['order_date'])
+        return bills.bill_data(order, items, ref)
+
+    # --------------------- reports ---------------------
+    def sales(self, period="monthly"):
+        """(period, total sales) rows, newest first."""
+        if period not in SALES_PERIODS:
+            raise ServiceError(f"period must be one of {', '.join(SALES_PERIODS)}")
+        with self.connect() as conn:
+            cur = conn.cursor()
+            cur.execute(rollup.sales_sql(self.schema(), period))
+            return cur.fetchall()
+
+    def top_items(self, limit=50):
+        with self.connect() as conn:
+            cur = conn.cursor()
+            cur.execute(rollup.top_items_sql(self.schema(), limit))
+            return cur.fetchall()
+
+    def analytics(self, report, date_from=None, date_to=None, **opts):
+        """``(header, rows)`` of an analytics report over [date_from, date_to]."""
+        import analytics        # pulls in NumPy; only when a report is asked for
+        if report not in analytics.REPORTS:
+            raise ServiceError(f"report must be one of {', '.join(analytics.REPORTS)}")
+        if not analytics.HAVE_NUMPY:
+            raise ServiceError("Analytics reports need NumPy (pip install numpy).", title="Analytics")
+        if self._frames is None:
+            self._frames = analytics.FrameCache()
+        arc = self.archive()
+        try:
+            conn = self.connect()
+        except Exception:
+            if arc is None or not arc.covers(date_from, date_to):
+                raise
+            conn = None             # database down: archived months only
+        if conn is None:
+            frame = self._frames.get(None, None, date_from, date_to, arc)
+        else:
+            with conn:
+                frame = self._frames.get(conn, self.schema(), date_from, date_to, arc)
+        return analytics.run(frame, report, **opts)
@@ -0,0 +1,268 @@
+"""Till shifts: running payment totals per terminal, and the Z-report at close.
+
+Each terminal always has one open shift. ``ShiftLedger.add`` counts a saved
+order against it with one UPSERT into ``shift_totals`` (orders, subtotal, tax,
+discount, service and total for its payment method, in paise) and moves the
+shift's last reference on. With the journal that happens in the same local
+SQLite transaction as the journal entry, so the running totals are on disk
+with the bill whether or not MySQL is up. Closing a shift stamps it and opens
+the next one in one transaction; the Z-report is a read of at most one row
+per payment method, never a scan of ``orders``.
+
+``verify`` is the audit: it recomputes the same totals from ``orders`` over
+the shift's reference range (references carry the terminal id, see
+references.py) and lists every difference. Orders still waiting in the
+journal show up there as missing until the syncer has pushed them.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from references import parts
+
+FIELDS = ("orders", "subtotal", "tax", "discount", "service", "total")
+# shift_totals column -> insert_order header key
+AMOUNTS = (("subtotal", "subtotal"), ("tax", "tax"), ("discount", "discount"),
+           ("service", "service_charge"), ("total", "total"))
+LABELS = (("Subtotal", "subtotal"), ("GST", "tax"), ("Discount", "discount"), ("Service", "service"),
+          ("Total", "total"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shifts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    terminal INTEGER NOT NULL,
+    opened_at REAL NOT NULL,
+    closed_at REAL,
+    first_ref TEXT,
+    last_ref TEXT,
+    closed_by TEXT,
+    counted_cash INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_shifts_open ON shifts (terminal, closed_at);
+CREATE TABLE IF NOT EXISTS shift_totals (
+    shift_id INTEGER NOT NULL,
+    payment_method TEXT NOT NULL,
+    orders INTEGER NOT NULL DEFAULT 0,
+    subtotal INTEGER NOT NULL DEFAULT 0,
+    tax INTEGER NOT NULL DEFAULT 0,
+    discount INTEGER NOT NULL DEFAULT 0,
+    service INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (shift_id, payment_method)
+);
+"""
+
+_UPSERT = (
+    "INSERT INTO shift_totals (shift_id, payment_method, orders, subtotal, tax, discount, service, total) "
+    "VALUES (?,?,1,?,?,?,?,?) ON CONFLICT (shift_id, payment_method) DO UPDATE SET orders=orders+1, "
+    + ", ".join(f"{c}={c}+excluded.{c}" for c, _ in AMOUNTS)
+)
+_SHIFT_COLS = "id, terminal, opened_at, closed_at, first_ref, last_ref, closed_by, counted_cash"
+
+
+def _paise(v):
+    return int((Decimal(v) * 100).to_integral_value())
+
+
+def _rupees(p):
+    return Decimal(p).scaleb(-2) if p is not None else None
+
+
+def _when(ts):
+    return datetime.fromtimestamp(ts).replace(microsecond=0) if ts is not None else None
+
+
+def _sums(counts):
+    """{method: [orders, paise...]} -> {method: {field: value}} plus the all-method total."""
+    methods = {m: dict(zip(FIELDS, [c[0]] + [_rupees(p) for p in c[1:]])) for m, c in sorted(counts.items())}
+    total = [sum(c[i] for c in counts.values()) for i in range(len(FIELDS))]
+    return methods, dict(zip(FIELDS, [total[0]] + [_rupees(p) for p in total[1:]]))
+
+
+def _report(head, counts):
+    sid, terminal, opened, closed, first_ref, last_ref, closed_by, counted = head
+    methods, totals = _sums(counts)
+    counted = _rupees(counted)
+    cash = methods.get("Cash", {}).get("total", Decimal("0.00"))
+    return dict(shift=sid, terminal=terminal, opened=_when(opened), closed=_when(closed),
+                first_ref=first_ref, last_ref=last_ref, closed_by=closed_by or "",
+                methods=methods, totals=totals, counted_cash=counted,
+                cash_over=counted - cash if counted is not None else None)
+
+
+class ShiftLedger:
+    """Shift totals in a local SQLite database; safe to share between threads.
+
+    ``db`` (autocommit mode) and ``lock`` are an existing connection and the
+    lock that guards it, e.g. the journal's, so an order and its totals commit
+    together. ``open_ledger`` makes a standalone one.
+    """
+
+    def __init__(self, db, lock, terminal):
+        self._db = db
+        self._lock = lock
+        self.terminal = int(terminal)
+        with lock:
+            db.executescript(SCHEMA)
+            row = db.execute("SELECT id FROM shifts WHERE terminal=? AND closed_at IS NULL ORDER BY id DESC LIMIT 1",
+                             (self.terminal,)).fetchone()
+            self._open = row[0] if row else self._start(time.time())
+
+    def _start(self, now):
+        return self._db.execute("INSERT INTO shifts (terminal, opened_at) VALUES (?,?)",
+                                (self.terminal, now)).lastrowid
+
+    @property
+    def current(self):
+        """Id of the open shift."""
+        return self._open
+
+    # --------------------- orders ---------------------
+    def add(self, header):
+        """Count one saved order; the caller holds the lock inside a transaction.
+
+        ``header`` is what ``insert_order`` takes, with its ``reference_no``.
+        """
+        ref = header.get("reference_no")
+        self._db.execute(_UPSERT, (self._open, header["payment_method"],
+                                   *(_paise(header[k]) for _, k in AMOUNTS)))
+        if ref:
+            self._db.execute("UPDATE shifts SET first_ref=COALESCE(first_ref, ?), last_ref=? WHERE id=?",
+                             (ref, ref, self._open))
+
+    def record(self, header):
+        """``add`` in its own transaction (checkout without a journal)."""
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self.add(header)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    # --------------------- close ---------------------
+    def close(self, closed_by="", counted_cash=None):
+        """Close the open shift and open the next; returns the closed shift's Z-report.
+
+        ``counted_cash`` is what was in the drawer; the report shows it
+        against the cash taken (``cash_over``).
+        """
+        counted = _paise(counted_cash) if counted_cash is not None else None
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                db.execute("UPDATE shifts SET closed_at=?, closed_by=?, counted_cash=? WHERE id=?",
+                           (now, closed_by, counted, self._open))
+                new = self._start(now)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            closed, self._open = self._open, new
+        return self.report(closed)
+
+    # --------------------- reports ---------------------
+    def report(self, shift_id=None):
+        """X-report of the open shift, or the Z-report of ``shift_id``; None if unknown."""
+        with self._lock:
+            sid = shift_id or self._open
+            head = self._db.execute(f"SELECT {_SHIFT_COLS} FROM shifts WHERE id=? AND terminal=?",
+                                    (sid, self.terminal)).fetchone()
+            rows = self._db.execute(
+                f"SELECT payment_method, {', '.join(FIELDS)} FROM shift_totals WHERE shift_id=?", (sid,)
+            ).fetchall()
+        if head is None:
+            return None
+        return _report(head, {r[0]: list(r[1:]) for r in rows})
+
+    def recent(self, limit=20):
+        """Latest shifts, newest first, as (id, opened, closed, orders, total)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT s.id, s.opened_at, s.closed_at, COALESCE(SUM(t.orders), 0), COALESCE(SUM(t.total), 0) "
+                "FROM shifts s LEFT JOIN shift_totals t ON t.shift_id = s.id WHERE s.terminal=? "
+                "GROUP BY s.id ORDER BY s.id DESC LIMIT ?", (self.terminal, limit)
+            ).fetchall()
+        return [(i, _when(o), _when(c), n, _rupees(t)) for i, o, c, n, t in rows]
+
+    def close_db(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_ledger(path, terminal):
+    """A ledger with its own SQLite file, for a till that has no journal."""
+    db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return ShiftLedger(db, threading.Lock(), terminal)
+
+
+# ------------------------- AUDIT -----------------------------
+def recompute(conn, terminal, first_ref, last_ref):
+    """{method: [orders, paise...]} from ``orders`` for one terminal's reference range."""
+    counts = {}
+    if not first_ref:
+        return counts
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT reference_no, payment_method, subtotal, tax, discount, service_charge, total "
+        "FROM orders WHERE reference_no BETWEEN %s AND %s", (first_ref, last_ref)
+    )
+    for ref, method, *amounts in cur.fetchall():
+        try:
+            if parts(ref)[1] != terminal:
+                continue
+        except ValueError:          # old-style reference that happens to sort inside the range
+            continue
+        c = counts.get(method)
+        if c is None:
+            c = counts[method] = [0] * len(FIELDS)
+        c[0] += 1
+        for i, v in enumerate(amounts, 1):
+            c[i] += _paise(v)
+    return counts
+
+
+def verify(conn, report):
+    """Differences between ``report`` and ``orders`` as (method, field, ledger, orders); empty if they agree."""
+    methods = _sums(recompute(conn, report["terminal"], report["first_ref"], report["last_ref"]))[0]
+    out = []
+    for m in sorted(set(methods) | set(report["methods"])):
+        kept, found = report["methods"].get(m, {}), methods.get(m, {})
+        for f in FIELDS:
+            a, b = kept.get(f, 0), found.get(f, 0)
+            if a != b:
+                out.append((m, f, a, b))
+    return out
+
+
+def text(report, width=42):
+    """Plain-text X/Z-report for the screen or a receipt printer."""
+    rule = "-" * width
+
+    def row(label, value):
+        value = str(value)
+        return label + value.rjust(width - len(label))
+    title = "Z-REPORT" if report["closed"] else "X-REPORT (shift open)"
+    out = [title.center(width), rule,
+           row("Shift", f"#{report['shift']}  terminal {report['terminal']}"),
+           row("Opened", str(report["opened"]))]
+    if report["closed"]:
+        out.append(row("Closed", str(report["closed"])))
+        if report["closed_by"]:
+            out.append(row("Closed by", report["closed_by"]))
+    for name, sums in list(report["methods"].items()) + [("ALL", report["totals"])]:
+        out += [rule, row(name, f"{sums['orders']} orders")]
+        out += [row(f"  {label}", f"{sums[f]:.2f}") for label, f in LABELS]
+    if report["counted_cash"] is not None:
+        out += [rule, row("Cash counted", f"{report['counted_cash']:.2f}"),
+                row("Over / short", f"{report['cash_over']:+.2f}")]
+    out.append(rule)
+    return "\n".join(out)
@@ -0,0 +1,301 @@
+"""SQLite stand-in for the MySQL database.
+
+Lets the headless service (service.py / api.py) and the benchmarks run with
+no MySQL server. ``connect()`` returns a connection that accepts the same
+SQL the rest of the code sends to MySQL:
+
+- ``%s`` placeholders become ``?``;
+- ``ON DUPLICATE KEY UPDATE ... VALUES(c)`` becomes ``ON CONFLICT DO UPDATE ... excluded.c``;
+- ``IF()`` becomes ``IIF()``, and ``LIKE`` gets MySQL's backslash escape;
+- the MySQL functions used by the queries (DATE_FORMAT, YEARWEEK, HOUR,
+  WEEKDAY, TO_DAYS, CRC32, CONCAT, CONCAT_WS, LPAD, GREATEST, LEAST) are registered as
+  Python functions.
+
+DECIMAL columns come back as ``Decimal``, and TIMESTAMP/DATE columns as
+``datetime``/``date``, the same as mysql-connector. Connections can be
+shared between threads, so they fit ``db_pool.ConnectionPool``. This is a
+development and test backend: SQLite serialises writers.
+"""
+import re
+import sqlite3
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from order_store import SchemaCaps
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name VARCHAR(100) NOT NULL UNIQUE,
+    category VARCHAR(50) NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    gst DECIMAL(5,2) DEFAULT 0.00,
+    is_active BOOLEAN DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_menu_active ON menu (is_active, category, item_name);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_name VARCHAR(100),
+    customer_mobile VARCHAR(15),
+    order_type VARCHAR(10) NOT NULL DEFAULT 'Dine-In',
+    payment_method VARCHAR(10) NOT NULL DEFAULT 'Cash',
+    subtotal DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    tax DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    discount DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    service_charge DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    total DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    reference_no VARCHAR(32) UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders (order_date);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_name ON orders (customer_name);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_mobile ON orders (customer_mobile);
+CREATE INDEX IF NOT EXISTS idx_orders_payment_method ON orders (payment_method);
+CREATE TABLE IF NOT EXISTS order_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL REFERENCES orders(id),
+    menu_item_id INTEGER NOT NULL REFERENCES menu(id),
+    quantity INTEGER NOT NULL DEFAULT 1,
+    price DECIMAL(10,2) NOT NULL,
+    gst DECIMAL(5,2) DEFAULT 0.00,
+    item_name VARCHAR(100),
+    category VARCHAR(50),
+    discount DECIMAL(10,2) NOT NULL DEFAULT 0.00
+);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id, menu_item_id, quantity, price, gst);
+CREATE INDEX IF NOT EXISTS idx_order_items_item ON order_items (menu_item_id, quantity, price);
+CREATE TABLE IF NOT EXISTS sales_daily (
+    sale_date DATE NOT NULL,
+    payment_method VARCHAR(10) NOT NULL,
+    orders INTEGER NOT NULL DEFAULT 0,
+    subtotal DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    tax DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    discount DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    service DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    total DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (sale_date, payment_method)
+);
+CREATE TABLE IF NOT EXISTS sales_daily_items (
+    sale_date DATE NOT NULL,
+    menu_item_id INTEGER NOT NULL,
+    payment_method VARCHAR(10) NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    gross DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    tax DECIMAL(14,4) NOT NULL DEFAULT 0.0000,
+    PRIMARY KEY (sale_date, menu_item_id, payment_method)
+);
+CREATE INDEX IF NOT EXISTS idx_sdi_item ON sales_daily_items (menu_item_id);
+CREATE TABLE IF NOT EXISTS customers (
+    mobile VARCHAR(15) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    visits INTEGER NOT NULL DEFAULT 0,
+    total_spend DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    first_visit TIMESTAMP,
+    last_visit TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_customers_name ON customers (name);
+"""
+
+SAMPLE_MENU = [
+    ("Paneer Tikka", "Starters", "220.00", "5.00"),
+    ("Veg Burger", "Snacks", "120.00", "5.00"),
+    ("Margherita Pizza", "Snacks", "299.00", "5.00"),
+    ("Veg Biryani", "Main Course", "240.00", "5.00"),
+    ("Butter Chicken", "Main Course", "320.00", "5.00"),
+    ("Tandoori Roti", "Breads", "25.00", "5.00"),
+    ("Gulab Jamun", "Desserts", "90.00", "5.00"),
+    ("Cold Coffee", "Drinks", "120.00", "18.00"),
+]
+
+
+# ------------------------- TYPES -----------------------------
+def _dt(v):
+    return v.isoformat(" ")
+
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, _dt)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter("DECIMAL", lambda b: Decimal(b.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()[:10]))
+
+
+# ------------------------- MYSQL FUNCTIONS -------------------
+_FORMAT = {"Y": "%Y", "y": "%y", "m": "%m", "d": "%d", "H": "%H", "i": "%M", "s": "%S", "%": "%%"}
+
+
+def _parse(v):
+    if v is None or isinstance(v, datetime):
+        return v
+    return datetime.fromisoformat(str(v))
+
+
+def _date_format(v, fmt):
+    v = _parse(v)
+    if v is None:
+        return None
+    return v.strftime(re.sub(r"%(.)", lambda m: _FORMAT.get(m.group(1), m.group(0)), fmt))
+
+
+def _yearweek(v, mode=0):
+    v = _parse(v)
+    if v is None:
+        return None
+    year, week, _ = v.isocalendar()      # mode 1 (ISO weeks) is the one the reports use
+    return year * 100 + week
+
+
+def _hour(v):
+    v = _parse(v)
+    return None if v is None else v.hour
+
+
+def _weekday(v):
+    v = _parse(v)
+    return None if v is None else v.weekday()
+
+
+def _to_days(v):
+    v = _parse(v)
+    return None if v is None else v.toordinal() + 365
+
+
+def _concat(*args):
+    return None if any(a is None for a in args) else "".join(str(a) for a in args)
+
+
+def _concat_ws(sep, *args):
+    return str(sep).join(str(a) for a in args if a is not None)
+
+
+def _lpad(v, n, pad):
+    s = str(v)
+    n = int(n)
+    return s[:n] if len(s) >= n else (str(pad) * n)[: n - len(s)] + s
+
+
+def _crc32(v):
+    return None if v is None else zlib.crc32(str(v).encode("utf-8"))
+
+
+def _greatest(*args):
+    return None if any(a is None for a in args) else max(args)
+
+
+def _least(*args):
+    return None if any(a is None for a in args) else min(args)
+
+
+# ------------------------- DIALECT ---------------------------
+_UPSERT = re.compile(r"ON DUPLICATE KEY UPDATE", re.I)
+_VALUES_FN = re.compile(r"VALUES\((\w+)\)", re.I)
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """MySQL statement (as this codebase writes them) -> SQLite."""
+    m = _UPSERT.search(sql)
+    if m:
+        head, tail = sql[:m.start()], sql[m.end():]
+        sql = head + "ON CONFLICT DO UPDATE SET" + _VALUES_FN.sub(r"excluded.\1", tail)
+    sql = re.sub(r"\bIF\(", "IIF(", sql)
+    sql = re.sub(r"LIKE %s", r"LIKE %s ESCAPE '\\'", sql)
+    return sql.replace("%s", "?")
+
+
+class _Cursor:
+    def __init__(self, cur, dictionary=False):
+        self._cur = cur
+        if dictionary:
+            cur.row_factory = lambda c, row: {d[0]: v for d, v in zip(c.description, row)}
+
+    def execute(self, sql, params=()):
+        self._cur.execute(translate(sql), tuple(params))
+        return self
+
+    def executemany(self, sql, seq):
+        self._cur.executemany(translate(sql), [tuple(p) for p in seq])
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+
+class SQLiteConnection:
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                                   timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.create_function("DATE_FORMAT", 2, _date_format, deterministic=True)
+        self._db.create_function("YEARWEEK", 1, _yearweek, deterministic=True)
+        self._db.create_function("YEARWEEK", 2, _yearweek, deterministic=True)
+        self._db.create_function("HOUR", 1, _hour, deterministic=True)
+        self._db.create_function("WEEKDAY", 1, _weekday, deterministic=True)
+        self._db.create_function("TO_DAYS", 1, _to_days, deterministic=True)
+        self._db.create_function("CONCAT", -1, _concat, deterministic=True)
+        self._db.create_function("CONCAT_WS", -1, _concat_ws, deterministic=True)
+        self._db.create_function("LPAD", 3, _lpad, deterministic=True)
+        self._db.create_function("CRC32", 1, _crc32, deterministic=True)
+        self._db.create_function("GREATEST", -1, _greatest, deterministic=True)
+        self._db.create_function("LEAST", -1, _least, deterministic=True)
+
+    def cursor(self, dictionary=False, buffered=None):
+        return _Cursor(self._db.cursor(), dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._db.in_transaction
+
+    def ping(self, reconnect=False):
+        self._db.execute("SELECT 1")
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        self.close()
+        return False
+
+
+def connect(path):
+    return SQLiteConnection(path)
+
+
+def create_schema(conn, seed_menu=True):
+    """Create the tables (idempotent) and, if the menu is empty, a sample menu."""
+    conn._db.executescript(SCHEMA)
+    if seed_menu:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM menu")
+        if not cur.fetchone()[0]:
+            cur.executemany("INSERT INTO menu (item_name, category, price, gst) VALUES (%s,%s,%s,%s)", SAMPLE_MENU)
+    conn.commit()
+
+
+def detect_schema(conn):
+    """``SchemaCaps`` for a SQLite database (MySQL uses ``SchemaCaps.detect``)."""
+    cur = conn.cursor()
+    cur.execute("SELECT m.name, p.name FROM sqlite_master m JOIN pragma_table_info(m.name) p "
+                "WHERE m.type = 'table'")
+    columns = {}
+    for table, col in cur.fetchall():
+        columns.setdefault(table.lower(), set()).add(col.lower())
+    return SchemaCaps(columns)
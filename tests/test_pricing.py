@@ -0,0 +1,241 @@
+"""Pricing rules: fixed expected totals per rule type and for their interactions.
+
+    python -m pytest -q tests        (or: python -m unittest discover tests)
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal as D
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cart import Cart, Totals  # noqa: E402
+from pricing import PricingError, RuleFile, RuleSet, compile_rules  # noqa: E402
+
+# (id, name, category, price, gst)
+MENU = {
+    1: (1, "Paneer Tikka", "Starters", "200", "5"),
+    2: (2, "Fries", "Snacks", "100", "5"),
+    3: (3, "Coke", "Drinks", "50", "18"),
+    4: (4, "Veg Burger", "Snacks", "100", "5"),
+    5: (5, "Garlic Bread", "Snacks", "100", "5"),
+}
+EVENING = datetime(2026, 10, 16, 18, 0)         # a Friday
+
+
+def cart(*lines):
+    """Cart of (menu id, qty) pairs."""
+    c = Cart()
+    for item_id, qty in lines:
+        i, name, category, price, gst = MENU[item_id]
+        c.add(i, name, price, gst, qty, category=category)
+    return c
+
+
+def totals(subtotal, gst, discount, service, total):
+    return Totals(*(D(v) for v in (subtotal, gst, discount, service, total)))
+
+
+def price(rules, c, discount_pct=0, service_pct=0, coupon="", now=EVENING):
+    return compile_rules(rules).price(c, discount_pct, service_pct, coupon, now)
+
+
+class NoRulesTest(unittest.TestCase):
+    def test_equals_cart_totals(self):
+        c = cart((1, 2), (2, 1), (3, 3))
+        for pct in ((0, 0), (10, 5), ("7.5", "2.5")):
+            self.assertEqual(RuleSet().price(c, *pct).totals, c.totals(*pct))
+            self.assertEqual(price([], c, *pct).totals, c.totals(*pct))
+
+    def test_inactive_rules_change_nothing(self):
+        c = cart((2, 3))
+        rules = [{"type": "buy_get", "item": 2, "buy": 2, "get": 1, "active": False},
+                 {"type": "happy_hour", "pct": 50, "ends": "2026-01-31"}]
+        self.assertEqual(price(rules, c).totals, c.totals())
+
+
+class GstSlabTest(unittest.TestCase):
+    def test_category_slab(self):
+        q = price([{"type": "gst", "category": "Drinks", "rate": 12}], cart((3, 2)))
+        self.assertEqual(q.totals, totals("100.00", "12.00", "0.00", "0.00", "112.00"))
+
+    def test_item_slab_beats_category_slab(self):
+        rules = [{"id": "drinks", "type": "gst", "category": "Drinks", "rate": 12},
+                 {"id": "coke", "type": "gst", "item": 3, "rate": 28}]
+        c = cart((3, 2))
+        q = price(rules, c)
+        self.assertEqual(q.totals, totals("100.00", "28.00", "0.00", "0.00", "128.00"))
+        self.assertEqual(q.gst(c.get(3)), D(28))
+
+
+class HappyHourTest(unittest.TestCase):
+    RULE = {"id": "hh", "type": "happy_hour", "category": "Snacks", "pct": 20, "from": "17:00", "to": "19:00"}
+
+    def test_inside_window(self):
+        q = price([self.RULE], cart((2, 2)))
+        self.assertEqual(q.totals, totals("200.00", "8.00", "40.00", "0.00", "168.00"))
+
+    def test_window_end_is_exclusive(self):
+        c = cart((2, 2))
+        self.assertEqual(price([self.RULE], c, now=datetime(2026, 10, 16, 19, 0)).totals, c.totals())
+
+    def test_window_across_midnight(self):
+        rule = dict(self.RULE, **{"from": "22:00", "to": "02:00"})
+        c = cart((2, 1))
+        on = totals("100.00", "4.00", "20.00", "0.00", "84.00")
+        self.assertEqual(price([rule], c, now=datetime(2026, 10, 16, 23, 30)).totals, on)
+        self.assertEqual(price([rule], c, now=datetime(2026, 10, 17, 1, 59)).totals, on)
+        self.assertEqual(price([rule], c, now=datetime(2026, 10, 17, 2, 0)).totals, c.totals())
+        self.assertEqual(price([rule], c, now=datetime(2026, 10, 16, 21, 59)).totals, c.totals())
+
+    def test_best_percentage_wins(self):
+        rules = [self.RULE, dict(self.RULE, id="hh2", category=None, item=2, pct=30)]
+        q = price(rules, cart((2, 1)))
+        self.assertEqual(q.totals, totals("100.00", "3.50", "30.00", "0.00", "73.50"))
+
+    def test_manual_discount_and_service_on_net(self):
+        q = price([self.RULE], cart((2, 2)), discount_pct=10, service_pct=5)
+        self.assertEqual(q.totals, totals("200.00", "8.00", "56.00", "8.00", "160.00"))
+
+
+class ComboTest(unittest.TestCase):
+    def test_price_spread_over_lines(self):
+        c = cart((1, 1), (3, 1))
+        q = price([{"id": "meal", "type": "combo", "items": {"1": 1, "3": 1}, "price": 220}], c)
+        # 30 off, split by list price: 24 on the paneer (5%), 6 on the coke (18%)
+        self.assertEqual(q.totals, totals("250.00", "16.72", "30.00", "0.00", "236.72"))
+        self.assertEqual((q.discount(c.get(1)), q.discount(c.get(3))), (D("24.00"), D("6.00")))
+
+    def test_incomplete_combo(self):
+        c = cart((1, 2))
+        self.assertEqual(price([{"type": "combo", "items": [1, 3], "price": 220}], c).totals, c.totals())
+
+    def test_applies_per_complete_set(self):
+        q = price([{"type": "combo", "items": [1, 3], "price": 220}], cart((1, 3), (3, 2)))
+        self.assertEqual(q.totals, totals("700.00", "43.44", "60.00", "0.00", "683.44"))
+
+
+class BuyGetTest(unittest.TestCase):
+    RULE = {"id": "b2g1", "type": "buy_get", "item": 2, "buy": 2, "get": 1}
+
+    def test_free_unit(self):
+        q = price([self.RULE], cart((2, 3)))
+        self.assertEqual(q.totals, totals("300.00", "10.00", "100.00", "0.00", "210.00"))
+
+    def test_only_whole_deals(self):
+        q = price([self.RULE], cart((2, 5)))
+        self.assertEqual(q.totals, totals("500.00", "20.00", "100.00", "0.00", "420.00"))
+
+    def test_cheapest_unit_is_free(self):
+        q = price([{"type": "buy_get", "items": [1, 3], "buy": 1, "get": 1}], cart((1, 1), (3, 1)))
+        self.assertEqual(q.totals, totals("250.00", "10.00", "50.00", "0.00", "210.00"))
+
+
+class CouponTest(unittest.TestCase):
+    RULE = {"type": "coupon", "code": "TEN", "pct": 10, "min_subtotal": 300, "max_off": 50}
+
+    def test_percentage(self):
+        q = price([self.RULE], cart((1, 1), (2, 1)), coupon="ten")
+        self.assertIsNone(q.coupon_error)
+        self.assertEqual(q.totals, totals("300.00", "13.50", "30.00", "0.00", "283.50"))
+
+    def test_capped(self):
+        q = price([self.RULE], cart((1, 3), (2, 2)), coupon="TEN")
+        self.assertEqual(q.totals, totals("800.00", "37.50", "50.00", "0.00", "787.50"))
+
+    def test_minimum_and_unknown_code(self):
+        c = cart((2, 1))
+        for code in ("TEN", "NOPE"):
+            q = price([self.RULE], c, coupon=code)
+            self.assertTrue(q.coupon_error)
+            self.assertEqual(q.totals, c.totals())
+
+    def test_amount_spread_by_net_value(self):
+        c = cart((1, 1), (3, 1))
+        q = price([{"type": "coupon", "code": "FLAT", "amount": 25}], c, coupon="FLAT")
+        # 20 off the paneer (5% GST), 5 off the coke (18% GST)
+        self.assertEqual(q.totals, totals("250.00", "17.10", "25.00", "0.00", "242.10"))
+        self.assertEqual((q.discount(c.get(1)), q.discount(c.get(3))), (D("20.00"), D("5.00")))
+
+    def test_only_covered_lines(self):
+        c = cart((1, 1), (2, 1))
+        q = price([{"type": "coupon", "code": "SNACK", "category": "Snacks", "pct": 50}], c, coupon="SNACK")
+        self.assertEqual(q.totals, totals("300.00", "12.50", "50.00", "0.00", "262.50"))
+        self.assertEqual(q.discount(c.get(1)), 0)
+
+    def test_line_savings_add_up_in_paise(self):
+        c = cart((2, 1), (4, 1), (5, 1))
+        q = price([{"type": "coupon", "code": "TEN", "amount": 10}], c, coupon="TEN")
+        shares = sorted(q.discount(ln) for ln in c)
+        self.assertEqual(shares, [D("3.33"), D("3.33"), D("3.34")])
+        self.assertEqual(q.savings, D("10.00"))
+        self.assertEqual(q.totals, totals("300.00", "14.50", "10.00", "0.00", "304.50"))
+
+
+class InteractionTest(unittest.TestCase):
+    COMBO = {"id": "meal", "type": "combo", "items": [1, 2], "price": 250}
+    B1G1 = {"id": "b1g1", "type": "buy_get", "items": [1, 2], "buy": 1, "get": 1}
+
+    def test_deals_apply_in_file_order(self):
+        c = cart((1, 1), (2, 1))
+        combo_first = price([self.COMBO, self.B1G1], c)
+        self.assertEqual(combo_first.totals, totals("300.00", "12.50", "50.00", "0.00", "262.50"))
+        self.assertEqual((combo_first.discount(c.get(1)), combo_first.discount(c.get(2))), (D("33.33"), D("16.67")))
+        deal_first = price([self.B1G1, self.COMBO], c)
+        self.assertEqual(deal_first.totals, totals("300.00", "10.00", "100.00", "0.00", "210.00"))
+
+    def test_unit_in_a_deal_gets_no_happy_hour(self):
+        rules = [{"type": "buy_get", "item": 2, "buy": 2, "get": 1},
+                 {"type": "happy_hour", "item": 2, "pct": 10}]
+        q = price(rules, cart((2, 4)))
+        # three units in the deal (one free), the fourth at 10% off
+        self.assertEqual(q.totals, totals("400.00", "14.50", "110.00", "0.00", "304.50"))
+
+    def test_coupon_on_what_is_left(self):
+        rules = [{"type": "happy_hour", "item": 2, "pct": 20},
+                 {"type": "coupon", "code": "HALF", "pct": 50}]
+        q = price(rules, cart((2, 1)), coupon="HALF")
+        self.assertEqual(q.totals, totals("100.00", "2.00", "60.00", "0.00", "42.00"))
+
+    def test_slab_applies_to_discounted_value(self):
+        rules = [{"type": "gst", "item": 3, "rate": 28},
+                 {"type": "combo", "items": {"1": 1, "3": 1}, "price": 220}]
+        q = price(rules, cart((1, 1), (3, 1)))
+        self.assertEqual(q.totals, totals("250.00", "21.12", "30.00", "0.00", "241.12"))
+
+
+class RuleFileTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def write(self, text, stamp):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.utime(self.path, ns=(stamp, stamp))
+
+    def test_bad_edit_keeps_last_good_rules(self):
+        rf = RuleFile(self.path)
+        self.write(json.dumps({"rules": [{"type": "coupon", "code": "TEN", "pct": 10}]}), 10 ** 18)
+        good = rf.rules()
+        self.assertEqual(len(good), 1)
+        self.assertIsNone(rf.error)
+        self.write('{"rules": [', 2 * 10 ** 18)
+        self.assertIs(rf.rules(), good)
+        self.assertTrue(rf.error)
+        self.write(json.dumps({"rules": []}), 3 * 10 ** 18)
+        self.assertEqual(len(rf.rules()), 0)
+        self.assertIsNone(rf.error)
+
+    def test_compile_errors(self):
+        for spec in ({"type": "nope"}, {"type": "gst"}, {"type": "combo", "items": [1], "price": 10},
+                     {"type": "coupon", "code": "X"}, {"type": "happy_hour", "pct": 10, "from": "25:00"}):
+            with self.assertRaises(PricingError):
+                compile_rules([spec])
+
+
+if __name__ == "__main__":
+    unittest.main()
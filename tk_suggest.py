@@ -0,0 +1,94 @@
+"""Drop-down suggestions under a ttk.Entry.
+
+``SuggestBox(entry, fetch, on_pick)`` calls ``fetch(text)`` on every key
+press and shows what it returns, a list of (label, value) pairs, in a list
+under the entry. Down moves into the list, Return or a click picks a value
+and passes it to ``on_pick``, Escape closes it. ``fetch`` runs on the Tk
+thread, so it must answer from memory (e.g. customers.CustomerDirectory).
+"""
+import tkinter as tk
+
+_NAV_KEYS = {"Up", "Down", "Return", "KP_Enter", "Escape", "Tab", "Shift_L", "Shift_R"}
+
+
+class SuggestBox:
+    def __init__(self, entry, fetch, on_pick, rows=8):
+        self.entry = entry
+        self.fetch = fetch
+        self.on_pick = on_pick
+        self.rows = rows
+        self._values = []
+        self._popup = None
+        self._list = None
+        entry.bind("<KeyRelease>", self._typed, add="+")
+        entry.bind("<Down>", self._enter_list, add="+")
+        entry.bind("<Escape>", lambda e: self.hide(), add="+")
+        entry.bind("<FocusOut>", lambda e: entry.after(150, self._focus_left), add="+")
+
+    # --------------------- popup ---------------------
+    def _build(self):
+        self._popup = tk.Toplevel(self.entry)
+        self._popup.wm_overrideredirect(True)
+        self._popup.withdraw()
+        self._list = tk.Listbox(self._popup, height=self.rows, activestyle="dotbox", exportselection=False,
+                                font=("Segoe UI", 10))
+        self._list.pack(fill="both", expand=True)
+        self._list.bind("<ButtonRelease-1>", self._pick)
+        self._list.bind("<Return>", self._pick)
+        self._list.bind("<Escape>", lambda e: (self.hide(), self.entry.focus_set()))
+        self._list.bind("<FocusOut>", lambda e: self.entry.after(150, self._focus_left))
+
+    def show(self, items):
+        if not items:
+            self.hide()
+            return
+        if self._popup is None:
+            self._build()
+        self._values = [v for _, v in items]
+        self._list.delete(0, "end")
+        for label, _ in items:
+            self._list.insert("end", label)
+        self._list.configure(height=min(len(items), self.rows))
+        e = self.entry
+        width = max(e.winfo_width(), 320)
+        self._popup.wm_geometry(f"{width}x{self._list.winfo_reqheight()}+{e.winfo_rootx()}+{e.winfo_rooty() + e.winfo_height()}")
+        self._popup.deiconify()
+        self._popup.lift()
+
+    def hide(self):
+        if self._popup is not None:
+            self._popup.withdraw()
+        self._values = []
+
+    # --------------------- events ---------------------
+    def _typed(self, event):
+        if event.keysym in _NAV_KEYS:
+            return
+        text = self.entry.get().strip()
+        self.show(self.fetch(text) if text else [])
+
+    def _enter_list(self, _=None):
+        if self._values:
+            self._list.focus_set()
+            self._list.selection_clear(0, "end")
+            self._list.selection_set(0)
+            self._list.activate(0)
+            return "break"
+
+    def _pick(self, _=None):
+        sel = self._list.curselection()
+        if sel and sel[0] < len(self._values):
+            value = self._values[sel[0]]
+            self.hide()
+            self.entry.focus_set()
+            self.entry.icursor("end")
+            self.on_pick(value)
+        return "break"
+
+    def _focus_left(self):
+        try:
+            focus = self.entry.focus_get()
+        except KeyError:        # focus on a combobox popdown
+            focus = None
+        if focus is not self.entry and focus is not self._list:
+            self.hide()
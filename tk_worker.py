@@ -0,0 +1,88 @@
+"""Background thread pool with results delivered back on the Tk thread.
+
+Tk widgets may only be touched from the thread running ``mainloop``. Jobs run
+on a ``ThreadPoolExecutor``; finished futures are put on a queue that the Tk
+thread drains with ``root.after``. ``on_done``/``on_error`` callbacks can
+therefore update widgets directly. Polling only runs while jobs are pending.
+"""
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TkExecutor:
+    def __init__(self, root, max_workers=4, poll_ms=25, on_busy=None, around=None):
+        """``on_busy(labels)`` is called on the Tk thread whenever the set of
+        running job labels changes (empty list = idle). ``around(label)``, if
+        given, returns a context manager each job runs inside on its worker
+        (e.g. metrics.action)."""
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self.around = around
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pos-io")
+        self._done = queue.Queue()
+        self._pending = {}          # future -> label
+        self._polling = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None, label="Working"):
+        """Run ``fn(*args)`` on a worker. Must be called from the Tk thread."""
+        if self.around is not None:
+            fut = self._pool.submit(self._run, label, fn, args)
+        else:
+            fut = self._pool.submit(fn, *args)
+        self._pending[fut] = label
+        fut.add_done_callback(lambda f: self._done.put((f, on_done, on_error)))
+        self._notify()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._drain)
+        return fut
+
+    def _run(self, label, fn, args):
+        with self.around(label):
+            return fn(*args)
+
+    def post(self, fn, *args):
+        """Run ``fn(*args)`` on the Tk thread; safe to call from a job (e.g. progress)."""
+        self._done.put((None, fn, args))
+
+    def _drain(self):
+        while True:
+            try:
+                fut, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if fut is None:
+                try:
+                    on_done(*on_error)
+                except Exception as e:
+                    self.root.report_callback_exception(type(e), e, e.__traceback__)
+                continue
+            self._pending.pop(fut, None)
+            self._notify()
+            try:
+                exc = fut.exception()
+                if exc is not None:
+                    if on_error is not None:
+                        on_error(exc)
+                    else:
+                        self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+                elif on_done is not None:
+                    on_done(fut.result())
+            except Exception as e:
+                self.root.report_callback_exception(type(e), e, e.__traceback__)
+        if self._pending:
+            self.root.after(self.poll_ms, self._drain)
+        else:
+            self._polling = False
+
+    def _notify(self):
+        if self.on_busy is not None:
+            self.on_busy(list(self._pending.values()))
+
+    @property
+    def busy(self):
+        return bool(self._pending)
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
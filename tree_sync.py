@@ -0,0 +1,80 @@
+"""Keyed, incremental updates for ttk.Treeview.
+
+Rebuilding a Treeview means one Tcl call per row for the delete and one per
+row for the insert, even when only one row changed. ``TreeSync`` keeps a
+mirror of what it last put in the tree (iid -> values, plus row order).
+``sync()`` then touches only the rows that were added, removed, edited or
+moved. Rows are keyed by a stable id (menu id, order id), which is also used
+as the Treeview iid.
+"""
+
+
+class TreeSync:
+    def __init__(self, tree):
+        self.tree = tree
+        self._values = {}     # iid -> values tuple last written
+        self._order = []      # iids in display order
+
+    def sync(self, items):
+        """Make the tree show ``items``, an ordered iterable of (key, values).
+
+        Returns a dict with counts of inserted/updated/deleted/moved rows.
+        """
+        tree = self.tree
+        want = [(str(k), tuple(v)) for k, v in items]
+        keep = {iid for iid, _ in want}
+        stats = dict(inserted=0, updated=0, deleted=0, moved=0)
+
+        stale = [iid for iid in self._order if iid not in keep]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                del self._values[iid]
+            stats["deleted"] = len(stale)
+            order = [iid for iid in self._order if iid in keep]
+        else:
+            order = self._order
+
+        # Fast path: same rows in the same order, only values may differ.
+        if len(order) == len(want) and all(o == w[0] for o, w in zip(order, want)):
+            for iid, vals in want:
+                if self._values[iid] != vals:
+                    tree.item(iid, values=vals)
+                    self._values[iid] = vals
+                    stats["updated"] += 1
+            self._order = order
+            return stats
+
+        # The tree is always: rows placed so far, then the untouched survivors
+        # in their old order. A survivor stays put if it heads that tail.
+        placed = set()
+        tail = 0
+        new_order = []
+        for i, (iid, vals) in enumerate(want):
+            old = self._values.get(iid)
+            if old is None:
+                tree.insert("", i, iid=iid, values=vals)
+                stats["inserted"] += 1
+            else:
+                if old != vals:
+                    tree.item(iid, values=vals)
+                    stats["updated"] += 1
+                while order[tail] in placed:
+                    tail += 1
+                if order[tail] == iid:
+                    tail += 1
+                else:
+                    tree.move(iid, "", i)
+                    stats["moved"] += 1
+            placed.add(iid)
+            self._values[iid] = vals
+            new_order.append(iid)
+        self._order = new_order
+        return stats
+
+    def reset(self):
+        """Forget the mirror and clear the tree."""
+        if self._order:
+            self.tree.delete(*self._order)
+        self._values.clear()
+        self._order = []